@@ -5,15 +5,20 @@ import logging
 
 # Third-party imports
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
 from marshmallow import ValidationError
 from werkzeug.utils import secure_filename
 
 # Local imports
-from backend.schemas import FileDownloadSchema, FileUploadSchema, NewReportSchema, handle_validation_error
-from backend.db.mongo import save_report, get_report, list_reports
+from backend.schemas import FileDownloadSchema, FileUploadSchema, NewReportSchema, UploadInitSchema, handle_validation_error
+from backend.db.mongo import save_report, get_report, list_reports, report_exists
 import backend.main as main
+from backend.models import tmm1_charts
+from backend import result_cache
+from backend import upload_sessions
+from backend import blob_store
+from backend.ingestion import compression
 
 load_dotenv()
 
@@ -24,6 +29,11 @@ UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')
 ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', '').split(','))
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Uploaded data is stored once per content hash, upload and report folders reference it
+blobs = blob_store.BlobStore()
+# Chunked uploads write straight into the upload folder, then move into the blob store
+upload_store = upload_sessions.UploadStore(UPLOAD_FOLDER, blob_store=blobs)
+
 logging.debug("Flask app initialized with upload folder: %s", UPLOAD_FOLDER)
 
 @app.route('/', methods=['GET'])
@@ -38,6 +48,10 @@ def ensure_folder(foldername=UPLOAD_FOLDER):
 
 # Function to check if the uploaded file is allowed
 def allowed_file(filename):
+    # Compressed files are checked by the extension inside, e.g. tape.csv.gz as csv
+    inner_filename, suffix = compression.split_compression_suffix(filename)
+    if suffix and '.' in inner_filename:
+        filename = inner_filename
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @app.errorhandler(413)
@@ -67,19 +81,96 @@ def upload_files():
     ensure_folder(upload_subfolder)  # Ensure the folder exists
 
     uploaded_files = []
+    stored_blobs = []
+    # Optional client side hashes, one per file in the same order, to detect duplicates early
+    declared_hashes = request.form.getlist('sha256')
 
-    for file in files:
+    for position, file in enumerate(files):
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)  # Sanitize filename
-            file_path = os.path.join(upload_subfolder, filename)
-            file.save(file_path)  # Save the file to the subfolder
+            declared_hash = declared_hashes[position] if position < len(declared_hashes) else None
+            try:
+                sha256, blob_path, created = blobs.put_stream(file.stream, filename, declared_hash)
+            except ValueError as e:
+                return jsonify({'error': f'{filename}: {e}'}), 400
+            blobs.write_reference(upload_subfolder, filename, sha256, blob_path)
             uploaded_files.append(filename)
+            stored_blobs.append({'file': filename, 'sha256': sha256, 'duplicate': not created})
             logging.info(f"File '{filename}' uploaded successfully.")
         else:
             logging.warning(f"File type not allowed: {file.filename}")
             return jsonify({'error': f'File type not allowed for {file.filename}'}), 400
 
-    return jsonify({'message': 'Files uploaded successfully', 'files': uploaded_files}), 201
+    return jsonify({'message': 'Files uploaded successfully', 'files': uploaded_files, 'blobs': stored_blobs}), 201
+
+@app.route('/uploads', methods=['POST'])
+def init_upload():
+    """Endpoint to start a chunked upload, returns its id and offset 0."""
+    try:
+        data = UploadInitSchema().load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return handle_validation_error(err)
+
+    if not allowed_file(data['filename']):
+        return jsonify({'error': f"File type not allowed for {data['filename']}"}), 400
+
+    try:
+        session = upload_store.init(data['filename'], data.get('size'), data.get('sha256'),
+                                    data.get('content_type'), data.get('report_name'))
+    except upload_sessions.UploadTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+
+    return jsonify({'upload_id': session['upload_id'], 'offset': 0}), 201
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def append_upload(upload_id):
+    """Endpoint to append the raw request body to an upload at ?offset=, the last acknowledged offset."""
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'offset is required'}), 400
+
+    try:
+        session = upload_store.append(upload_id, offset, request.stream)
+    except LookupError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except upload_sessions.UploadOffsetError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except upload_sessions.UploadTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'upload_id': upload_id, 'offset': session['offset']}), 200
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Endpoint to get the acknowledged offset of an upload, to resume it."""
+    try:
+        session = upload_store.get(upload_id)
+    except LookupError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({key: session[key] for key in ('upload_id', 'filename', 'offset', 'size', 'sha256', 'complete')}), 200
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Endpoint to finish an upload, verifies the declared size and sha256."""
+    try:
+        session = upload_store.complete(upload_id)
+    except LookupError:
+        return jsonify({'error': 'Upload not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'message': 'Upload completed successfully',
+        'upload_id': upload_id,
+        'file': os.path.basename(session['path']),
+        'size': session['size'],
+        'sha256': session['sha256']
+    }), 200
 
 @app.route('/download/<filename>', methods=['GET'])
 def download_file(filename):
@@ -122,20 +213,45 @@ def new_report():
 
     request_received_at = datetime.now().isoformat()
 
-    # Create report folder and save files
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    report_folder = os.path.join(app.config['UPLOAD_FOLDER'], f"{report_name}_{timestamp}")
-    ensure_folder(report_folder)
+    # Files are taken from completed chunked uploads, or saved from the request
+    try:
+        data_upload = upload_store.completed(form_data['data_upload_id']) if form_data.get('data_upload_id') else None
+        config_upload = upload_store.completed(form_data['config_upload_id']) if form_data.get('config_upload_id') else None
+    except LookupError:
+        return jsonify({"error": "Upload not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if data_upload:
+        report_folder = data_upload['folder']
+    else:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        report_folder = os.path.join(app.config['UPLOAD_FOLDER'], f"{report_name}_{timestamp}")
+        ensure_folder(report_folder)
 
-    # Save files
     data_file = request.files.get('data_file')
     config_file = request.files.get('config_file')
-    
-    data_file_path = os.path.join(report_folder, secure_filename(data_file.filename))
-    config_file_path = os.path.join(report_folder, secure_filename(config_file.filename))
 
-    data_file.save(data_file_path)
-    config_file.save(config_file_path)
+    if data_upload:
+        data_file_path = data_upload['path']
+        data_file_info = (data_upload['filename'], data_upload['content_type'], data_upload['sha256'])
+    else:
+        # Stored once per content hash, so Parquet copies and tapes of the same bytes are reused
+        try:
+            data_sha256, data_file_path, _ = blobs.put_stream(data_file.stream, data_file.filename,
+                                                              form_data.get('data_sha256'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        blobs.write_reference(report_folder, data_file.filename, data_sha256, data_file_path)
+        data_file_info = (data_file.filename, data_file.content_type, data_sha256)
+
+    if config_upload:
+        config_file_path = config_upload['path']
+        config_file_info = (config_upload['filename'], config_upload['content_type'])
+    else:
+        config_file_path = os.path.join(report_folder, secure_filename(config_file.filename))
+        config_file.save(config_file_path)
+        config_file_info = (config_file.filename, config_file.content_type)
 
     # Run analysis
     result = main.main(config_file_path, data_file_path)
@@ -160,15 +276,16 @@ def new_report():
         },
         "files": {
             # Data file
-            "data_name": data_file.filename,
+            "data_name": data_file_info[0],
             "data_size": os.path.getsize(data_file_path),
-            "data_type": data_file.content_type,
+            "data_type": data_file_info[1],
             "data_url": data_file_path,
+            "data_sha256": data_file_info[2],
 
             # Config file
-            "config_name": config_file.filename,
+            "config_name": config_file_info[0],
             "config_size": os.path.getsize(config_file_path),
-            "config_type": config_file.content_type,
+            "config_type": config_file_info[1],
             "config_url": config_file_path
         },
         "processed_at": datetime.now().isoformat(),
@@ -182,6 +299,10 @@ def new_report():
     # Save to MongoDB
     report_id = save_report(report_data)
 
+    # Charts are rendered in the background once the numbers are stored
+    if isinstance(result, dict) and result.get('data'):
+        tmm1_charts.prerender_charts(report_id, result['data']['CGL_Curve'])
+
     # Return response with MongoDB ID
     return jsonify({
         "message": "Report created successfully",
@@ -210,6 +331,49 @@ def view_report(report_id):
             "error": f"Error retrieving report: {str(e)}"
         }), 500
 
+@app.route('/reportchart/<report_id>/<chart_type>', methods=['GET'])
+def report_chart(report_id, chart_type):
+    """Endpoint to get a chart of a report, rendered on first request and cached on disk."""
+    if chart_type not in tmm1_charts.CHART_TYPES:
+        return jsonify({"error": f"Unknown chart type '{chart_type}'"}), 404
+
+    try:
+        def load_cgl_curve():
+            report = get_report(report_id)
+            if not report or not isinstance(report.get('result'), dict):
+                raise LookupError(report_id)
+            return report['result']['data']['CGL_Curve']
+
+        chart_file = tmm1_charts.get_chart(report_id, chart_type, load_cgl_curve,
+                                           report_exists=lambda: report_exists(report_id))
+        return send_file(os.path.abspath(chart_file), mimetype='image/png')
+
+    except LookupError:
+        return jsonify({"error": "Report not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": f"Error rendering chart: {str(e)}"
+        }), 500
+
+@app.route('/resultcache', methods=['DELETE'])
+@app.route('/resultcache/<cache_key>', methods=['DELETE'])
+def invalidate_result_cache(cache_key=None):
+    """Endpoint to drop one cached model result, or all of them."""
+    try:
+        removed = result_cache.ResultCache().invalidate(cache_key)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if cache_key is not None and removed == 0:
+        return jsonify({"error": "Cached result not found"}), 404
+
+    return jsonify({
+        "message": "Result cache invalidated",
+        "removed": removed
+    }), 200
+
 @app.route('/listreports', methods=['GET'])
 def list_reports_route():
     """Endpoint to list reports with pagination."""
@@ -0,0 +1,172 @@
+# Standard library imports
+import os
+import json
+import uuid
+import hashlib
+import fcntl
+import logging
+from contextlib import contextmanager
+
+# Third-party imports
+from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
+
+# Load environment variables
+load_dotenv()
+
+# Uploaded data is stored once per content hash, report folders hold references to it
+BLOB_FOLDER = os.getenv('BLOB_FOLDER', os.path.join(os.getenv('UPLOAD_FOLDER', './uploads'), 'blobs'))
+
+# Bytes read from upload streams at a time
+STREAM_BLOCK_SIZE = 1024 * 1024
+# Suffix of the reference files written into report folders
+REFERENCE_SUFFIX = '.blob.json'
+# Written into a blob folder once its data is in place, names the data file
+BLOB_MANIFEST = 'blob.json'
+
+
+def blob_suffix(filename):
+    """Returns the extensions of an upload, e.g. '.csv.gz', which the readers detect formats by."""
+    suffixes = os.path.basename(secure_filename(filename) or '').split('.')[1:]
+    return ''.join(f".{suffix.lower()}" for suffix in suffixes[-2:])
+
+
+class BlobStore:
+    """
+    Content addressed store of uploaded files, one folder per sha256.
+
+    A blob folder holds the uploaded bytes as data<suffix>. Derived files that the readers write
+    next to their data file (the Parquet copy, binary tapes) land in the same folder, so every
+    report over the same bytes reuses them.
+    """
+
+    def __init__(self, folder=BLOB_FOLDER):
+        self.folder = folder
+
+    @contextmanager
+    def _lock(self, sha256):
+        """Exclusive lock on a blob, across threads and processes."""
+        blob_folder = self.blob_folder(sha256)
+        os.makedirs(os.path.dirname(blob_folder), exist_ok=True)
+        with open(f"{blob_folder}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def blob_folder(self, sha256):
+        sha256 = sha256.lower()
+        if len(sha256) != 64 or not all(c in '0123456789abcdef' for c in sha256):
+            raise ValueError(f"Invalid sha256 '{sha256}'")
+        return os.path.join(self.folder, sha256[:2], sha256)
+
+    def find(self, sha256):
+        """Returns the data file of a stored blob, or None when it is missing or its manifest unreadable."""
+        blob_folder = self.blob_folder(sha256)
+        try:
+            with open(os.path.join(blob_folder, BLOB_MANIFEST), 'r') as f:
+                data_name = json.load(f)['data']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        blob_path = os.path.join(blob_folder, data_name)
+        return blob_path if os.path.exists(blob_path) else None
+
+    def _store(self, file_path, sha256, filename):
+        """Moves a file with a known hash into the store, dropping it if the blob exists. Returns (path, created)."""
+        with self._lock(sha256):
+            existing = self.find(sha256)
+            if existing is not None:
+                os.remove(file_path)
+                logging.info(f"Upload is a duplicate of blob {sha256}")
+                return existing, False
+
+            blob_folder = self.blob_folder(sha256)
+            os.makedirs(blob_folder, exist_ok=True)
+            blob_path = os.path.join(blob_folder, f"data{blob_suffix(filename)}")
+            os.replace(file_path, blob_path)
+            # Readers never see a partly written manifest
+            manifest_path = os.path.join(blob_folder, BLOB_MANIFEST)
+            temp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'data': os.path.basename(blob_path), 'sha256': sha256.lower()}, f)
+            os.replace(temp_path, manifest_path)
+            logging.info(f"Stored blob {sha256} ({os.path.getsize(blob_path)} bytes)")
+            return blob_path, True
+
+    def put_stream(self, stream, filename, expected_sha256=None):
+        """
+        Stores the bytes of a stream, unless a blob with the same content exists.
+
+        A client supplied hash of a stored blob is checked by hashing the stream without writing
+        it. Otherwise the stream is written to a temporary file while it is hashed and moved into
+        the store, or dropped when its hash turns out to be stored already.
+
+        Parameters:
+        stream (file object): Readable binary stream of the upload.
+        filename (str): Uploaded file name, its extensions are kept on the blob.
+        expected_sha256 (str): Client supplied hex digest of the bytes.
+
+        Returns:
+        tuple: (sha256, blob path, created) where created is False for duplicates.
+        """
+        digest = hashlib.sha256()
+        expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+
+        existing = self.find(expected_sha256) if expected_sha256 else None
+        if existing is not None:
+            for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b''):
+                digest.update(block)
+            if digest.hexdigest() != expected_sha256:
+                raise ValueError(f"Upload sha256 {digest.hexdigest()} does not match the declared {expected_sha256}")
+            logging.info(f"Upload verified as a duplicate of blob {expected_sha256}")
+            return expected_sha256, existing, False
+
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = os.path.join(self.folder, f"upload.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b''):
+                    digest.update(block)
+                    f.write(block)
+            sha256 = digest.hexdigest()
+            if expected_sha256 and sha256 != expected_sha256:
+                raise ValueError(f"Upload sha256 {sha256} does not match the declared {expected_sha256}")
+            blob_path, created = self._store(temp_path, sha256, filename)
+            return sha256, blob_path, created
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def adopt(self, file_path, sha256, filename=None):
+        """
+        Moves an already hashed file, e.g. a completed chunked upload, into the store.
+
+        Returns:
+        tuple: (blob path, created)
+        """
+        return self._store(file_path, sha256, filename or os.path.basename(file_path))
+
+    def write_reference(self, folder, filename, sha256, blob_path):
+        """
+        Records in a report folder which blob holds an uploaded file.
+
+        Returns:
+        str: Path of the reference file.
+        """
+        os.makedirs(folder, exist_ok=True)
+        reference_path = os.path.join(folder, f"{secure_filename(filename)}{REFERENCE_SUFFIX}")
+        with open(reference_path, 'w') as f:
+            json.dump({
+                'filename': filename,
+                'sha256': sha256,
+                'blob_path': blob_path,
+                'size': os.path.getsize(blob_path)
+            }, f)
+        return reference_path
+
+
+def read_reference(reference_path):
+    """Returns the reference written by BlobStore.write_reference."""
+    with open(reference_path, 'r') as f:
+        return json.load(f)
@@ -4,6 +4,13 @@ import pandas as pd
 # Local imports
 from backend.data_handler.date_handler import convert_date_columns
 
+def dtype_matches(series, dtype):
+    """Checks if a column already has a configured dtype, e.g. because the CSV parser applied it."""
+    try:
+        return series.dtype == pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        return False
+
 def convert_columns_dtype(df, data_config):
     """
     Converts DataFrame columns to specified data types based on configuration.
@@ -16,17 +23,22 @@ def convert_columns_dtype(df, data_config):
     Returns:
     pd.DataFrame: A DataFrame with converted column data types.
     """
-    # Get dtype mapping from config
-    dtype_map = data_config['configuration']['attributes']['dtype']
-
     print("Handling dates...")
     df_dates_converted = convert_date_columns(df, data_config)
 
+    # Get dtype mapping from config, for the columns that were read and are not of that dtype yet
+    dtype_map = {
+        column: dtype
+        for column, dtype in data_config['configuration']['attributes']['dtype'].items()
+        if column in df_dates_converted.columns and not dtype_matches(df_dates_converted[column], dtype)
+    }
+
     temp = pd.DataFrame(None)
     
     try:
         # Try to convert the whole DataFrame at once
-        df_dates_converted = df_dates_converted.astype(dtype_map)
+        if dtype_map:
+            df_dates_converted = df_dates_converted.astype(dtype_map)
     except Exception as e:
         print(f"Error during DataFrame conversion: {e}")
         print("Attempting to identify problematic columns...")
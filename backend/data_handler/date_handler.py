@@ -91,6 +91,10 @@ def convert_date_columns(df, data_config):
     date_columns = data_config['configuration']['data_specific_functions']['date_columns']
     
     for col_name, col_config in date_columns.items():
+        if col_name not in df.columns:
+            print(f"\nSkipping column not read: {col_name}")
+            continue
+
         print(f"\nProcessing column: {col_name}")
         format_type = col_config.get('date_format')
         
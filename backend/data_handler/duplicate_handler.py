@@ -30,9 +30,10 @@ def handle_duplicates(df, case="remove", subset=None, keep='first', inplace=Fals
 
     # Handle cases
     if case == "remove":
-        print(f"{duplicate_exists.shape[0]} duplicates found")
+        print(f"{df.duplicated(subset=subset, keep=keep).sum()} duplicates found")
         print("Removing duplicates...")
-        return df.drop_duplicates(subset=subset, keep='keep', inplace=True)
+        deduplicated = df.drop_duplicates(subset=subset, keep=keep, inplace=inplace)
+        return df if inplace else deduplicated
 
     elif case == "mark":
         print("Marking duplicates...")
@@ -41,7 +42,8 @@ def handle_duplicates(df, case="remove", subset=None, keep='first', inplace=Fals
 
     elif case == "keep_last":
         print("Keeping the last occurrence of duplicates...")
-        return df.drop_duplicates(subset=subset, keep='last', inplace=True)
+        deduplicated = df.drop_duplicates(subset=subset, keep='last', inplace=inplace)
+        return df if inplace else deduplicated
 
     else:
         print("Invalid case. Choose from: 'remove', 'mark', 'count', 'keep_last'.")
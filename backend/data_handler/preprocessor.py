@@ -1,5 +1,8 @@
 from backend.data_handler import duplicate_handler, column_dtypes
 
+# A loan reports once per period, so rows repeating these keys are duplicates whichever columns were read
+RECORD_KEYS = ['LOAN_ID', 'ACT_PERIOD']
+
 def replace_values(df, data_config):
     """
     Function to replace values in a dataset such that it may cause errors with other operations.
@@ -29,8 +32,9 @@ def replace_values(df, data_config):
 
 
 def preprocess(df, data_config):
-    # Handling duplicates in the data
-    df_duplicate_handled = duplicate_handler.handle_duplicates(df)
+    # Handling duplicates in the data, judged on the record keys so column projection does not change the result
+    subset = [key for key in RECORD_KEYS if key in df.columns] or None
+    df_duplicate_handled = duplicate_handler.handle_duplicates(df, subset=subset)
     print("Duplicate Handling Complete")
 
     # Performing data-type specific replacement operations before coverting column dtypes
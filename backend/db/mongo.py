@@ -106,6 +106,24 @@ def get_report(report_id):
             logger.info("MongoDB connection closed")
 
 
+def report_exists(report_id):
+    """Check that a report with the given ID is stored, without loading it"""
+    client = None
+    try:
+        mongo_config = config.get_mongo_config()
+        client = get_mongo_client()
+        collection = client[mongo_config['database']][mongo_config['collection']]
+        return collection.count_documents({"_id": ObjectId(report_id)}, limit=1) > 0
+
+    except Exception as e:
+        logger.error(f"Failed to look up report in MongoDB: {str(e)}")
+        raise
+
+    finally:
+        if client:
+            client.close()
+
+
 def list_reports(page=1, page_size=20):
     """Retrieve paginated reports from MongoDB"""
     client = None
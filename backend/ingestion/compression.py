@@ -0,0 +1,117 @@
+# Standard library imports
+import io
+import os
+import gzip
+import logging
+import zipfile
+
+# Third-party imports
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional, pyarrow also reads zstd
+    zstandard = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+# Compressed tapes are read through a decompressing stream, no uncompressed copy is written
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.zip': 'zip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd'
+}
+
+# Leading bytes of each format, for files whose name does not tell
+MAGIC_BYTES = {
+    b'\x1f\x8b': 'gzip',
+    b'PK\x03\x04': 'zip',
+    b'\x28\xb5\x2f\xfd': 'zstd'
+}
+
+
+class NativeStreamReader(io.RawIOBase):
+    """File object over a pyarrow input stream, which can not tell() its position itself."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        data = self.stream.read(len(target))
+        target[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.stream.close()
+        super().close()
+
+
+def split_compression_suffix(filename):
+    """Returns (filename without compression suffix, compression suffix or '')."""
+    stem, suffix = os.path.splitext(filename)
+    if suffix.lower() in COMPRESSION_SUFFIXES:
+        return stem, suffix.lower()
+    return filename, ''
+
+
+def compression_of(file_path):
+    """Returns 'gzip', 'zip' or 'zstd' for a compressed file, None for a plain one."""
+    _, suffix = split_compression_suffix(file_path)
+    if suffix:
+        return COMPRESSION_SUFFIXES[suffix]
+
+    with open(file_path, 'rb') as f:
+        head = f.read(4)
+    for magic, compression in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def zip_member(archive):
+    """Returns the single data file of a zip archive."""
+    members = [info for info in archive.infolist()
+               if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+               and not info.filename.startswith('__MACOSX/')]
+    if len(members) != 1:
+        raise ValueError(f"Zip archives must hold one data file, found {[info.filename for info in members]}")
+    return members[0]
+
+
+def open_data_file(file_path):
+    """
+    Opens a data file for binary reading, decompressing .gz, .zip and .zst files as they are read.
+
+    Parameters:
+    file_path (str): Path of the data file.
+
+    Returns:
+    file object: Readable binary stream of the uncompressed bytes, to be closed by the caller.
+    """
+    compression = compression_of(file_path)
+
+    if compression is None:
+        return open(file_path, 'rb')
+    logging.info(f"Decompressing {compression} file while reading: {file_path}")
+
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'zip':
+        # The member keeps the archive's file open until it is closed itself
+        with zipfile.ZipFile(file_path) as archive:
+            return archive.open(zip_member(archive))
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    if pa is not None:
+        return io.BufferedReader(NativeStreamReader(pa.input_stream(file_path, compression='zstd')))
+    raise ImportError("zstandard or pyarrow is required for .zst files, install it with 'pip install zstandard'")
@@ -1,4 +1,5 @@
 # Standard library imports
+import os
 import json
 import logging
 import time
@@ -10,14 +11,154 @@ logging.basicConfig(level=logging.DEBUG)
 import pandas as pd
 
 # Local imports
+from backend.ingestion import compression, parquet_source_handler
+
+# Default rows per chunk of the chunked read mode
+DEFAULT_CHUNKSIZE = 500000
+
+def read_csv_options(data_config, all_columns=False):
+    """
+    Returns the pd.read_csv keyword arguments of a CSV configuration.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+    all_columns (bool): Read every column instead of tmm1_data.required_columns.
+
+    Returns:
+    dict: Keyword arguments for pd.read_csv.
+    """
+    from backend.models.tmm1_data import required_columns
+
+    attributes = data_config['configuration']['attributes']
+    options = {
+        'delimiter': attributes['delimiter'],
+        'skipinitialspace': True
+    }
+
+    # If column names are provided, assume the CSV has no header
+    column_names = attributes['names']
+    if column_names != "None":
+        logging.debug("Column names provided: %s", column_names)
+        options.update(names=column_names, header=None)
+    else:
+        logging.debug("No column names provided, inferring from CSV.")
+
+    # Only parse the columns the model and preprocessor use, tapes carry many more
+    usecols = None if all_columns else required_columns(data_config)
+    if usecols is not None:
+        logging.info("Reading %s columns: %s", len(usecols), usecols)
+        # A callable skips required columns the file does not have instead of raising
+        usecols_set = set(usecols)
+        options['usecols'] = lambda column: column in usecols_set
+
+    return options
+
+def parse_dtypes(data_config):
+    """
+    Returns the configured dtypes the CSV parser can apply directly.
+    Columns that replace_values or the date handler rewrite first are left to type inference,
+    convert_columns_dtype casts them after preprocessing.
+    """
+    configuration = data_config['configuration']
+    data_specific_functions = configuration.get('data_specific_functions', {})
+    rewritten = set(data_specific_functions.get('date_columns', {}))
+    rewritten.update(replace['column_name'] for replace in data_specific_functions.get('replace_values', []))
+
+    return {
+        column: dtype
+        for column, dtype in configuration['attributes'].get('dtype', {}).items()
+        if column not in rewritten
+    }
+
+def use_parquet_cache(data_config):
+    """Checks configuration.attributes.parquet_cache (default on) and that pyarrow is installed."""
+    enabled = data_config['configuration']['attributes'].get('parquet_cache', True)
+    return bool(enabled) and parquet_source_handler.pyarrow_available()
+
+def resolve_data_path(data_config, dataFilePath=None):
+    """Returns the absolute data file path, from the config when no path is given."""
+    from backend.utils import get_absolute_filepath
+
+    # If no data file path provided, get it from config
+    if dataFilePath is None:
+        dataFilePath = data_config['configuration']['attributes']['filepath']
+        logging.debug("Using filepath from config: %s", dataFilePath)
+    return get_absolute_filepath(dataFilePath)
+
+def read_csv_chunks(data_config, dataFilePath, chunksize=None, all_columns=False):
+    """
+    Reads a CSV file in chunks with the configured dtypes applied by the parser, keeping the rows of
+    the loans in the configured loan sample (see tmm1_data.sampling_config).
+
+    Compressed files (.gz, .zip, .zst) are decompressed as the chunks are read, byte counts are then
+    of uncompressed data.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+    dataFilePath (str): Absolute path of the CSV file.
+    chunksize (int): Rows per chunk. Defaults to configuration.attributes.chunksize.
+    all_columns (bool): Read every column instead of tmm1_data.required_columns.
+
+    Yields:
+    pd.DataFrame: One chunk of rows.
+    """
+    if chunksize is None:
+        chunksize = int(data_config['configuration']['attributes'].get('chunksize', DEFAULT_CHUNKSIZE))
+
+    from backend.models import tmm1_data
+    sampling = tmm1_data.sampling_config(data_config)
+
+    file_size = os.path.getsize(dataFilePath)
+    rows_read = 0
+    rows_kept = 0
+    start_time = time.time()
+
+    with compression.open_data_file(dataFilePath) as f:
+        reader = pd.read_csv(f,
+                             chunksize=chunksize,
+                             dtype=parse_dtypes(data_config),
+                             **read_csv_options(data_config, all_columns))
+        bytes_read = 0
+        for chunk_number, chunk in enumerate(reader, start=1):
+            rows_read += len(chunk)
+            # The parser reads ahead in blocks, so the position is the bytes consumed so far, rounded up to a block
+            chunk_bytes = f.tell() - bytes_read
+            bytes_read += chunk_bytes
+            logging.info("CSV chunk %s: %s rows, %s bytes (%s rows, %s of %s bytes read)",
+                         chunk_number, len(chunk), chunk_bytes, rows_read, bytes_read, file_size)
+
+            # The loan sample depends on LOAN_ID only, so it is applied row by row while streaming
+            if sampling['fraction'] < 1:
+                chunk = chunk[tmm1_data.sample_mask(chunk['LOAN_ID'], sampling)]
+            rows_kept += len(chunk)
+            yield chunk
+
+    logging.info(f"Read {rows_read} rows in chunks, kept {rows_kept} sampled rows, in {time.time() - start_time:.2f} seconds")
+
+def csv_chunk_handler(config_file, dataFilePath=None, chunksize=None):
+    """
+    Streaming counterpart of csv_handler.
+
+    Parameters:
+    config_file (str): Path to the configuration file (JSON format).
+    dataFilePath (str): Path to the CSV file, defaults to configuration.attributes.filepath.
+    chunksize (int): Rows per chunk. Defaults to configuration.attributes.chunksize.
+
+    Returns:
+    tuple: Generator of DataFrame chunks (see read_csv_chunks) and the data configuration.
+    """
+    with open(config_file, 'r') as config:
+        data_config = json.load(config)
+
+    dataFilePath = resolve_data_path(data_config, dataFilePath)
+    logging.info("Reading CSV in chunks... %s", dataFilePath)
+    return read_csv_chunks(data_config, dataFilePath, chunksize), data_config
 
 # CSV to DataFrame
-def csv_handler(config_file, dataFilePath='test/test_data/test_data.csv', read_rows=None):
+def csv_handler(config_file, dataFilePath='test/test_data/test_data.csv', read_rows=None, all_columns=False):
     df = None
     data_config = {}
 
-    from backend.utils import get_absolute_filepath
-
     try:
         # Open and load the configuration JSON file
         logging.debug("Attempting to open configuration file: %s", config_file)
@@ -26,41 +167,31 @@ def csv_handler(config_file, dataFilePath='test/test_data/test_data.csv', read_r
 
         logging.info("Config file loaded successfully.")
         logging.debug("Config data: %s", data_config)
-        # If no data file path provided, get it from config
-        if dataFilePath is None:
-            dataFilePath = data_config['configuration']['attributes']['filepath']
-            logging.debug("Using filepath from config: %s", dataFilePath)
-        
-        # Get absolute path
-        
-        dataFilePath = get_absolute_filepath(dataFilePath)
+        dataFilePath = resolve_data_path(data_config, dataFilePath)
         # Check and fix path if needed
         if dataFilePath == "E:\\CredPulse_Backend\\backend\\test_data.csv":
             dataFilePath = "E:\\CredPulse_Backend\\backend\\test\\test_data\\test_data.csv"
         logging.debug("Resolved absolute filepath: %s", dataFilePath)
         logging.info("Reading CSV... %s", dataFilePath)
 
-        # Check if column names are provided in the configuration
-        column_names = data_config['configuration']['attributes']['names']
-        
-        # If column names are provided, assume the CSV has no header
         start_time = time.time()
-        
-        if column_names != "None":
-            logging.debug("Column names provided: %s", column_names)
-            df = pd.read_csv(filepath_or_buffer=dataFilePath, 
-                             delimiter=data_config['configuration']['attributes']['delimiter'],
-                             names=column_names,
-                             header=None,
-                             skipinitialspace=True,
-                             nrows=read_rows)
-        else:
-            logging.debug("No column names provided, inferring from CSV.")
-            df = pd.read_csv(filepath_or_buffer=dataFilePath,
-                             delimiter=data_config['configuration']['attributes']['delimiter'],
-                             skipinitialspace=True,
-                             nrows=read_rows)
-        
+        df = None
+        # Full reads go through a typed Parquet copy of the file, written on first read
+        if read_rows is None and use_parquet_cache(data_config):
+            try:
+                from backend.models.tmm1_data import required_columns
+                columns = None if all_columns else required_columns(data_config)
+                df = parquet_source_handler.cached_csv_read(data_config, dataFilePath, columns)
+            except (ValueError, TypeError, OSError) as e:
+                # e.g. values the Arrow parser can not convert to the configured types
+                logging.warning("Parquet cache unavailable, reading the CSV directly: %s", e)
+
+        if df is None:
+            with compression.open_data_file(dataFilePath) as f:
+                df = pd.read_csv(filepath_or_buffer=f,
+                                 nrows=read_rows,
+                                 **read_csv_options(data_config, all_columns))
+
         processing_time = time.time() - start_time
         logging.info(f"CSV processing took {processing_time:.2f} seconds")
 
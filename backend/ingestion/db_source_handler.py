@@ -1,56 +1,188 @@
+# Standard library imports
+import json
+from concurrent.futures import ThreadPoolExecutor
+
 # Third-party imports
 import oracledb
 import pandas as pd
 import pyodbc
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, select, column, table, literal_column, text, func, and_, or_, true, cast, BigInteger, Integer
 import logging
+import queue
+import threading
 import time  # Add this import at the top of the file
 
-def db_handler(connection_params):
+# Define the engine format for each database type
+ENGINE_FORMAT = {
+    "postgresql": "postgresql://{user}:{password}@{host}:{port}/{database}",
+    "mysql": "mysql+pymysql://{user}:{password}@{host}:{port}/{database}",
+    "oracle": "oracle+oracledb://{user}:{password}@{host}:{port}/{database}",
+    "mssql": "mssql+pyodbc://{user}:{password}@{host}:{port}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
+    "sqlite": "sqlite:///{database}"  # SQLite does not require host/port/user/password
+}
+
+# Default rows per chunk of streamed reads
+DEFAULT_CHUNKSIZE = 100000
+
+# Engines are pooled and shared by every call with the same connection parameters
+_engines = {}
+_engines_lock = threading.Lock()
+
+def create_db_engine(connection_params):
+    """
+    Returns the pooled SQLAlchemy engine for the client's database, created on first use.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters (host, port, username, password, database_name, engine, etc.)
+
+    Returns:
+    - SQLAlchemy engine
+    """
+    db_type = connection_params['engine']
+    logging.debug(f"Database type detected: {db_type}")
+
+    if db_type not in ENGINE_FORMAT:
+        logging.error(f"Unsupported database type: {db_type}")
+        raise ValueError(f"Unsupported database type: {db_type}")
+
+    # Format the engine string based on connection parameters
+    engine_string = ENGINE_FORMAT[db_type].format(
+        user=connection_params.get('username', ''),
+        password=connection_params.get('password', ''),
+        host=connection_params.get('host', ''),
+        port=connection_params.get('port', ''),
+        database=connection_params.get('database_name', ''),
+        ssl_mode=connection_params.get('ssl_mode', 'disable'),
+        connect_timeout=connection_params.get('connect_timeout', 10)
+    )
+
+    # SQLite uses a single connection pool for in-memory databases, which takes no sizing options
+    pool_options = {
+        'pool_pre_ping': bool(connection_params.get('pool_pre_ping', True)),
+        'pool_recycle': int(connection_params.get('pool_recycle', 1800))
+    }
+    if db_type != 'sqlite':
+        pool_options['pool_size'] = int(connection_params.get('pool_size', 5))
+        pool_options['max_overflow'] = int(connection_params.get('max_overflow', 10))
+
+    engine_key = (engine_string, tuple(sorted(pool_options.items())))
+    with _engines_lock:
+        engine = _engines.get(engine_key)
+        if engine is None:
+            # Create the SQLAlchemy engine
+            engine = create_engine(engine_string, **pool_options)
+            _engines[engine_key] = engine
+            logging.info(f"SQLAlchemy engine created successfully for {db_type}.")
+    return engine
+
+def dispose_engines():
+    """Closes the pooled connections of every cached engine."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+def build_query(connection_params, columns=None, order_by=None, where=None):
+    """
+    Builds the SELECT statement for a configured table.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters with the 'table' to read, optionally schema qualified.
+    - columns: Columns to select, or None for all columns.
+    - order_by: Columns to sort by, optional.
+    - where: Filter clause, optional, e.g. one of partition_filters.
+
+    Returns:
+    - SQLAlchemy Select; column names are quoted as the dialect requires when it is compiled
+    """
+    schema, _, table_name = connection_params['table'].rpartition('.')
+    source = table(table_name, schema=schema or None)
+
+    if columns is None:
+        query = select(literal_column('*')).select_from(source)
+    else:
+        query = select(*[column(name) for name in columns]).select_from(source)
+
+    if where is not None:
+        query = query.where(where)
+    if order_by:
+        query = query.order_by(*[column(name) for name in order_by])
+    return query
+
+def loan_id_is_integer(connection_params):
+    """Whether the LOAN_ID column of the configured table has an integer type."""
+    schema, _, table_name = connection_params['table'].rpartition('.')
+    columns = inspect(create_db_engine(connection_params)).get_columns(table_name, schema=schema or None)
+    return any(col['name'].upper() == 'LOAN_ID' and isinstance(col['type'], Integer) for col in columns)
+
+def sampling_filter(connection_params, sampling):
+    """
+    Compiles a tmm1_data.sampling_config into a filter on the configured table, so the database only
+    returns the sampled loans. Selects the same loans as tmm1_data.sample_loans. The hash is computed
+    in SQL only for an integer LOAN_ID column; alphanumeric loan IDs are hashed differently in memory
+    (see tmm1_data.loan_hash), so for them only the term filter runs in the database and the model
+    samples the rows it reads.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters with the 'table' to read.
+    - sampling: Output of tmm1_data.sampling_config.
+
+    Returns:
+    - SQLAlchemy clause, or None when every loan is kept
+    """
+    from backend.models.tmm1_data import HASH_MODULUS, HASH_MULTIPLIER, sample_threshold
+
+    clauses = []
+    if sampling['fraction'] < 1 and not loan_id_is_integer(connection_params):
+        logging.info("LOAN_ID is not an integer column, loans are sampled in memory")
+    elif sampling['fraction'] < 1:
+        # Evaluated in BIGINT, the product stays below 2**61. The first modulo is shifted into [0, P) for
+        # dialects where the modulo of a negative value is negative
+        loan_id = cast(column('LOAN_ID'), BigInteger)
+        reduced = (loan_id % HASH_MODULUS + HASH_MODULUS) % HASH_MODULUS
+        seeded = (reduced + sampling['seed'] % HASH_MODULUS) % HASH_MODULUS
+        loan_hash = seeded * HASH_MULTIPLIER % HASH_MODULUS
+        clauses.append(loan_hash < sample_threshold(sampling['fraction']))
+
+    if sampling['orig_terms']:
+        # Loans with any row of a wanted term, as in the in-memory filter
+        schema, _, table_name = connection_params['table'].rpartition('.')
+        term_rows = table(table_name, column('LOAN_ID'), column('ORIG_TERM'), schema=schema or None).alias('term_rows')
+        term_loans = select(term_rows.c.LOAN_ID).where(term_rows.c.ORIG_TERM.in_(sampling['orig_terms']))
+        clauses.append(column('LOAN_ID').in_(term_loans))
+
+    return and_(*clauses) if clauses else None
+
+def db_handler(connection_params, columns=None, sampling=None):
     """
     Connects to the client's database, executes a query, and fetches data as a DataFrame.
     
     Parameters:
     - connection_params: Dictionary of connection parameters (host, port, username, password, database_name, engine, etc.)
+    - columns: Columns to read when no 'query' is configured, e.g. tmm1_data.required_columns. Defaults to all columns.
+    - sampling: tmm1_data.sampling_config to apply in the generated query, optional.
     
     Returns:
     - Data as a pandas DataFrame
     """
-    # Define the engine format for each database type
-    engine_format = {
-        "postgresql": "postgresql://{user}:{password}@{host}:{port}/{database}",
-        "mysql": "mysql+pymysql://{user}:{password}@{host}:{port}/{database}",
-        "oracle": "oracle+oracledb://{user}:{password}@{host}:{port}/{database}",
-        "mssql": "mssql+pyodbc://{user}:{password}@{host}:{port}/{database}?driver=ODBC+Driver+17+for+SQL+Server",
-        "sqlite": "sqlite:///{database}"  # SQLite does not require host/port/user/password
-    }
-
     db_type = connection_params['engine']
-    logging.debug(f"Database type detected: {db_type}")
 
     try:
-        if db_type not in engine_format:
-            logging.error(f"Unsupported database type: {db_type}")
-            raise ValueError(f"Unsupported database type: {db_type}")
-
-        # Format the engine string based on connection parameters
-        engine_string = engine_format[db_type].format(
-            user=connection_params.get('username', ''),
-            password=connection_params.get('password', ''),
-            host=connection_params.get('host', ''),
-            port=connection_params.get('port', ''),
-            database=connection_params.get('database_name', ''),
-            ssl_mode=connection_params.get('ssl_mode', 'disable'),
-            connect_timeout=connection_params.get('connect_timeout', 10)
-        )
-        logging.debug(f"Engine string created: {engine_string}")
-
-        # Create the SQLAlchemy engine
-        engine = create_engine(engine_string)
-        logging.info("SQLAlchemy engine created successfully.")
+        # The term filter and loan sample run in the database, a configured query is sampled in memory
+        where = None
+        if sampling and connection_params.get('query') is None:
+            where = sampling_filter(connection_params, sampling)
+
+        # Large tables are read over several connections, one bounded query per partition
+        if connection_params.get('partitioning'):
+            return db_partitioned_handler(connection_params, columns, where)
+
+        engine = create_db_engine(connection_params)
 
         # Execute the query and fetch data into a DataFrame
-        query = connection_params.get('query', f"SELECT * FROM {connection_params['table']}")
+        query = connection_params.get('query')
+        if query is None:
+            query = build_query(connection_params, columns, where=where)
         logging.debug(f"Executing query: {query}")
         start_time = time.time()  # Start timing
         data = pd.read_sql(query, engine)
@@ -65,3 +197,236 @@ def db_handler(connection_params):
     except Exception as e:
         logging.error(f"An error occurred while fetching data from {db_type}: {e}")
         return None
+
+def column_bounds(connection_params, column_name):
+    """Returns the minimum and maximum of a column of the configured table."""
+    schema, _, table_name = connection_params['table'].rpartition('.')
+    source = table(table_name, schema=schema or None)
+    bounds_query = select(func.min(column(column_name)), func.max(column(column_name))).select_from(source)
+
+    with create_db_engine(connection_params).connect() as conn:
+        return tuple(conn.execute(bounds_query).one())
+
+def partition_filters(connection_params):
+    """
+    Returns one filter clause per partition of connection_params['partitioning']:
+    - column: Column to partition on, e.g. LOAN_ID or ACT_PERIOD.
+    - count: Number of partitions.
+    - method: 'hash' (default) splits an integer column by its value modulo count, 'range' splits the
+      column's [min, max] interval into count equal ranges.
+
+    Every row matches exactly one filter.
+    """
+    partitioning = connection_params['partitioning']
+    partition_column = column(partitioning['column'])
+    count = int(partitioning['count'])
+    method = partitioning.get('method', 'hash')
+
+    if count < 1:
+        raise ValueError("partitioning.count must be at least 1")
+
+    if method == 'hash':
+        # Shifted into [0, count) for dialects where the modulo of a negative value is negative
+        bucket = (partition_column % count + count) % count
+        filters = [bucket == partition for partition in range(count)]
+
+    elif method == 'range':
+        lower, upper = column_bounds(connection_params, partitioning['column'])
+        if lower is None:
+            # Empty table, or only NULLs
+            return [true()]
+        edges = [lower + (upper - lower) * partition / count for partition in range(1, count)]
+        if not edges:
+            filters = [partition_column.isnot(None)]
+        else:
+            filters = [partition_column < edges[0]]
+            filters += [and_(partition_column >= low, partition_column < high) for low, high in zip(edges, edges[1:])]
+            filters.append(partition_column >= edges[-1])
+
+    else:
+        raise ValueError(f"Unsupported partitioning method: {method}")
+
+    # Rows with a NULL partition value match no comparison, they are read with the first partition
+    filters[0] = or_(filters[0], partition_column.is_(None))
+    return filters
+
+def partition_queries(connection_params, columns=None, order_by=None, where=None):
+    """Returns the bounded SELECT of every partition, see partition_filters, with an optional extra filter."""
+    if connection_params.get('query'):
+        raise ValueError("Partitioned reads need a 'table', a configured 'query' can not be partitioned")
+    return [
+        build_query(connection_params, columns, order_by,
+                    where=partition_filter if where is None else and_(partition_filter, where))
+        for partition_filter in partition_filters(connection_params)
+    ]
+
+def partition_workers(connection_params, partitions):
+    return int(connection_params['partitioning'].get('workers', partitions))
+
+def db_partitioned_handler(connection_params, columns=None, where=None):
+    """
+    Reads the configured table with one query per partition, run concurrently on a thread pool.
+    Each query holds one pooled connection, so pool_size + max_overflow should cover the workers.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters with 'partitioning' (see partition_filters).
+    - columns: Columns to read. Defaults to all columns.
+    - where: Extra filter of every partition, e.g. sampling_filter.
+
+    Returns:
+    - Data as a pandas DataFrame, partitions concatenated in order
+    """
+    queries = partition_queries(connection_params, columns, where=where)
+    engine = create_db_engine(connection_params)
+    workers = partition_workers(connection_params, len(queries))
+
+    def read_partition(partition):
+        partition_start = time.time()
+        data = pd.read_sql(queries[partition], engine)
+        logging.info(f"Partition {partition + 1}/{len(queries)}: {len(data)} rows in {time.time() - partition_start:.2f} seconds")
+        return data
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-partition') as executor:
+        partitions = list(executor.map(read_partition, range(len(queries))))
+
+    data = pd.concat(partitions, ignore_index=True)
+    logging.info(f"Read {len(data)} rows from {len(queries)} partitions with {workers} workers in {time.time() - start_time:.2f} seconds")
+    return data
+
+def db_partition_chunks(connection_params, columns=None, chunksize=None, order_by=None, where=None, prefetch=2):
+    """
+    Streams every partition concurrently and yields their chunks partition by partition, so rows of a
+    partition stay together. Each partition buffers at most prefetch chunks ahead of the consumer.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters with 'partitioning' (see partition_filters).
+    - columns: Columns to read. Defaults to all columns.
+    - chunksize: Rows per chunk. Defaults to connection_params['chunksize'].
+    - order_by: Columns to sort each partition by, optional.
+    - where: Extra filter of every partition, e.g. sampling_filter.
+    - prefetch: Chunks each partition reads ahead.
+
+    Yields:
+    - pandas DataFrame chunks
+    """
+    queries = partition_queries(connection_params, columns, order_by, where)
+    workers = partition_workers(connection_params, len(queries))
+    buffers = [queue.Queue(maxsize=prefetch) for _ in queries]
+    stop = threading.Event()
+    finished = object()
+
+    def put(partition, item):
+        # Gives up when the consumer has stopped, instead of blocking on a full buffer
+        while not stop.is_set():
+            try:
+                buffers[partition].put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def stream_partition(partition):
+        try:
+            partition_params = dict(connection_params, query=queries[partition])
+            for chunk in db_chunks(partition_params, chunksize=chunksize):
+                if not put(partition, chunk):
+                    return
+            put(partition, finished)
+        except Exception as e:
+            put(partition, e)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-partition')
+    try:
+        for partition in range(len(queries)):
+            executor.submit(stream_partition, partition)
+
+        for partition in range(len(queries)):
+            while True:
+                item = buffers[partition].get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            logging.info(f"Partition {partition + 1}/{len(queries)} streamed")
+    finally:
+        # Release the producers when the consumer stops early
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def db_chunks(connection_params, columns=None, chunksize=None, order_by=None, where=None):
+    """
+    Streams a query result as DataFrame chunks through a server-side cursor, so only one chunk of
+    rows is held in client memory.
+
+    Parameters:
+    - connection_params: Dictionary of connection parameters, with an optional 'chunksize'.
+    - columns: Columns to read when no 'query' is configured. Defaults to all columns.
+    - chunksize: Rows per chunk. Defaults to connection_params['chunksize'].
+    - order_by: Columns to sort the generated query by, optional.
+    - where: Filter of the generated query, optional.
+
+    Yields:
+    - pandas DataFrame chunks
+    """
+    if chunksize is None:
+        chunksize = int(connection_params.get('chunksize', DEFAULT_CHUNKSIZE))
+
+    query = connection_params.get('query')
+    if query is None:
+        query = build_query(connection_params, columns, order_by, where)
+    elif isinstance(query, str):
+        query = text(query)
+    logging.debug(f"Streaming query: {query}")
+
+    engine = create_db_engine(connection_params)
+    rows_read = 0
+    start_time = time.time()
+
+    # stream_results asks the driver for a server-side cursor (psycopg2 named cursors, PyMySQL SSCursor,
+    # oracledb and pyodbc fetch incrementally); SQLite steps through the result as rows are fetched
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        for chunk_number, chunk in enumerate(pd.read_sql(query, conn, chunksize=chunksize), start=1):
+            rows_read += len(chunk)
+            logging.info(f"DB chunk {chunk_number}: {len(chunk)} rows ({rows_read} rows read)")
+            yield chunk
+
+    logging.info(f"Streamed {rows_read} rows in {time.time() - start_time:.2f} seconds")
+
+def db_chunk_handler(config_file, chunksize=None):
+    """
+    Streaming counterpart of db_handler for the chunked read mode.
+    The generated query is ordered by LOAN_ID and ACT_PERIOD, as the chunked model requires;
+    a configured 'query' has to order its rows itself. With 'partitioning' on LOAN_ID the partitions
+    are streamed concurrently.
+
+    Parameters:
+    - config_file: Path to the configuration file (JSON format).
+    - chunksize: Rows per chunk. Defaults to connection_details.chunksize.
+
+    Returns:
+    - Generator of DataFrame chunks (see db_chunks) and the data configuration
+    """
+    from backend.models.tmm1_data import required_columns, sampling_config
+
+    with open(config_file, 'r') as config:
+        data_config = json.load(config)
+
+    connection_params = data_config['configuration']['attributes']['connection_details']
+    order_by = ['LOAN_ID', 'ACT_PERIOD']
+    where = None
+    if connection_params.get('query') is None:
+        where = sampling_filter(connection_params, sampling_config(data_config))
+
+    partitioning = connection_params.get('partitioning')
+    if partitioning:
+        # Partitions are yielded one after another, so a loan must not span partitions
+        if partitioning['column'] != 'LOAN_ID':
+            raise ValueError("Chunked reads can only be partitioned on LOAN_ID")
+        chunks = db_partition_chunks(connection_params, columns=required_columns(data_config),
+                                     chunksize=chunksize, order_by=order_by, where=where)
+    else:
+        chunks = db_chunks(connection_params, columns=required_columns(data_config),
+                           chunksize=chunksize, order_by=order_by, where=where)
+    return chunks, data_config
@@ -1,52 +1,214 @@
-from io import StringIO
-from sqlalchemy.exc import SQLAlchemyError
-import psycopg2
+import io
+import logging
+import struct
+import time
+
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
-def db_connection():
-    conn = psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        dbname=os.getenv('DB_NAME', 'credpulse'),
-        user=os.getenv('DB_USER', 'credpulse'),
-        password=os.getenv('DB_PASSWORD', 'credpulse'),
-    )
+# Rows serialized per chunk of the COPY stream
+DEFAULT_CHUNKSIZE = 100000
+# Bind parameters per multi-row INSERT, under the limits of SQLite (32766) and SQL Server (2100)
+MAX_INSERT_PARAMS = 2000
+
+# Binary COPY format, see https://www.postgresql.org/docs/current/sql-copy.html
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+# Microseconds from the Unix epoch to the PostgreSQL epoch (2000-01-01)
+POSTGRES_EPOCH_US = 946684800000000
+
+
+class GeneratorReader(io.RawIOBase):
+    """Read-only file object over a generator of bytes, for drivers that pull COPY data with read()."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        # Current chunk and the read offset into it, a chunk is dropped once it is consumed
+        self.buffer = memoryview(b'')
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while self.offset >= len(self.buffer):
+            try:
+                self.buffer = memoryview(next(self.chunks))
+            except StopIteration:
+                self.buffer = memoryview(b'')
+                self.offset = 0
+                return 0
+            self.offset = 0
+        size = min(len(target), len(self.buffer) - self.offset)
+        target[:size] = self.buffer[self.offset:self.offset + size]
+        self.offset += size
+        return size
+
+
+def frame_chunks(df, chunksize=DEFAULT_CHUNKSIZE):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def csv_copy_chunks(df, chunksize=DEFAULT_CHUNKSIZE):
+    """Yields the frame as COPY CSV bytes, one chunk of rows at a time. Missing values become NULL."""
+    for chunk in frame_chunks(df, chunksize):
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+def binary_column(series):
+    """
+    Returns (big-endian numpy dtype, values, null mask) of a column in PostgreSQL binary COPY format,
+    or (None, text values, null mask) for columns sent as text. The widths follow the column types
+    pandas.to_sql creates.
+    """
+    nulls = series.isna().to_numpy()
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return np.dtype('?'), series.to_numpy(dtype=bool, na_value=False), nulls
+    if pd.api.types.is_integer_dtype(dtype):
+        if dtype.name.lower() in ('int8', 'uint8', 'int16'):
+            wire = np.dtype('>i2')
+        elif dtype.name.lower() in ('uint16', 'int32'):
+            wire = np.dtype('>i4')
+        else:
+            wire = np.dtype('>i8')
+        return wire, series.to_numpy(dtype=np.int64, na_value=0), nulls
+    if pd.api.types.is_float_dtype(dtype):
+        wire = np.dtype('>f4') if dtype.name.lower() == 'float32' else np.dtype('>f8')
+        return wire, series.to_numpy(dtype=np.float64, na_value=0.0), nulls
+    if pd.api.types.is_datetime64_dtype(dtype):
+        microseconds = series.to_numpy(dtype='datetime64[us]').view(np.int64)
+        return np.dtype('>i8'), microseconds - POSTGRES_EPOCH_US, nulls
+
+    return None, series.astype(str).to_numpy(), nulls
+
 
-    return conn
+def binary_copy_chunks(df, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yields the frame in PostgreSQL binary COPY format, one chunk of rows at a time.
+    Chunks with only fixed width columns and no missing values are packed with one numpy structured
+    array; other chunks are packed row by row.
+    """
+    field_count = struct.pack('>h', len(df.columns))
+    yield PGCOPY_HEADER
 
+    for chunk in frame_chunks(df, chunksize):
+        columns = [binary_column(chunk[name]) for name in chunk.columns]
 
-def df_to_db(df = 'df', engine='engine', tableName = 'masterTable'):
-    
-    conn = db_connection()
+        if all(wire is not None and not nulls.any() for wire, _, nulls in columns):
+            fields = [('count', '>i2')]
+            for position, (wire, _, _) in enumerate(columns):
+                fields += [(f'length{position}', '>i4'), (f'value{position}', wire)]
+            rows = np.empty(len(chunk), dtype=fields)
+            rows['count'] = len(columns)
+            for position, (wire, values, _) in enumerate(columns):
+                rows[f'length{position}'] = wire.itemsize
+                rows[f'value{position}'] = values
+            yield rows.tobytes()
+            continue
 
-    # Convert DataFrame to CSV format
-    print('Creating temp file..')
-    buffer = StringIO()
-    df.to_csv(buffer, index=False, header=False)  # Skip headers if the table is pre-created
-    buffer.seek(0)
+        encoded = []
+        for wire, values, nulls in columns:
+            if wire is None:
+                column_fields = [str(value).encode('utf-8') for value in values]
+                encoded.append([
+                    b'\xff\xff\xff\xff' if null else struct.pack('>i', len(field)) + field
+                    for field, null in zip(column_fields, nulls)
+                ])
+            else:
+                packed = values.astype(wire).tobytes()
+                prefix = struct.pack('>i', wire.itemsize)
+                size = wire.itemsize
+                encoded.append([
+                    b'\xff\xff\xff\xff' if null else prefix + packed[row * size:(row + 1) * size]
+                    for row, null in enumerate(nulls)
+                ])
+        yield b''.join(field_count + b''.join(row) for row in zip(*encoded))
 
-    
+    yield PGCOPY_TRAILER
+
+
+def copy_to_postgres(df, engine, tableName, copy_format='csv', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams a DataFrame into an existing PostgreSQL table with COPY ... FROM STDIN over a pooled
+    connection of the engine. Only one chunk of serialized rows is held in memory.
+
+    Parameters:
+    df (pd.DataFrame): Rows to load, with the table's column names.
+    engine (sqlalchemy.Engine): PostgreSQL engine.
+    tableName (str): Target table.
+    copy_format (str): 'csv' or 'binary'.
+    chunksize (int): Rows serialized per chunk.
+    """
+    if copy_format not in ('csv', 'binary'):
+        raise ValueError(f"Unsupported COPY format: {copy_format}")
+
+    quote = engine.dialect.identifier_preparer.quote
+    column_list = ', '.join(quote(str(name)) for name in df.columns)
+    copy_sql = f"COPY {quote(tableName)} ({column_list}) FROM STDIN WITH (FORMAT {copy_format})"
+    chunks = binary_copy_chunks(df, chunksize) if copy_format == 'binary' else csv_copy_chunks(df, chunksize)
+
+    connection = engine.raw_connection()
     try:
-        # Insert data into the table
-        df.head(0).to_sql(tableName, engine, if_exists='replace', index=False)
-
-        # Execute the COPY command to import data
-        with conn.cursor() as cursor:
-            copy_sql = f"COPY {tableName} FROM stdin WITH CSV"
-            cursor.copy_expert(copy_sql, buffer)
-            conn.commit()
-
-        conn.close()
-        print('Importing to database complete..')
-
-    
-    except SQLAlchemyError as e:
-        print(f"Error occurred: {e}")
-        
-        # Handle table creation or other actions
-        print(f"Creating table {tableName}...")
-        df.to_sql(tableName, engine, if_exists='replace', index=False, chunksize=10000)
-        print(f"Table {tableName} created and data inserted.")
+        with connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, GeneratorReader(chunks))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        # Returns the connection to the pool
+        connection.close()
+
+
+def insert_chunks(df, engine, tableName, chunksize=DEFAULT_CHUNKSIZE):
+    """Appends a DataFrame with multi-row INSERTs, one chunk of rows at a time, in one transaction."""
+    rows_per_insert = max(1, min(chunksize, MAX_INSERT_PARAMS // max(1, len(df.columns))))
+    with engine.begin() as conn:
+        for chunk in frame_chunks(df, chunksize):
+            chunk.to_sql(tableName, conn, if_exists='append', index=False, method='multi', chunksize=rows_per_insert)
+
+
+def df_to_db(df = 'df', engine='engine', tableName = 'masterTable', if_exists='replace', copy_format='csv', chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Bulk loads a DataFrame into a database table through the given engine.
+
+    PostgreSQL engines stream the rows with COPY; other databases, or a failed COPY, use chunked
+    multi-row inserts.
+
+    Parameters:
+    df (pd.DataFrame): Rows to load.
+    engine (sqlalchemy.Engine): Target database.
+    tableName (str): Target table, created from the frame's columns.
+    if_exists (str): 'replace' recreates the table, 'append' adds to it, 'fail' raises if it exists.
+    copy_format (str): 'csv' or 'binary' COPY format.
+    chunksize (int): Rows per streamed chunk.
+
+    Returns:
+    str: Load method used, 'copy' or 'insert'.
+    """
+    start_time = time.time()
+
+    # Creates (or replaces) the table with the frame's column types
+    df.head(0).to_sql(tableName, engine, if_exists=if_exists, index=False)
+
+    method = 'insert'
+    if engine.dialect.name == 'postgresql':
+        try:
+            copy_to_postgres(df, engine, tableName, copy_format, chunksize)
+            method = 'copy'
+        except Exception as e:
+            logging.warning(f"COPY into {tableName} failed, falling back to multi-row inserts: {e}")
+
+    if method == 'insert':
+        insert_chunks(df, engine, tableName, chunksize)
+
+    duration = time.time() - start_time
+    logging.info(f"Loaded {len(df)} rows into {tableName} with {method} in {duration:.2f} seconds "
+                 f"({len(df) / max(duration, 1e-9):.0f} rows/s)")
+    return method
@@ -0,0 +1,296 @@
+# Standard library imports
+import os
+import json
+import logging
+import uuid
+import time
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+# Local imports
+
+# Suffix of the columnar copy written next to a parsed data file
+PARQUET_CACHE_SUFFIX = '.parquet'
+# Schema metadata key of the options a Parquet copy was converted with
+PARQUET_CACHE_METADATA_KEY = 'tmm1_csv_conversion'
+# CSV bytes parsed per record batch while converting, each batch becomes one Parquet row group
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def pyarrow_available():
+    return pa is not None
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet sources, install it with 'pip install pyarrow'")
+
+
+def cache_path(dataFilePath):
+    """Returns the path of the Parquet copy of a data file, stored in the same folder."""
+    return f"{dataFilePath}{PARQUET_CACHE_SUFFIX}"
+
+
+def arrow_type(dtype):
+    """Maps a configured pandas dtype to an Arrow type, or None when pyarrow should infer it."""
+    if str(dtype) in ('str', 'string', 'object'):
+        return pa.string()
+    if str(dtype) == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    try:
+        return pa.from_numpy_dtype(np.dtype(dtype))
+    except (TypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def parquet_source(file_path):
+    """
+    Returns what the Parquet reader opens for a file. Parquet needs random access, so a compressed
+    Parquet file is decompressed into memory instead of to disk.
+    """
+    from backend.ingestion import compression
+
+    file_compression = compression.compression_of(file_path)
+    if file_compression is None:
+        return file_path
+    if file_compression in ('gzip', 'zstd'):
+        with pa.input_stream(file_path, compression=file_compression) as stream:
+            return pa.BufferReader(stream.read_buffer())
+    with compression.open_data_file(file_path) as stream:
+        return pa.BufferReader(stream.read())
+
+
+def parquet_columns(file_path):
+    """Returns the column names stored in a Parquet file, or in an opened parquet_source."""
+    source = parquet_source(file_path) if isinstance(file_path, str) else file_path
+    return pq.read_schema(source).names
+
+
+def read_parquet(file_path, columns=None):
+    """
+    Loads a Parquet file into a DataFrame with the multithreaded, memory mapped Arrow reader.
+
+    Parameters:
+    file_path (str): Path of the Parquet file.
+    columns (list): Columns to load, columns the file does not have are skipped. None loads all.
+
+    Returns:
+    pd.DataFrame: Loaded data.
+    """
+    require_pyarrow()
+
+    start_time = time.time()
+    # A compressed file is decompressed once, for the schema and the table
+    source = parquet_source(file_path)
+    if columns is not None:
+        available = set(parquet_columns(source))
+        columns = [column for column in columns if column in available]
+
+    # Only files on disk can be memory mapped, a decompressed file already is in memory
+    table = pq.read_table(source, columns=columns, memory_map=isinstance(source, str), use_threads=True)
+    df = table.to_pandas()
+    logging.info(f"Loaded {df.shape} from Parquet {file_path} in {time.time() - start_time:.2f} seconds")
+    return df
+
+
+def csv_input_stream(dataFilePath):
+    """Opens a CSV file for the Arrow reader, gzip and zstd are decompressed natively by Arrow."""
+    from backend.ingestion import compression
+
+    file_compression = compression.compression_of(dataFilePath)
+    if file_compression in ('gzip', 'zstd'):
+        return pa.input_stream(dataFilePath, compression=file_compression)
+    if file_compression is None:
+        return dataFilePath
+    return compression.open_data_file(dataFilePath)
+
+
+def conversion_options(data_config):
+    """
+    Returns (column names, delimiter, Arrow column types) a CSV file is converted with. Column types
+    come from configuration.attributes.dtype, except for the columns the preprocessor rewrites first
+    (see csv_source_handler.parse_dtypes).
+    """
+    from backend.ingestion.csv_source_handler import parse_dtypes
+
+    attributes = data_config['configuration']['attributes']
+    column_names = attributes.get('names', "None")
+
+    column_types = {}
+    for column, dtype in parse_dtypes(data_config).items():
+        column_type = arrow_type(dtype)
+        if column_type is not None:
+            column_types[column] = column_type
+
+    return (column_names if column_names != "None" else None), attributes['delimiter'], column_types
+
+
+def conversion_signature(data_config):
+    """The conversion options as stored in the Parquet copy's metadata, see is_cache_fresh."""
+    column_names, delimiter, column_types = conversion_options(data_config)
+    return {
+        'names': column_names,
+        'delimiter': delimiter,
+        'column_types': {column: str(column_type) for column, column_type in sorted(column_types.items())}
+    }
+
+
+def csv_header(dataFilePath, read_options, parse_options):
+    """Returns the column names of a CSV file, parsing only its first block."""
+    source = csv_input_stream(dataFilePath)
+    try:
+        return pa_csv.open_csv(source, read_options=read_options, parse_options=parse_options).schema.names
+    finally:
+        if not isinstance(source, str):
+            source.close()
+
+
+def csv_to_parquet(data_config, dataFilePath, parquet_path, columns=None):
+    """
+    Streams a CSV file through the multithreaded Arrow reader into a Parquet file, one record batch
+    at a time, so memory stays bounded by the reader's block size. Compressed files are decompressed
+    while they are parsed. The conversion options and the kept columns are stored in the file's
+    metadata, for is_cache_fresh.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+    dataFilePath (str): Path of the CSV file.
+    parquet_path (str): Where to write the Parquet file.
+    columns (list): Columns to convert, columns the file does not have are skipped. None converts all.
+
+    Returns:
+    str: parquet_path
+    """
+    require_pyarrow()
+
+    column_names, delimiter, column_types = conversion_options(data_config)
+    read_options = pa_csv.ReadOptions(use_threads=True, column_names=column_names, block_size=CSV_BLOCK_SIZE)
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+
+    include_columns = None
+    if columns is not None:
+        available = column_names or csv_header(dataFilePath, read_options, parse_options)
+        include_columns = [column for column in available if column in set(columns)]
+    signature = {**conversion_signature(data_config), 'all_columns': include_columns is None}
+
+    start_time = time.time()
+    rows = 0
+    # Written under a temporary name so concurrent runs never read a partial file
+    temp_path = f"{parquet_path}.{uuid.uuid4().hex}.tmp"
+    source = csv_input_stream(dataFilePath)
+    try:
+        reader = pa_csv.open_csv(
+            source,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, include_columns=include_columns)
+        )
+        schema = reader.schema.with_metadata({PARQUET_CACHE_METADATA_KEY: json.dumps(signature)})
+        with pq.ParquetWriter(temp_path, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(temp_path, parquet_path)
+    finally:
+        if not isinstance(source, str):
+            source.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    logging.info(f"Converted {dataFilePath} to Parquet ({rows} rows, {len(schema)} columns) "
+                 f"in {time.time() - start_time:.2f} seconds")
+    return parquet_path
+
+
+def is_cache_fresh(parquet_path, dataFilePath, columns=None, data_config=None):
+    """
+    Checks that a Parquet copy exists, is newer than its data file and has the columns needed. With a
+    data_config, the copy must also have been converted with its current names, delimiter and types.
+    """
+    if not os.path.exists(parquet_path):
+        return False
+    if os.path.getmtime(parquet_path) < os.path.getmtime(dataFilePath):
+        logging.info(f"Parquet copy {parquet_path} is older than its data file")
+        return False
+
+    schema = pq.read_schema(parquet_path)
+    stored = (schema.metadata or {}).get(PARQUET_CACHE_METADATA_KEY.encode())
+    stored = json.loads(stored) if stored is not None else {}
+    if data_config is not None:
+        expected = json.loads(json.dumps(conversion_signature(data_config)))
+        if {key: stored.get(key) for key in expected} != expected:
+            logging.info(f"Parquet copy {parquet_path} was converted with other column types or options")
+            return False
+    if columns is None:
+        if not stored.get('all_columns', True):
+            logging.info(f"Parquet copy {parquet_path} holds only some of the columns")
+            return False
+    else:
+        missing = set(columns) - set(schema.names)
+        if missing:
+            logging.info(f"Parquet copy {parquet_path} is missing columns {sorted(missing)}")
+            return False
+    return True
+
+
+def cached_csv_read(data_config, dataFilePath, columns=None):
+    """
+    Reads a CSV file through its Parquet copy, converting it on first read.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+    dataFilePath (str): Path of the CSV file.
+    columns (list): Columns to load, None loads all.
+
+    Returns:
+    pd.DataFrame: Loaded data.
+    """
+    parquet_path = cache_path(dataFilePath)
+    if not is_cache_fresh(parquet_path, dataFilePath, columns, data_config):
+        csv_to_parquet(data_config, dataFilePath, parquet_path, columns)
+    return read_parquet(parquet_path, columns)
+
+
+def parquet_handler(config_file, dataFilePath=None, all_columns=False):
+    """
+    Loads a Parquet data source.
+
+    Parameters:
+    config_file (str): Path to the configuration file (JSON format).
+    dataFilePath (str): Path to the Parquet file, defaults to configuration.attributes.filepath.
+    all_columns (bool): Load every column instead of tmm1_data.required_columns.
+
+    Returns:
+    tuple: DataFrame (None on error) and the data configuration.
+    """
+    from backend.ingestion.csv_source_handler import resolve_data_path
+    from backend.models.tmm1_data import required_columns
+
+    df = None
+    data_config = {}
+
+    try:
+        with open(config_file, 'r') as config:
+            data_config = json.load(config)
+
+        dataFilePath = resolve_data_path(data_config, dataFilePath)
+        logging.info("Reading Parquet... %s", dataFilePath)
+        df = read_parquet(dataFilePath, None if all_columns else required_columns(data_config))
+
+    except FileNotFoundError:
+        logging.error("Error: The file %s was not found.", dataFilePath)
+    except json.JSONDecodeError as e:
+        logging.error("Error: Failed to parse the configuration file. Invalid JSON: %s", e)
+    except Exception as e:
+        logging.error("An unexpected error occurred: %s", e)
+
+    return df, data_config
@@ -1,13 +1,14 @@
 import os
+import json
 from datetime import datetime
 import logging
 
 # Local imports
-from backend import connect, config
-from backend.utils import get_absolute_filepath, file_type_handler, export_output, get_test_report_config
+from backend import connect, config, result_cache
+from backend.utils import get_absolute_filepath, file_type_handler, chunked_source_handler, export_output, get_test_report_config
 from backend.data_handler import preprocessor
 from backend.ingestion import df_to_db
-from backend.models import tmm1
+from backend.models import tmm1, tmm1_chunked, tmm1_tape
 from backend.db.mongo import save_report
 
 # Configure logging
@@ -20,7 +21,50 @@ logging.basicConfig(
     ]
 )
 
-def main(configFilePath = None, dataFilePath = None, config_type='db'):
+def get_result_key(configFilePath, dataFilePath=None):
+    """Returns the result cache key of a config and its data, or None when it can not be cached."""
+    try:
+        with open(configFilePath, 'r') as f:
+            data_config = json.load(f)
+
+        if data_config['configuration']['source'].lower() != 'db':
+            dataFilePath = get_absolute_filepath(dataFilePath or data_config['configuration']['attributes']['filepath'])
+
+        data_fingerprint = result_cache.source_fingerprint(data_config, dataFilePath)
+        if data_fingerprint is None:
+            return None
+        return result_cache.cache_key(data_fingerprint, data_config)
+
+    except Exception as e:
+        logging.warning(f"Could not compute the result cache key, running without cache: {e}")
+        return None
+
+def read_mode(configFilePath):
+    """Returns configuration.attributes.read_mode of a CSV or DB config: 'full' (default) or 'chunked'."""
+    try:
+        with open(configFilePath, 'r') as f:
+            configuration = json.load(f)['configuration']
+    except Exception:
+        return 'full'
+
+    if configuration.get('source', '').lower() not in ('csv', 'db'):
+        return 'full'
+    return configuration.get('attributes', {}).get('read_mode', 'full')
+
+def tape_file_path(configFilePath, dataFilePath=None):
+    """Returns (data file path, tape path) of a file source with configuration.attributes.tape_cache, else None."""
+    try:
+        with open(configFilePath, 'r') as f:
+            data_config = json.load(f)
+        if not tmm1_tape.use_tape_cache(data_config):
+            return None
+        dataFilePath = get_absolute_filepath(dataFilePath or data_config['configuration']['attributes']['filepath'])
+        return dataFilePath, tmm1_tape.tape_path(dataFilePath, data_config)
+    except Exception as e:
+        logging.warning(f"Could not resolve the tape path, reading the source: {e}")
+        return None
+
+def main(configFilePath = None, dataFilePath = None, config_type='db', use_cache=True):
     logging.info("Starting the main function.")
     
     # Get test configuration based on the specified type
@@ -33,29 +77,63 @@ def main(configFilePath = None, dataFilePath = None, config_type='db'):
     
     logging.info(f"Using configuration file: {configFilePath}")
 
-    # Check file for type of source, and import it into a dataframe
-    df, data_config = file_type_handler(configFilePath, dataFilePath)
-    if df is None:
-        logging.error("DataFrame is None. Exiting main function.")
-        return "Error"
+    # Return the stored result when this data and config were already modelled
+    cache = result_cache.ResultCache()
+    cache_key = get_result_key(configFilePath, dataFilePath) if use_cache else None
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logging.info("Returning cached model result.")
+            return {
+                "data": cached,
+                "cache_key": cache_key
+            }
+
+    # Preprocessed data kept as a memory mapped tape, reopened by later runs instead of re-parsed
+    tape = tape_file_path(configFilePath, dataFilePath)
+    if tape is not None and tmm1_tape.is_tape_fresh(tape[1], tape[0]):
+        with open(configFilePath, 'r') as f:
+            data_config = json.load(f)
+        logging.info(f"Running model on tape {tape[1]}")
+        data = tmm1.run_model(tape[1], data_config)
+        logging.info("Model run completed.")
+
+    # Streaming mode: chunks go through preprocessing into the chunked calculator one at a time
+    elif read_mode(configFilePath) == 'chunked':
+        chunks, data_config = chunked_source_handler(configFilePath, dataFilePath)
+        preprocessed_chunks = (preprocessor.preprocess(chunk, data_config) for chunk in chunks)
+        data = tmm1_chunked.run_model_chunked(preprocessed_chunks, data_config)
+        logging.info("Chunked model run completed.")
+    else:
+        # Check file for type of source, and import it into a dataframe
+        df, data_config = file_type_handler(configFilePath, dataFilePath)
+        if df is None:
+            logging.error("DataFrame is None. Exiting main function.")
+            return "Error"
     
-    logging.info("DataFrame loaded successfully.")
+        logging.info("DataFrame loaded successfully.")
 
-    # Creating a connection with the credpulse database
-    engine, conn = connect.connect()
-    logging.info("CredPulse Database connection established.")
+        # Creating a connection with the credpulse database
+        engine, conn = connect.connect()
+        logging.info("CredPulse Database connection established.")
 
-    # Saving the df to db
-    # logging.info('Saving DataFrame to database...')
-    # df_to_db.df_to_db(df, engine, tableName='test_table')
+        # Saving the df to db
+        # logging.info('Saving DataFrame to database...')
+        # df_to_db.df_to_db(df, engine, tableName='test_table')
 
-    # Data Preprocessing
-    preprocessed_data = preprocessor.preprocess(df, data_config)
-    logging.info("Data preprocessing completed.")
+        # Data Preprocessing
+        preprocessed_data = preprocessor.preprocess(df, data_config)
+        logging.info("Data preprocessing completed.")
 
-    # Running Model
-    data = tmm1.run_model(preprocessed_data, data_config)
-    logging.info("Model run completed.")
+        if tape is not None:
+            try:
+                tmm1_tape.write_tape(preprocessed_data, tape[1], data_config)
+            except Exception as e:
+                logging.warning(f"Could not write tape {tape[1]}: {e}")
+
+        # Running Model
+        data = tmm1.run_model(preprocessed_data, data_config)
+        logging.info("Model run completed.")
 
     # Save local files if needed
     output = export_output(
@@ -65,9 +143,13 @@ def main(configFilePath = None, dataFilePath = None, config_type='db'):
     )
     logging.info("Output files saved successfully.")
 
+    if cache_key is not None and output is not None:
+        cache.put(cache_key, output)
+
     # Return both the MongoDB ID and the output data
     return {
-        "data": output
+        "data": output,
+        "cache_key": cache_key
     }
 
 if __name__ == "__main__":
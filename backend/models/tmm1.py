@@ -5,10 +5,9 @@ import os
 from dotenv import load_dotenv
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 # Local imports
-from backend.models import tmm1_data
+from backend.models import tmm1_data, tmm1_charts
 
 # Load environment variables
 load_dotenv()
@@ -19,37 +18,173 @@ OUTPUT_FILE = os.getenv('TMM1_OUTPUT_FILE', 'TMM1_360_bucket.csv')
 
 
 # Take a specific dataset from the data as required (ToDo: Add to Utils)
-def data_sampler(df):
-    print("Current shape of data: ", df.shape)
-    
-    # STEP 1: Filter by loan term - keep all records for loans with desired terms
-    print("Unique Loan Terms: ", df['ORIG_TERM'].unique())
-    values_to_keep = [360]  # specify the values you want to keep
-    
-    # Get loan IDs where the loan term matches our criteria
-    valid_loan_ids = df[df['ORIG_TERM'].isin(values_to_keep)]['LOAN_ID'].unique()
-    # Filter to keep all records for these loan IDs
-    df = df[df['LOAN_ID'].isin(valid_loan_ids)]
-    
-    print("Loan Terms considered: ", df['ORIG_TERM'].unique())
+def data_sampler(df, data_config=None):
+    """
+    Keeps the loans with the configured terms and a deterministic hash sample of their loan IDs,
+    see tmm1_data.sampling_config. Sources that already applied the sample while reading lose no
+    further rows here.
+    """
     print("Current shape of data: ", df.shape)
+    sampling = tmm1_data.sampling_config(data_config or {'configuration': {}})
 
-    # STEP 2: Sample the filtered data
-    print("Sampling data: ", df.shape, end='\n\n')
-    
-    # Get unique Loan IDs and sample 50% of them
-    loan_ids = df['LOAN_ID'].unique()
-    sampled_loan_ids = pd.Series(loan_ids).sample(frac=0.5, random_state=42)
+    print("Unique Loan Terms: ", df['ORIG_TERM'].unique())
+    print(f"Loan Terms considered: {sampling['orig_terms']}, sampling {sampling['fraction']:.0%} of loans")
 
-    # Filter dataframe to only include sampled Loan IDs
-    sampled_df = df[df['LOAN_ID'].isin(sampled_loan_ids)]
+    sampled_df = tmm1_data.sample_loans(df, sampling)
     print("Sampled data's shape: ", sampled_df.shape)
 
     return sampled_df
 
+# Bucket state helpers shared by the feature engineering modes
+def get_charged_off_status(bucket_map):
+    # Get the charged off status name from config, fallback to last status if no charged off found
+    return next((v for v in bucket_map.values() if 'charge' in v.lower() or 'default' in v.lower()),
+                list(bucket_map.values())[-1])
+
+
+def bucket_states(bucket_map):
+    # Ordered list of unique bucket names, the position in this list is the state code
+    return list(dict.fromkeys(bucket_map.values()))
+
+
+def encode_states(status, bucket_map):
+    """
+    Encodes DLQ_STATUS values as small integer state codes ordered by bucket_states.
+
+    Parameters:
+    status (pd.Series): Raw DLQ_STATUS values.
+    bucket_map (dict): Mapping of DLQ_STATUS codes (as strings) to bucket names.
+
+    Returns:
+    np.ndarray: int16 state codes, -1 where the status is not in the bucket map.
+    """
+    states = bucket_states(bucket_map)
+    key_codes = np.array([states.index(v) for v in bucket_map.values()], dtype=np.int16)
+    status = pd.Series(status)
+
+    # Integer statuses are looked up directly instead of being cast to strings row by row
+    int_keys = all(k.lstrip('-').isdigit() and str(int(k)) == k for k in bucket_map.keys())
+    if int_keys and pd.api.types.is_integer_dtype(status.dtype):
+        keys = pd.Index([int(k) for k in bucket_map.keys()])
+    else:
+        keys = pd.Index(list(bucket_map.keys()))
+        status = status.astype(str)
+
+    positions = keys.get_indexer(status)
+    return np.where(positions >= 0, key_codes[positions], -1).astype(np.int16)
+
+
+def next_state_codes(loan_ids, codes):
+    """
+    Builds the next-period state code of every row in a single pass over loan-sorted rows.
+
+    Matches groupby('LOAN_ID').shift(-1) forward filled within each loan: the last row of a loan
+    (or a row followed by an unmapped status) takes the previous row's next state. The fill never
+    crosses into another loan, so the result of a loan does not depend on its neighbours.
+
+    Parameters:
+    loan_ids (np.ndarray): LOAN_ID of every row, rows of a loan must be contiguous.
+    codes (np.ndarray): State codes from encode_states.
+
+    Returns:
+    np.ndarray: Next state codes, -1 where nothing could be filled.
+    """
+    n = len(codes)
+    next_codes = np.full(n, -1, dtype=codes.dtype)
+    loan_start = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        same_loan = loan_ids[1:] == loan_ids[:-1]
+        next_codes[:-1] = np.where(same_loan, codes[1:], -1)
+        # Index of the first row of every row's loan
+        loan_start[1:] = np.where(same_loan, 0, np.arange(1, n))
+        np.maximum.accumulate(loan_start, out=loan_start)
+
+    # Forward fill the gaps with the last known next state of the same loan
+    last_valid = np.where(next_codes >= 0, np.arange(n), -1)
+    np.maximum.accumulate(last_valid, out=last_valid)
+    filled = (last_valid >= loan_start) & (last_valid >= 0)
+    return np.where(filled, next_codes[np.maximum(last_valid, 0)], -1).astype(codes.dtype)
+
+
+def option_config(configuration, key):
+    """
+    Returns the settings of an optional model feature, which the configuration turns on with
+    true or a (possibly empty) dict of settings: {} for true, the dict itself, or None when off.
+    """
+    value = configuration.get(key)
+    if value is None or value is False:
+        return None
+    if value is True:
+        return {}
+    if isinstance(value, dict):
+        return value
+    raise ValueError(f"configuration.{key} must be true, false or a dict of settings, got {value!r}")
+
+
+def feature_engg(df, data_config):
+    # Feature engineering mode can be selected from config, defaults to the vectorized engine
+    mode = data_config['configuration'].get('feature_engg_mode', 'vectorized')
+    print("Feature engineering mode: ", mode)
+
+    if mode == 'legacy':
+        return feature_engg_legacy(df, data_config)
+    elif mode == 'vectorized':
+        return feature_engg_vectorized(df, data_config)
+    else:
+        raise ValueError(f"Invalid feature_engg_mode '{mode}'. Use 'vectorized' or 'legacy'.")
+
+
+#   Vectorized Feature Engineering
+#   Same output columns as feature_engg_legacy, but the buckets are encoded as integer codes once
+#   and all derived columns are built with columnar operations
+def feature_engg_vectorized(df, data_config):
+    df_feature = tmm1_data.prepare(df, data_config)
+    print(df_feature.shape, "\n")
+
+    # Get bucket configuration
+    bucket_map = data_config['configuration']['loan_buckets']['bucket_map']
+
+    return add_state_features(df_feature, bucket_map)
+
+
+def add_state_features(df_feature, bucket_map):
+    """
+    Adds the derived status and charge-off columns to prepared, loan-sorted data.
+
+    Parameters:
+    df_feature (pd.DataFrame): Output of tmm1_data.prepare.
+    bucket_map (dict): Bucket map from the configuration.
+
+    Returns:
+    pd.DataFrame: df_feature with the feature_engg columns added.
+    """
+    states = bucket_states(bucket_map)
+    charged_off_code = states.index(get_charged_off_status(bucket_map))
+
+    print("Encoding Delq Buckets...")
+    codes = encode_states(df_feature['DLQ_STATUS'], bucket_map)
+    next_codes = next_state_codes(df_feature['LOAN_ID'].to_numpy(), codes)
+    charged_off = codes == charged_off_code
+
+    # Decoding through a lookup table, code -1 picks the trailing NaN
+    state_names = np.array(states + [np.nan], dtype=object)
+
+    print("Creating Status Columns...")
+    df_feature['DAYS_PAST_DUE'] = state_names[codes]
+    df_feature['DERIVED_LOAN_STATUS'] = state_names[codes]
+    df_feature['NEXT_DERIVED_LOAN_STATUS'] = state_names[np.where(charged_off, charged_off_code, next_codes)]
+    df_feature['NEXT_DAYS_PAST_DUE'] = state_names[next_codes]
+
+    print("Creating 'Charged off Amount' Column...")
+    df_feature['CHARGE_OFF_AMT'] = df_feature['CURRENT_UPB'].where(charged_off, 0)
+    df_feature['CURRENT_UPB'] = df_feature['CURRENT_UPB'].mask(charged_off, 0)
+
+    return df_feature
+
+
 #   Feature Engneering
 #   The function gets the loan data it takes down the required columns ans then we return the Feature Engineered loan_data
-def feature_engg(df, data_config):
+def feature_engg_legacy(df, data_config):
     df_feature = df.copy()
 
     print(df_feature['DLQ_STATUS'].unique())
@@ -84,18 +219,19 @@ def feature_engg(df, data_config):
 
     # Creating Next_Loan_Derived_Status
     print("Creating 'Next Derived Loan Status' Column...")
-    df_feature['NEXT_DERIVED_LOAN_STATUS'] = df_feature.groupby('LOAN_ID')['DERIVED_LOAN_STATUS'].shift(-1).ffill()
+    next_status = df_feature.groupby('LOAN_ID')['DERIVED_LOAN_STATUS'].shift(-1)
+    df_feature['NEXT_DERIVED_LOAN_STATUS'] = next_status.groupby(df_feature['LOAN_ID']).ffill()
 
     # Get the charged off status name from config
-    charged_off_status = next((v for k, v in bucket_map.items() if 'charge' in v.lower() or 'default' in v.lower()), 
-                            list(bucket_map.values())[-1])  # fallback to last status if no charged off found
+    charged_off_status = get_charged_off_status(bucket_map)
 
     # Ensuring clean data
     print("Further Cleaning...")
     df_feature.loc[df_feature['DERIVED_LOAN_STATUS'] == charged_off_status, 'NEXT_DERIVED_LOAN_STATUS'] = charged_off_status
     
     # Creating Next DPD Status
-    df_feature['NEXT_DAYS_PAST_DUE'] = df_feature.groupby('LOAN_ID')['DAYS_PAST_DUE'].shift(-1).ffill()
+    next_dpd = df_feature.groupby('LOAN_ID')['DAYS_PAST_DUE'].shift(-1)
+    df_feature['NEXT_DAYS_PAST_DUE'] = next_dpd.groupby(df_feature['LOAN_ID']).ffill()
 
     # Creating a new column with charged-off amount
     print("Creating 'Charged off Amount' Column...")
@@ -110,17 +246,60 @@ def feature_engg(df, data_config):
     return df_feature
 
 
-def Cgl_Curve(distribution, transition_matrix, forecasted_months):
-    Cgl_Curve = []
-    for i in range(forecasted_months + 1):
-        state_probability = np.dot(distribution, np.linalg.matrix_power(transition_matrix, i))
-        Cgl_Curve.append([f"Period_{i}"] + state_probability.tolist())
+def propagate(distribution, transition_matrix, forecasted_months, out=None):
+    """
+    Advances state distributions through a transition matrix one period at a time.
+
+    Parameters:
+    distribution (array-like): Starting distribution of shape (K,), or a batch of shape (B, K).
+    transition_matrix (array-like): Transition matrix of shape (K, K), or one per batch item (B, K, K).
+    forecasted_months (int): Number of periods to forecast.
+    out (np.ndarray): Optional preallocated array of shape (..., forecasted_months + 1, K) to write into.
+
+    Returns:
+    np.ndarray: State probabilities for periods 0 to forecasted_months, shape (..., forecasted_months + 1, K).
+    """
+    distribution = np.asarray(distribution, dtype=float)
+    transition_matrix = np.asarray(transition_matrix, dtype=float)
+
+    batch_shape = np.broadcast_shapes(distribution.shape[:-1], transition_matrix.shape[:-2])
+    shape = batch_shape + (forecasted_months + 1, distribution.shape[-1])
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape:
+        raise ValueError(f"Output array has shape {out.shape}, expected {shape}")
+
+    # Each period is one (batched) vector-matrix product on the previous period's row
+    out[..., 0, :] = distribution
+    for i in range(1, forecasted_months + 1):
+        np.matmul(out[..., i - 1:i, :], transition_matrix, out=out[..., i:i + 1, :])
+
+    return out
+
+
+def propagate_horizons(distribution, transition_matrix, horizons):
+    """
+    State distributions at several horizons at once, from a single propagation to the longest one.
 
-    # Create DataFrame with the first column as "Period" and the rest based on the distribution index
-    df1 = pd.DataFrame(Cgl_Curve, columns=["Period"] + distribution.index.tolist())
+    Parameters:
+    distribution (array-like): Starting distribution of shape (K,) or (B, K).
+    transition_matrix (array-like): Transition matrix of shape (K, K) or (B, K, K).
+    horizons (list): Periods to return.
 
-    # Set "Period" as the index of the DataFrame
-    df1.set_index("Period", inplace=True)
+    Returns:
+    np.ndarray: State probabilities of shape (..., len(horizons), K).
+    """
+    horizons = np.asarray(horizons, dtype=int)
+    curve = propagate(distribution, transition_matrix, int(horizons.max()))
+    return curve[..., horizons, :]
+
+
+def Cgl_Curve(distribution, transition_matrix, forecasted_months):
+    state_probability = propagate(distribution, transition_matrix, forecasted_months)
+
+    # Create DataFrame with "Period" as the index and the columns based on the distribution index
+    periods = pd.Index([f"Period_{i}" for i in range(forecasted_months + 1)], name="Period")
+    df1 = pd.DataFrame(state_probability, index=periods, columns=distribution.index.tolist())
 
     # To calculate the Monthly Default Rate
     df1['MONTHLY_DEFAULT_RATE'] = df1['Charged Off'].diff()
@@ -128,88 +307,285 @@ def Cgl_Curve(distribution, transition_matrix, forecasted_months):
     return df1
 
 
+def absorbing_chain(distribution, transition_matrix, absorbing_states):
+    """
+    Closed-form lifetime analysis treating some buckets as absorbing states of the Markov chain.
+
+    With Q the transient-to-transient block and R the transient-to-absorbing block of the transition
+    matrix, the fundamental matrix N = (I - Q)^-1 gives the absorption probabilities B = N R and the
+    expected periods to absorption t = N 1. Both come out of one linear solve of (I - Q) against [R | 1].
+
+    Transient states that can not reach an absorbing state, e.g. buckets never observed as a starting
+    state (a self-loop in transition_probabilities), would make I - Q singular. They are left out of
+    the solve: they are never absorbed, and have no finite expected time to absorption, nor do the
+    states that can move into them. Their expected time is None, which serializes as JSON null.
+
+    Parameters:
+    distribution (pd.Series): Current distribution indexed by bucket name.
+    transition_matrix (pd.DataFrame): Transition matrix with bucket names as index and columns.
+    absorbing_states (list): Bucket names to treat as absorbing (charged-off, prepaid, paid-off...).
+
+    Returns:
+    dict: Absorption probabilities per transient state, expected periods to absorption per transient
+          state (a dict, None where the state is never absorbed) and the lifetime share of the
+          distribution ending in each absorbing state.
+    """
+    states = distribution.index.tolist()
+    missing = [state for state in absorbing_states if state not in states]
+    if missing:
+        raise ValueError(f"Absorbing states {missing} are not in the bucket map")
+
+    transient_states = [state for state in states if state not in absorbing_states]
+    matrix = transition_matrix.reindex(index=states, columns=states, fill_value=0).to_numpy(dtype=float)
+
+    transient = [states.index(state) for state in transient_states]
+    absorbing = [states.index(state) for state in absorbing_states]
+    Q = matrix[np.ix_(transient, transient)]
+    R = matrix[np.ix_(transient, absorbing)]
+
+    # Transient states with a path to an absorbing state
+    reaches = R.sum(axis=1) > 0
+    while True:
+        extended = reaches | (Q[:, reaches] > 0).any(axis=1)
+        if (extended == reaches).all():
+            break
+        reaches = extended
+    if len(transient) and not reaches.any():
+        raise ValueError("Transient states never reach an absorbing state, "
+                         "check that every terminal bucket is listed in absorbing_states")
+
+    # Single solve for absorption probabilities and expected time to absorption
+    solution = np.zeros((len(transient), len(absorbing) + 1))
+    solution[~reaches, -1] = np.inf
+    Q_reaching = Q[np.ix_(reaches, reaches)]
+    rhs = np.hstack([R[reaches], np.ones((int(reaches.sum()), 1))])
+    solution[reaches] = np.linalg.solve(np.eye(len(Q_reaching)) - Q_reaching, rhs)
+
+    absorption_probabilities = pd.DataFrame(solution[:, :-1], index=transient_states, columns=absorbing_states)
+    # Mass that can end up in a state that is never absorbed has no finite expected time
+    absorbed = np.isclose(solution[:, :-1].sum(axis=1), 1.0)
+    expected_time = {state: float(time) if is_absorbed else None
+                     for state, time, is_absorbed in zip(transient_states, solution[:, -1], absorbed)}
+
+    # Mass already absorbed plus the transient mass that ends up in each absorbing state
+    lifetime_absorption = (distribution[absorbing_states]
+                           + distribution[transient_states].to_numpy() @ absorption_probabilities)
+
+    return {
+        'Absorption_Probabilities': absorption_probabilities,
+        'Expected_Time_To_Absorption': expected_time,
+        'Lifetime_Absorption': lifetime_absorption
+    }
+
+
 def visualiser(output_before_visuals):
+    # Figures are built with the object-oriented Agg renderer, safe to call from worker threads
     output_after_visuals = output_before_visuals
-
-    def visual1(output_after_visuals = output_before_visuals):
-
-        # Create Plot 
-        plt.figure(figsize=(12,6)) 
-        plt.plot(output_after_visuals['CGL_Curve']['Charged Off'], marker='o') 
-        plt.xlabel('Time Periods') 
-        plt.ylabel('Cumulative Gross Loss (CGL)') 
-        plt.title('Cumulative Gross Loss (CGL)') 
-        plt.grid(True) 
-        
-        visual = plt.gcf()
-        output_after_visuals['CGL'] = visual
-        plt.close()
-
-    def visual2(output_after_visuals = output_before_visuals):
-
-        # Plot the Cumulative Charged Off curve with Period on the x-axis
-        plt.figure(figsize=(20, 6))
-        plt.plot(output_after_visuals['CGL_Curve'].index, output_after_visuals['CGL_Curve']['MONTHLY_DEFAULT_RATE'], marker='o')
-        plt.xlabel('Periods')
-        plt.ylabel('Monthly Default Rate')
-        plt.title('Monthly Default Rate')
-        plt.grid(True)
-        
-        visual = plt.gcf()
-        output_after_visuals['Monthly Default Rate'] = visual
-        plt.close()
-
-    visual1()
-    visual2()
+    output_after_visuals['CGL'] = tmm1_charts.cgl_figure(output_after_visuals['CGL_Curve'])
+    output_after_visuals['Monthly Default Rate'] = tmm1_charts.monthly_default_rate_figure(output_after_visuals['CGL_Curve'])
     return output_after_visuals
 
+def count_transitions(from_codes, to_codes, state_count, mask=None):
+    """
+    Counts transitions between integer state codes with a single bincount over from * K + to.
+
+    Parameters:
+    from_codes (np.ndarray): State code of every row.
+    to_codes (np.ndarray): Next state code of every row.
+    state_count (int): Number of states K.
+    mask (np.ndarray): Optional boolean array of rows to count.
+
+    Returns:
+    np.ndarray: K x K int64 counts. Rows with a negative (unmapped) code on either side are skipped.
+    """
+    from_codes = np.asarray(from_codes, dtype=np.int64)
+    to_codes = np.asarray(to_codes, dtype=np.int64)
+
+    valid = (from_codes >= 0) & (to_codes >= 0)
+    if mask is not None:
+        valid &= np.asarray(mask, dtype=bool)
+
+    flat_index = from_codes[valid] * state_count + to_codes[valid]
+    counts = np.bincount(flat_index, minlength=state_count * state_count)
+    return counts.reshape(state_count, state_count)
+
+
+def transition_probabilities(counts):
+    """
+    Normalizes transition counts to row probabilities.
+
+    States that were never observed as a starting state have no outflow to normalize, so their row is
+    set to stay in the same state instead of dividing by zero. Works on a single K x K matrix or a
+    stack of them.
+
+    Parameters:
+    counts (np.ndarray): Transition counts of shape (..., K, K).
+
+    Returns:
+    np.ndarray: Transition probabilities of shape (..., K, K).
+    """
+    counts = np.asarray(counts, dtype=float)
+    row_totals = counts.sum(axis=-1, keepdims=True)
+
+    probabilities = np.divide(counts, row_totals, out=np.zeros_like(counts), where=row_totals > 0)
+    diagonal = np.arange(counts.shape[-1])
+    probabilities[..., diagonal, diagonal] += (row_totals[..., 0] == 0)
+
+    return probabilities
+
+
+def build_transition_matrix(df, bucket_map):
+    """
+    Builds the transition matrix of the feature engineered data, ordered by the bucket map.
+
+    Only rows with a CURRENT_UPB are counted, as the pivot table count it replaces did.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+    bucket_map (dict): Bucket map from the configuration.
+
+    Returns:
+    tuple: (counts, probabilities) K x K DataFrames indexed by DERIVED_LOAN_STATUS with
+           NEXT_DERIVED_LOAN_STATUS columns. Counts can be summed across partitions before normalizing.
+    """
+    states = bucket_states(bucket_map)
+    from_codes = pd.Categorical(df['DERIVED_LOAN_STATUS'], categories=states).codes
+    to_codes = pd.Categorical(df['NEXT_DERIVED_LOAN_STATUS'], categories=states).codes
+
+    counts = count_transitions(from_codes, to_codes, len(states), mask=df['CURRENT_UPB'].notna().to_numpy())
+
+    index = pd.Index(states, name='DERIVED_LOAN_STATUS')
+    columns = pd.Index(states, name='NEXT_DERIVED_LOAN_STATUS')
+    return (pd.DataFrame(counts, index=index, columns=columns),
+            pd.DataFrame(transition_probabilities(counts), index=index, columns=columns))
+
+
+def loan_summary(df):
+    """
+    Summarises the feature engineered data to one row per loan.
+
+    The distribution pairs each loan's last row status with the UPB of that same row, so a loan whose
+    last row has no UPB adds nothing to it. The snapshot balances take the first and last reported
+    values of every column.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+
+    Returns:
+    pd.DataFrame: Indexed by LOAN_ID in order of first appearance, with the first ORIG_UPB, first
+                  (OPENING_UPB) and last reported (ENDING_UPB) CURRENT_UPB, last reported CHARGE_OFF_AMT,
+                  and the DERIVED_LOAN_STATUS and CURRENT_UPB of the loan's last row.
+    """
+    grouped = df.groupby('LOAN_ID', sort=False)
+    summary = grouped.agg(ORIG_UPB=('ORIG_UPB', 'first'),
+                          OPENING_UPB=('CURRENT_UPB', 'first'),
+                          ENDING_UPB=('CURRENT_UPB', 'last'),
+                          CHARGE_OFF_AMT=('CHARGE_OFF_AMT', 'last'))
+    last_rows = grouped.tail(1).set_index('LOAN_ID')[['DERIVED_LOAN_STATUS', 'CURRENT_UPB']]
+    return summary.join(last_rows)
+
+
+def aggregate(df, data_config):
+    """
+    Mergeable totals of the feature engineered data, everything the calculator needs from the loans.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+    data_config (dict): Configuration dictionary.
+
+    Returns:
+    dict: Transition counts (K x K), last UPB summed by last status (K), origination amount, opening
+          balance, last UPB, last charged off amount and loan count. Totals of disjoint sets of loans
+          can be combined with merge_aggregates.
+    """
+    states = bucket_states(data_config['configuration']['loan_buckets']['bucket_map'])
+
+    from_codes = pd.Categorical(df['DERIVED_LOAN_STATUS'], categories=states).codes
+    to_codes = pd.Categorical(df['NEXT_DERIVED_LOAN_STATUS'], categories=states).codes
+    transition_counts = count_transitions(from_codes, to_codes, len(states),
+                                          mask=df['CURRENT_UPB'].notna().to_numpy())
+
+    # Per-loan summary used for the distribution and all snapshot balances
+    summary = loan_summary(df)
+    last_codes = pd.Categorical(summary['DERIVED_LOAN_STATUS'], categories=states).codes
+    last_upb = summary['CURRENT_UPB'].to_numpy(dtype=float)
+    counted = (last_codes >= 0) & ~np.isnan(last_upb)
+    state_upb = np.bincount(last_codes[counted], weights=last_upb[counted], minlength=len(states))
+
+    return {
+        'Transition_Counts': transition_counts,
+        'State_UPB': state_upb,
+        'Origination_Amount': summary['ORIG_UPB'].sum(),
+        'Opening_Balance': summary['OPENING_UPB'].sum(),
+        'Last_UPB': summary['ENDING_UPB'].sum(),
+        'Charged_Off_Amount': summary['CHARGE_OFF_AMT'].sum(),
+        'Loan_Count': len(summary)
+    }
+
+
+def merge_aggregates(aggregates):
+    # Totals are additive across disjoint sets of loans, merged in the order given
+    merged = dict(aggregates[0])
+    for partial in aggregates[1:]:
+        for key, value in partial.items():
+            merged[key] = merged[key] + value
+    return merged
+
+
 def calculator(df, data_config):
+    return calculator_from_aggregates(aggregate(df, data_config), data_config)
+
+
+def calculator_from_aggregates(aggregates, data_config):
+    # Get bucket values from config
+    bucket_map = data_config['configuration']['loan_buckets']['bucket_map']
+    bucket_values = bucket_states(bucket_map)
+
     # Create transition matrix
-    transition_matrix = pd.pivot_table(df, 
-                                     values='CURRENT_UPB', 
-                                     index='DERIVED_LOAN_STATUS', 
-                                     columns='NEXT_DERIVED_LOAN_STATUS', 
-                                     aggfunc='count', 
-                                     sort=False, 
-                                     fill_value=0).pipe(lambda x: x.div(x.sum(axis=1), axis=0))
+    index = pd.Index(bucket_values, name='DERIVED_LOAN_STATUS')
+    columns = pd.Index(bucket_values, name='NEXT_DERIVED_LOAN_STATUS')
+    transition_counts = pd.DataFrame(aggregates['Transition_Counts'], index=index, columns=columns)
+    transition_matrix = pd.DataFrame(transition_probabilities(aggregates['Transition_Counts']),
+                                     index=index, columns=columns)
     print("Created transition matrix..")
 
-    # Get bucket values from config
-    bucket_values = list(data_config['configuration']['loan_buckets']['bucket_map'].values())
     forecasted_months = data_config['configuration']['forecasted_months']
     weighted_average_life = data_config['configuration']['WAL']
-    
+
     # Current Distribution using dynamic bucket values
-    distribution = (df.groupby(['LOAN_ID'])
-                     .apply(lambda x: x.iloc[-1])
-                     .groupby(['DERIVED_LOAN_STATUS'])['CURRENT_UPB']
-                     .sum()
-                     .pipe(lambda x: x/x.sum())
-                     .loc[bucket_values])
+    state_upb = aggregates['State_UPB']
+    distribution = pd.Series(state_upb / state_upb.sum(), index=index, name='CURRENT_UPB')
     print("Created Distribution..")
     
     CglCurve = Cgl_Curve(distribution, transition_matrix, forecasted_months)
     print("Created CGL Curve..")
     
     # Allowance for Loans and Lease Losses
-    ALLL = CglCurve['Charged Off'][forecasted_months] - CglCurve['Charged Off'][0]
+    loss_mode = data_config['configuration'].get('loss_mode', 'iterative')
+    if loss_mode == 'analytic':
+        # Lifetime loss from the absorbing chain instead of the forecasted horizon
+        charged_off_status = get_charged_off_status(bucket_map)
+        absorbing_states = data_config['configuration'].get('absorbing_states', [charged_off_status])
+        absorption = absorbing_chain(distribution, transition_matrix, absorbing_states)
+        ALLL = absorption['Lifetime_Absorption'][charged_off_status] - distribution[charged_off_status]
+        print("Solved absorbing chain..")
+    elif loss_mode == 'iterative':
+        absorption = {}
+        ALLL = CglCurve['Charged Off'].iloc[forecasted_months] - CglCurve['Charged Off'].iloc[0]
+    else:
+        raise ValueError(f"Invalid loss_mode '{loss_mode}'. Use 'iterative' or 'analytic'.")
     
     # Calculate CECL Factor
     CECL = ALLL * weighted_average_life
 
     # Calculate Origination Amount of Snapshot
-    origination_amount = df.groupby('LOAN_ID').first()['ORIG_UPB'].sum()
+    origination_amount = aggregates['Origination_Amount']
 
     # Calculate Opening Balance of snapshot
-    opening_balance = df.groupby('LOAN_ID').first()['CURRENT_UPB'].sum()
+    opening_balance = aggregates['Opening_Balance']
 
-    # Calculate Ending Balance of snapshot
-    # Get last row of each loan group
-    last_upb = df.groupby('LOAN_ID').last()['CURRENT_UPB'].sum()
-    # Get charged off amount for each loan group
-    charged_off = df.groupby('LOAN_ID').last()['CHARGE_OFF_AMT'].sum()
-    # Calculate ending balance as sum of last UPB and charged off amounts
-    ending_balance = last_upb + charged_off
+    # Calculate Ending Balance of snapshot as sum of last UPB and charged off amounts
+    ending_balance = aggregates['Last_UPB'] + aggregates['Charged_Off_Amount']
 
     # Calculating Forecast Period based on Snapshot Date and Forecasted Months
     # Convert snapshot date string to datetime
@@ -220,8 +596,9 @@ def calculator(df, data_config):
     # Calculate CECL Amount
     CECL_Amount = CECL * ending_balance
 
-    return {
+    output = {
         'Transition_Matrix': transition_matrix,
+        'Transition_Counts': transition_counts,
         'Distribution': distribution,
         'CGL_Curve': CglCurve,
         'ALLL': ALLL,
@@ -236,17 +613,58 @@ def calculator(df, data_config):
         "Forecasted_Period_From": forecasted_period_from,
         "Forecasted_Period_To": forecasted_period_to
     }
+    output.update(absorption)
+
+    return output
 
 
 def run_model(df, data_config):
+    """
+    Runs TMM1 on preprocessed loan data, a DataFrame or the path of a binary tape
+    (see tmm1_tape.write_tape). Tapes are memory mapped and already sorted, so reopening one skips
+    parsing and the sort in tmm1_data.prepare.
+    """
     print("Preparing data for model...")
-    
-    filtered_loan_data = data_sampler(df)
-    feature_engineered_loan_data = feature_engg(filtered_loan_data, data_config)
-
-    calculator_output = calculator(feature_engineered_loan_data, data_config)
+    configuration = data_config['configuration']
+
+    if isinstance(df, (str, os.PathLike)):
+        from backend.models import tmm1_tape
+        filtered_loan_data = tmm1_tape.sampled_frame(os.fspath(df), data_config)
+        data_config = {**data_config, 'configuration': {**configuration, 'presorted': True}}
+        configuration = data_config['configuration']
+    else:
+        filtered_loan_data = data_sampler(df, data_config)
+
+    # The row level features are only needed here when the calculator, bootstrap or segments run in this process
+    parallel_config = option_config(configuration, 'parallel')
+    bootstrap_config = option_config(configuration, 'bootstrap')
+    needs_features = parallel_config is None or bootstrap_config is not None or configuration.get('segmentation')
+    feature_engineered_loan_data = feature_engg(filtered_loan_data, data_config) if needs_features else None
+
+    # Loans are independent, so the calculator can run over loan partitions in worker processes
+    if parallel_config is not None:
+        from backend.models import tmm1_parallel
+        calculator_output = tmm1_parallel.run_model_parallel(filtered_loan_data, data_config)
+    else:
+        calculator_output = calculator(feature_engineered_loan_data, data_config)
     # output_with_visuals = visualiser(calculator_output)
 
+    # Sensitivities are evaluated over the fitted transition matrix, without refitting
+    scenarios = configuration.get('scenarios')
+    if scenarios:
+        from backend.models import tmm1_scenarios
+        calculator_output['Scenarios'] = tmm1_scenarios.evaluate_scenarios(calculator_output, scenarios, data_config)
+
+    # Confidence bands from resampling loans
+    if bootstrap_config is not None:
+        from backend.models import tmm1_bootstrap
+        calculator_output.update(tmm1_bootstrap.bootstrap_bands(feature_engineered_loan_data, data_config, **bootstrap_config))
+
+    # One matrix, distribution and curve per segment from the same pass over the data
+    if configuration.get('segmentation'):
+        from backend.models import tmm1_segments
+        calculator_output.update(tmm1_segments.run_segments(feature_engineered_loan_data, data_config))
+
     return calculator_output
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+# Standard library imports
+import logging
+import time
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1
+
+# Resampling weights held per batch, replicates x loans; with the int64 draw and its float copy
+# this keeps a batch near 64 MB whatever the loan count
+WEIGHT_CELLS = 2 ** 22
+
+def loan_vectors(df, data_config, dtype=np.float64):
+    """
+    Per-loan calculator totals, one row per loan, so that resampled portfolios are weighted row sums.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+    data_config (dict): Configuration dictionary.
+    dtype: Floating point type of the returned array. The replicate sums accumulate in it, float32
+           loses whole counts once a portfolio has more than 2**24 transitions.
+
+    Returns:
+    np.ndarray: Shape (loans, K*K + K + 1). Columns hold the loan's transition counts (row-major K x K),
+                its last row's UPB in the column of its last status, and its ending balance.
+    """
+    states = tmm1.bucket_states(data_config['configuration']['loan_buckets']['bucket_map'])
+    K = len(states)
+
+    loan_index, loan_ids = pd.factorize(df['LOAN_ID'], sort=False)
+    loan_count = len(loan_ids)
+
+    # Transition counts of every loan from one bincount over loan * K^2 + from * K + to
+    from_codes = pd.Categorical(df['DERIVED_LOAN_STATUS'], categories=states).codes.astype(np.int64)
+    to_codes = pd.Categorical(df['NEXT_DERIVED_LOAN_STATUS'], categories=states).codes.astype(np.int64)
+    valid = (from_codes >= 0) & (to_codes >= 0) & df['CURRENT_UPB'].notna().to_numpy()
+    cells = loan_index[valid] * K * K + from_codes[valid] * K + to_codes[valid]
+
+    vectors = np.zeros((loan_count, K * K + K + 1), dtype=dtype)
+    vectors[:, :K * K] = np.bincount(cells, minlength=loan_count * K * K).reshape(loan_count, K * K)
+
+    # Loan summary rows follow the order of first appearance, same as factorize
+    summary = tmm1.loan_summary(df)
+    last_codes = pd.Categorical(summary['DERIVED_LOAN_STATUS'], categories=states).codes
+    last_upb = summary['CURRENT_UPB'].fillna(0).to_numpy(dtype=float)
+    has_state = last_codes >= 0
+    vectors[np.flatnonzero(has_state), K * K + last_codes[has_state]] = last_upb[has_state]
+    vectors[:, -1] = (summary['ENDING_UPB'].fillna(0).to_numpy(dtype=float)
+                      + summary['CHARGE_OFF_AMT'].fillna(0).to_numpy(dtype=float))
+
+    return vectors
+
+
+def bootstrap_bands(df, data_config, replicates=1000, confidence=0.9, seed=42, batch_size=64):
+    """
+    Bootstrap percentile bands for the CGL curve and CECL amount.
+
+    Loans are resampled with replacement; every replicate's transition counts, distribution and
+    ending balance are weighted sums of loan_vectors. The resampling weights of a batch of
+    replicates are drawn with one multinomial draw and applied with one matrix product. All
+    replicate transition matrices are then propagated in one batched computation.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+    data_config (dict): Configuration dictionary.
+    replicates (int): Number of bootstrap replicates.
+    confidence (float): Width of the percentile band, e.g. 0.9 for the 5th to 95th percentile.
+    seed (int): Random seed, the same seed gives the same bands.
+    batch_size (int): Most replicates resampled per matrix product. Large portfolios use fewer,
+                      so a batch holds at most WEIGHT_CELLS weights.
+
+    Returns:
+    dict: 'CGL_Curve_Bands' DataFrame of Lower/Median/Upper cumulative charge-off per period and
+          'CECL_Amount_Bands' Series of Lower/Median/Upper CECL amount.
+    """
+    configuration = data_config['configuration']
+    bucket_map = configuration['loan_buckets']['bucket_map']
+    states = tmm1.bucket_states(bucket_map)
+    K = len(states)
+    charged_off_index = states.index(tmm1.get_charged_off_status(bucket_map))
+    forecasted_months = configuration['forecasted_months']
+
+    start_time = time.time()
+    vectors = loan_vectors(df, data_config)
+    loan_count = len(vectors)
+    rng = np.random.default_rng(seed)
+
+    batch_size = max(1, min(batch_size, WEIGHT_CELLS // max(loan_count, 1)))
+    totals = np.empty((replicates, vectors.shape[1]))
+    for start in range(0, replicates, batch_size):
+        batch = min(batch_size, replicates - start)
+        # How often each loan is drawn in loan_count draws with replacement
+        weights = rng.multinomial(loan_count, np.full(loan_count, 1 / loan_count), size=batch)
+        totals[start:start + batch] = weights.astype(vectors.dtype) @ vectors
+
+    matrices = tmm1.transition_probabilities(totals[:, :K * K].reshape(replicates, K, K))
+    state_upb = totals[:, K * K:K * K + K]
+    distributions = state_upb / state_upb.sum(axis=1, keepdims=True)
+    ending_balance = totals[:, -1]
+
+    curves = tmm1.propagate(distributions, matrices, forecasted_months)[:, :, charged_off_index]
+    cecl_amount = (curves[:, -1] - curves[:, 0]) * configuration['WAL'] * ending_balance
+    logging.info(f"Bootstrapped {replicates} replicates of {loan_count} loans in {time.time() - start_time:.2f} seconds")
+
+    labels = ['Lower', 'Median', 'Upper']
+    quantiles = [(1 - confidence) / 2, 0.5, 1 - (1 - confidence) / 2]
+    periods = pd.Index([f"Period_{i}" for i in range(forecasted_months + 1)], name="Period")
+
+    return {
+        'CGL_Curve_Bands': pd.DataFrame(np.quantile(curves, quantiles, axis=0).T, index=periods, columns=labels),
+        'CECL_Amount_Bands': pd.Series(np.quantile(cecl_amount, quantiles), index=labels)
+    }
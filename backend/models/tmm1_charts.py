@@ -0,0 +1,154 @@
+# Standard library imports
+import os
+import re
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Third-party imports
+from dotenv import load_dotenv
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Load environment variables
+load_dotenv()
+
+# Rendered charts are cached on disk by report ID and chart type
+CHART_CACHE_FOLDER = os.getenv('CHART_CACHE_FOLDER', os.path.join(os.getenv('UPLOAD_FOLDER', './uploads'), 'charts'))
+CHART_WORKERS = int(os.getenv('CHART_WORKERS', '2'))
+
+# Background pool for rendering charts after the report is stored
+_executor = ThreadPoolExecutor(max_workers=CHART_WORKERS, thread_name_prefix='chart')
+# One lock per chart being rendered so concurrent requests render it only once, dropped afterwards
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+# Report IDs are MongoDB ObjectIds, and name the chart folders
+REPORT_ID_PATTERN = re.compile(r'[0-9a-fA-F]{24}')
+
+
+def cgl_figure(cgl_curve):
+    # Figures are created without pyplot, so no global state is shared between threads
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(cgl_curve['Charged Off'], marker='o')
+    ax.set_xlabel('Time Periods')
+    ax.set_ylabel('Cumulative Gross Loss (CGL)')
+    ax.set_title('Cumulative Gross Loss (CGL)')
+    ax.grid(True)
+    return figure
+
+
+def monthly_default_rate_figure(cgl_curve):
+    figure = Figure(figsize=(20, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(cgl_curve.index, cgl_curve['MONTHLY_DEFAULT_RATE'], marker='o')
+    ax.set_xlabel('Periods')
+    ax.set_ylabel('Monthly Default Rate')
+    ax.set_title('Monthly Default Rate')
+    ax.grid(True)
+    return figure
+
+
+CHART_TYPES = {
+    'cgl': cgl_figure,
+    'monthly_default_rate': monthly_default_rate_figure
+}
+
+
+def render_chart(cgl_curve, chart_type, file_path):
+    """
+    Renders one chart of a CGL curve to a PNG file with the Agg canvas.
+
+    Parameters:
+    cgl_curve (pd.DataFrame or dict): CGL_Curve from the calculator, or its stored dictionary form.
+    chart_type (str): One of CHART_TYPES.
+    file_path (str): Where to write the PNG. Written to a temporary file first and moved into place.
+
+    Returns:
+    str: file_path
+    """
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Unknown chart type '{chart_type}'. Use one of {list(CHART_TYPES)}.")
+
+    figure = CHART_TYPES[chart_type](pd.DataFrame(cgl_curve))
+
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    figure.savefig(temp_path, format='png')
+    os.replace(temp_path, file_path)
+    return file_path
+
+
+def chart_path(report_id, chart_type, cache_folder=CHART_CACHE_FOLDER):
+    """Returns the cache path of a chart, raises ValueError for anything but an ObjectId hex string."""
+    report_id = str(report_id)
+    if not REPORT_ID_PATTERN.fullmatch(report_id):
+        raise ValueError(f"Invalid report id '{report_id}'")
+    return os.path.join(cache_folder, report_id.lower(), f"{chart_type}.png")
+
+
+def get_chart(report_id, chart_type, load_cgl_curve, cache_folder=CHART_CACHE_FOLDER, report_exists=None):
+    """
+    Returns the cached chart of a report, rendering it on first request.
+
+    Parameters:
+    report_id (str): Report the chart belongs to, an ObjectId hex string.
+    chart_type (str): One of CHART_TYPES.
+    load_cgl_curve (callable): Returns the report's CGL curve, only called when the chart is rendered.
+    cache_folder (str): Chart cache folder.
+    report_exists (callable): Checks that the report is still stored before a cached chart is served.
+                              Charts of removed reports are deleted and LookupError is raised.
+
+    Returns:
+    str: Path of the PNG file.
+    """
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Unknown chart type '{chart_type}'. Use one of {list(CHART_TYPES)}.")
+
+    file_path = chart_path(report_id, chart_type, cache_folder)
+    if os.path.exists(file_path):
+        if report_exists is not None and not report_exists():
+            remove_charts(report_id, cache_folder)
+            raise LookupError(report_id)
+        return file_path
+
+    with _render_locks_guard:
+        lock = _render_locks.setdefault(file_path, threading.Lock())
+
+    try:
+        with lock:
+            # Another request may have rendered it while we waited
+            if not os.path.exists(file_path):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                render_chart(load_cgl_curve(), chart_type, file_path)
+                logging.info(f"Rendered {chart_type} chart for report {report_id}")
+    finally:
+        # Later requests find the file, a failed render is retried with a fresh lock
+        with _render_locks_guard:
+            if _render_locks.get(file_path) is lock:
+                del _render_locks[file_path]
+
+    return file_path
+
+
+def remove_charts(report_id, cache_folder=CHART_CACHE_FOLDER):
+    """Deletes the cached charts of a report."""
+    report_folder = os.path.dirname(chart_path(report_id, next(iter(CHART_TYPES)), cache_folder))
+    for chart_type in CHART_TYPES:
+        file_path = os.path.join(report_folder, f"{chart_type}.png")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    if os.path.isdir(report_folder) and not os.listdir(report_folder):
+        os.rmdir(report_folder)
+
+
+def prerender_charts(report_id, cgl_curve, cache_folder=CHART_CACHE_FOLDER):
+    """Renders every chart of a report in the background pool, returns the futures."""
+    return [
+        _executor.submit(get_chart, report_id, chart_type, lambda: cgl_curve, cache_folder)
+        for chart_type in CHART_TYPES
+    ]
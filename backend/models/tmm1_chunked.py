@@ -0,0 +1,131 @@
+# Standard library imports
+import logging
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1, tmm1_data
+
+
+class TransitionAccumulator:
+    """
+    Runs the TMM1 calculator over loan data that arrives in chunks.
+
+    Chunks must be grouped by LOAN_ID (all rows of a loan together, ordered by ACT_PERIOD), e.g.
+    sorted by loan or read partition by partition; update raises a ValueError when a finished loan
+    appears again. The rows of the last loan in a chunk are held back until the next chunk shows
+    whether the loan continues, so every loan is feature engineered in one piece. Only the
+    calculator totals of finished loans are kept, which bounds memory to the chunk size plus one
+    loan's history.
+    """
+
+    def __init__(self, data_config):
+        self.data_config = data_config
+        self.bucket_map = data_config['configuration']['loan_buckets']['bucket_map']
+        self.sampling = tmm1_data.sampling_config(data_config)
+
+        self.aggregates = None
+        self.pending = None
+        # IDs of the loans whose rows have ended, a loan's rows must all arrive together
+        self.finished = set()
+        self.rows_read = 0
+        self.chunks_read = 0
+
+    def update(self, chunk):
+        """Adds a chunk of preprocessed loan data."""
+        self.rows_read += len(chunk)
+        self.chunks_read += 1
+
+        if self.pending is not None:
+            chunk = pd.concat([self.pending, chunk], ignore_index=True)
+        if chunk.empty:
+            return
+
+        # Hold back the trailing loan, it may continue in the next chunk
+        loan_ids = chunk['LOAN_ID'].to_numpy()
+        loan_starts = np.flatnonzero(loan_ids[1:] != loan_ids[:-1]) + 1
+        trailing_start = loan_starts[-1] if len(loan_starts) else 0
+
+        # One run of rows per loan, the pending loan leads the chunk and continues its run
+        run_ids = loan_ids[np.r_[0, loan_starts]].tolist()
+        for loan_id in run_ids:
+            if loan_id in self.finished:
+                raise ValueError(f"Chunk {self.chunks_read}: LOAN_ID {loan_id} appears again after its rows ended. "
+                                 f"The chunked calculator needs the rows of each loan together, ordered by "
+                                 f"ACT_PERIOD; sort the tape by LOAN_ID or use read_mode 'full'")
+            self.finished.add(loan_id)
+        self.finished.discard(run_ids[-1])
+
+        self.pending = chunk.iloc[trailing_start:]
+        self._process(chunk.iloc[:trailing_start])
+
+        logging.debug("Chunk %s accumulated, %s rows read, %s rows pending",
+                      self.chunks_read, self.rows_read, len(self.pending))
+
+    def _process(self, loans):
+        if loans.empty:
+            return
+
+        # Same loans as tmm1.data_sampler, decided per complete loan
+        loans = tmm1_data.sample_loans(loans, self.sampling)
+        if loans.empty:
+            return
+
+        # Chunks arrive sorted by LOAN_ID and ACT_PERIOD
+        df_prepared = tmm1_data.prepare(loans, self.data_config, presorted=True)
+        if df_prepared.empty:
+            return
+
+        df_feature = tmm1.add_state_features(df_prepared, self.bucket_map)
+
+        partial = tmm1.aggregate(df_feature, self.data_config)
+        self.aggregates = partial if self.aggregates is None else tmm1.merge_aggregates([self.aggregates, partial])
+
+    def result(self):
+        """Flushes the held back loan and returns the tmm1.calculator output."""
+        if self.pending is not None:
+            self._process(self.pending)
+            self.pending = None
+
+        if self.aggregates is None:
+            raise ValueError("No loan data was accumulated")
+
+        logging.info("Accumulated %s rows from %s chunks", self.rows_read, self.chunks_read)
+        return tmm1.calculator_from_aggregates(self.aggregates, self.data_config)
+
+
+def run_model_chunked(chunks, data_config):
+    """
+    Runs the TMM1 calculator over an iterable of loan-sorted DataFrame chunks.
+
+    Scenarios are evaluated over the accumulated matrix as in tmm1.run_model. Bootstrap bands and
+    segmentation need the row level data, which is never held in memory here, so they raise a
+    ValueError before any chunk is read.
+
+    Parameters:
+    chunks (iterable): Preprocessed DataFrame chunks sorted by LOAN_ID and ACT_PERIOD.
+    data_config (dict): Configuration dictionary.
+
+    Returns:
+    dict: Same output as tmm1.calculator, with 'Scenarios' when configured.
+    """
+    configuration = data_config['configuration']
+    unsupported = [key for key, enabled in (('bootstrap', tmm1.option_config(configuration, 'bootstrap') is not None),
+                                            ('segmentation', bool(configuration.get('segmentation'))))
+                   if enabled]
+    if unsupported:
+        raise ValueError(f"read_mode 'chunked' does not support {', '.join(unsupported)}, "
+                         f"use read_mode 'full' or remove them from the configuration")
+
+    accumulator = TransitionAccumulator(data_config)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    calculator_output = accumulator.result()
+
+    scenarios = configuration.get('scenarios')
+    if scenarios:
+        from backend.models import tmm1_scenarios
+        calculator_output['Scenarios'] = tmm1_scenarios.evaluate_scenarios(calculator_output, scenarios, data_config)
+    return calculator_output
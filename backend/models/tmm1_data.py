@@ -1,59 +1,181 @@
+import os
+import numpy as np
 import pandas as pd
 import logging
 
-def prepare(df, data_config: dict):
+def model_columns(data_config):
+    """Returns the columns the model reads: required_cols, plus the segment column of segmented runs."""
+    columns = list(data_config['configuration']['required_cols'])
+    segment_column = data_config['configuration'].get('segmentation', {}).get('column')
+    if segment_column and segment_column not in columns:
+        columns.append(segment_column)
+    return columns
+
+def required_columns(data_config):
+    """
+    Returns the columns ingestion has to read for a model run: the model columns plus the columns
+    the preprocessor converts dates of or replaces values in. Other columns listed in the dtype map
+    are skipped by the preprocessor when they are not read.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+
+    Returns:
+    list or None: Column names, or None when the configuration has no required_cols (read everything).
+    """
+    configuration = data_config['configuration']
+    if 'required_cols' not in configuration:
+        return None
+
+    columns = model_columns(data_config)
+    data_specific_functions = configuration.get('data_specific_functions', {})
+    columns += list(data_specific_functions.get('date_columns', {}))
+    columns += [replace['column_name'] for replace in data_specific_functions.get('replace_values', [])]
+
+    # Deduplicate, keeping the first position
+    return list(dict.fromkeys(columns))
+
+# Loan sampling hashes LOAN_ID with a Lehmer generator step, which every SQL dialect can evaluate,
+# so a sample drawn in the database, while streaming a file or in memory keeps the same loans.
+# The multiplier is one of Fishman and Moore's full period multipliers for the 2**31 - 1 modulus,
+# which spreads consecutive loan IDs over the whole range
+HASH_MODULUS = 2147483647
+HASH_MULTIPLIER = 950706376
+# Key of the string hash of IDs that are not integers, fixed so samples are reproducible
+LOAN_HASH_KEY = 'tmm1-loan-sample'
+
+def sampling_config(data_config):
+    """
+    Returns configuration.sampling with defaults filled in:
+    - orig_terms: ORIG_TERM values of the loans to keep, empty or None keeps every term. Defaults to [360].
+    - fraction: Share of loans to keep. Defaults to MODEL_SAMPLE_FRACTION (0.5).
+    - seed: Sample seed. Defaults to MODEL_RANDOM_STATE (42).
+    """
+    sampling = data_config['configuration'].get('sampling', {})
+    fraction = float(sampling.get('fraction', os.getenv('MODEL_SAMPLE_FRACTION', '0.5')))
+    if not 0 < fraction <= 1:
+        raise ValueError(f"sampling.fraction must be in (0, 1], got {fraction}")
+
+    return {
+        'orig_terms': sampling.get('orig_terms', [360]),
+        'fraction': fraction,
+        'seed': int(sampling.get('seed', os.getenv('MODEL_RANDOM_STATE', '42')))
+    }
+
+def sample_threshold(fraction):
+    """Loans whose hash is below the threshold are sampled."""
+    return int(round(fraction * HASH_MODULUS))
+
+def loan_hash(loan_ids, seed):
+    """
+    Hashes loan IDs to [0, HASH_MODULUS): ((LOAN_ID + seed) mod P) * HASH_MULTIPLIER mod P.
+
+    Integer IDs, and strings of them such as '000123', use their value, as the database filter does.
+    Other IDs, e.g. alphanumeric ones, use a stable hash of their string form (fixed-key SipHash of
+    the UTF-8 bytes) in place of the value. Missing IDs hash to HASH_MODULUS, so they are never sampled.
+    """
+    loan_ids = pd.Series(loan_ids).reset_index(drop=True)
+    missing = loan_ids.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(loan_ids.dtype):
+        values = loan_ids.to_numpy(dtype=np.float64, na_value=np.nan)
+        integer = ~missing & np.isfinite(values) & (values == np.floor(values))
+    else:
+        integer = ~missing & loan_ids.astype(str).str.fullmatch(r'\s*[+-]?\d+\s*').to_numpy(dtype=bool)
+
+    # Exact in int64: the seeded ID reduced mod P stays below 2**31, times the multiplier below 2**61
+    reduced = np.zeros(len(loan_ids), dtype=np.int64)
+    if integer.any():
+        integer_ids = loan_ids[integer]
+        if pd.api.types.is_numeric_dtype(integer_ids.dtype):
+            integer_ids = integer_ids.astype(np.int64)
+        else:
+            # Python ints, digit strings may exceed int64
+            integer_ids = integer_ids.astype(str).map(int)
+        reduced[integer] = (integer_ids % HASH_MODULUS).to_numpy(dtype=np.int64)
+    named = ~missing & ~integer
+    if named.any():
+        string_hashes = pd.util.hash_pandas_object(loan_ids[named].astype(str), index=False, hash_key=LOAN_HASH_KEY)
+        reduced[named] = (string_hashes.to_numpy() % np.uint64(HASH_MODULUS)).astype(np.int64)
+
+    hashes = np.full(len(loan_ids), HASH_MODULUS, dtype=np.int64)
+    valid = ~missing
+    seeded = (reduced[valid] + seed % HASH_MODULUS) % HASH_MODULUS
+    hashes[valid] = seeded * HASH_MULTIPLIER % HASH_MODULUS
+    return hashes
+
+def sample_mask(loan_ids, sampling):
+    """Row mask of the loans in the hash sample of a sampling_config."""
+    if sampling['fraction'] >= 1:
+        return np.ones(len(loan_ids), dtype=bool)
+    return loan_hash(loan_ids, sampling['seed']) < sample_threshold(sampling['fraction'])
+
+def sample_loans(df, sampling):
+    """
+    Keeps every row of the loans with a row in orig_terms that are in the hash sample.
+
+    Parameters:
+    df (pd.DataFrame): Loan data with LOAN_ID and ORIG_TERM.
+    sampling (dict): Output of sampling_config.
+
+    Returns:
+    pd.DataFrame: Rows of the sampled loans.
+    """
+    mask = sample_mask(df['LOAN_ID'], sampling)
+    if sampling['orig_terms']:
+        # A loan is kept when any of its rows has a wanted term
+        term_loans = df.loc[df['ORIG_TERM'].isin(sampling['orig_terms']), 'LOAN_ID'].unique()
+        mask &= df['LOAN_ID'].isin(term_loans).to_numpy()
+    return df[mask]
+
+def filter_columns(df, data_config):
+    """Keeps the columns read by the model."""
+    df = df[model_columns(data_config)]
+    logging.debug("Filtered columns: %s", df.columns)
+    return df
+
+def prepare(df, data_config: dict, presorted=None):
+    """
+    Keeps the model columns and the rows whose DLQ_STATUS is mapped to a bucket, ordered by LOAN_ID
+    and ACT_PERIOD.
+
+    Parameters:
+    df (pd.DataFrame): Preprocessed loan data.
+    data_config (dict): Configuration dictionary.
+    presorted (bool): The data is already sorted by LOAN_ID and ACT_PERIOD, so the sort is skipped.
+                      Defaults to configuration.presorted.
+
+    Returns:
+    pd.DataFrame: Prepared data with a fresh RangeIndex.
+    """
     logging.debug("Preparing data with configuration: %s", data_config)
 
     bucket_config = data_config['configuration']['loan_buckets']
     bucket_count = bucket_config['bucket_count']
     bucket_map = bucket_config['bucket_map']
 
-    logging.info('Bucket Configuration Loaded...')
     logging.info(f'No of buckets: {bucket_count}')
     logging.info(f'Bucket Map: {bucket_map}')
 
     # Checking if no. of loan buckets provided are also mapped
-    if bucket_count == len(bucket_map):
-        logging.info(f"No. of buckets {bucket_config['bucket_count']} matches the mapping.")
-    else:
+    if bucket_count != len(bucket_map):
         logging.error("Buckets not mapped correctly. Please check.")
-        return None
-    
-    # Filtering columns as required by the model
-    def filter_columns(df):
-        df = df[data_config['configuration']['required_cols']]
-        logging.debug("Filtered columns: %s", df.columns)
-        return df
-
-    # Filtering buckets based on the bucket map
-    def filter_buckets(df_group):
-        try:
-            # Sort the group by ACT_PERIOD
-            group_sorted = df_group.sort_values(by='ACT_PERIOD')
-            # Keep only rows where DLQ_STATUS is in bucket_map keys
-            valid_statuses = [int(k) for k in bucket_map.keys()]
-            filtered_df = group_sorted[group_sorted['DLQ_STATUS'].isin(valid_statuses)]
-            return filtered_df
-
-        except Exception as e:
-            logging.error(f"Error in filter_buckets: {e}")
-            logging.debug(f"Group data: {df_group}")
-            raise e
-
-    logging.info("Filtering columns as required by the model...")
-    df = filter_columns(df)
-    logging.info("Columns filtered: %s", df.columns)
-
-    logging.info("Filtering Buckets...")
-    try:
-        logging.debug("Unique DLQ_STATUS values: %s", df['DLQ_STATUS'].unique())
-        df_processed = df.groupby('LOAN_ID').apply(filter_buckets).reset_index(drop=True)
-        logging.debug("Processed DLQ_STATUS values: %s", df_processed['DLQ_STATUS'].unique())
-    
-        logging.info("Buckets Filtered: %s", df_processed['DLQ_STATUS'].unique())
-        
-        return df_processed
-    
-    except Exception as e:
-        logging.error(f"Error in prepare function: {e}")
-        raise e
\ No newline at end of file
+        raise ValueError(f"bucket_count is {bucket_count} but bucket_map maps {len(bucket_map)} buckets")
+
+    if presorted is None:
+        presorted = data_config['configuration'].get('presorted', False)
+
+    df = filter_columns(df, data_config)
+
+    # Loans without an ID were dropped by the per-loan groupby
+    df = df[df['LOAN_ID'].notna()]
+
+    if not presorted:
+        # Stable, so rows of a loan with the same ACT_PERIOD keep their input order
+        df = df.sort_values(['LOAN_ID', 'ACT_PERIOD'], kind='stable')
+
+    # Keep only rows where DLQ_STATUS is in bucket_map keys
+    valid_statuses = np.array([int(k) for k in bucket_map.keys()])
+    df_processed = df[df['DLQ_STATUS'].isin(valid_statuses)].reset_index(drop=True)
+
+    logging.info("Buckets Filtered: %s", df_processed['DLQ_STATUS'].unique())
+    return df_processed
@@ -0,0 +1,81 @@
+# Standard library imports
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1
+
+# Partitions are fixed independently of the worker count so results do not depend on it
+DEFAULT_PARTITIONS = 64
+
+
+def partition_loans(df, partitions):
+    """
+    Hash-partitions loan data by LOAN_ID, every loan lands wholly in one partition.
+
+    Parameters:
+    df (pd.DataFrame): Loan data.
+    partitions (int): Number of partitions.
+
+    Returns:
+    list: One DataFrame per partition, in partition order.
+    """
+    loan_hash = pd.util.hash_pandas_object(df['LOAN_ID'], index=False).to_numpy()
+    partition = loan_hash % np.uint64(partitions)
+
+    # One stable sort instead of a boolean mask per partition
+    order = np.argsort(partition, kind='stable')
+    bounds = np.searchsorted(partition[order], np.arange(partitions + 1, dtype=np.uint64))
+    return [df.iloc[order[start:end]] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def partition_aggregates(df_partition, data_config):
+    # Runs in a worker process: feature engineering and calculator totals for one partition
+    if df_partition.empty:
+        return None
+    df_feature = tmm1.feature_engg(df_partition, data_config)
+    if df_feature.empty:
+        return None
+    return tmm1.aggregate(df_feature, data_config)
+
+
+def run_model_parallel(df, data_config, workers=None, partitions=None):
+    """
+    Runs the TMM1 calculator over hash partitions of the loans on a process pool.
+
+    Each partition's transition counts and balance totals are computed in a worker and merged in
+    partition order by the parent, so the output is identical for any number of workers.
+
+    Parameters:
+    df (pd.DataFrame): Sampled loan data, as passed to tmm1.feature_engg.
+    data_config (dict): Configuration dictionary, configuration.parallel may set workers and partitions.
+    workers (int): Number of worker processes, defaults to config, TMM1_WORKERS or the CPU count.
+    partitions (int): Number of loan partitions, defaults to config or DEFAULT_PARTITIONS.
+
+    Returns:
+    dict: Same output as tmm1.calculator.
+    """
+    parallel_config = tmm1.option_config(data_config['configuration'], 'parallel') or {}
+    workers = workers or parallel_config.get('workers') or int(os.getenv('TMM1_WORKERS', os.cpu_count()))
+    partitions = partitions or parallel_config.get('partitions', DEFAULT_PARTITIONS)
+
+    logging.info(f"Running TMM1 on {partitions} loan partitions with {workers} workers")
+    df_partitions = partition_loans(df, partitions)
+
+    if workers == 1:
+        partials = [partition_aggregates(df_partition, data_config) for df_partition in df_partitions]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(partition_aggregates, df_partitions, repeat(data_config)))
+
+    partials = [partial for partial in partials if partial is not None]
+    if not partials:
+        raise ValueError("No loan data left after feature engineering")
+
+    return tmm1.calculator_from_aggregates(tmm1.merge_aggregates(partials), data_config)
@@ -0,0 +1,98 @@
+# Standard library imports
+import logging
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1
+
+
+def shock_default_rates(transition_matrix, charged_off_index, shocks):
+    """
+    Applies multiplicative shocks to the roll-to-default probabilities of a transition matrix.
+
+    The probability of rolling into the charged-off bucket is multiplied by the shock (capped at 1) and
+    the rest of each row is rescaled so it still sums to 1. A row that only rolls to default has nothing
+    to rescale, so the mass a shock below 1 frees stays in the row's own bucket. The charged-off row
+    itself is left as is.
+
+    Parameters:
+    transition_matrix (np.ndarray): K x K transition matrix.
+    charged_off_index (int): Position of the charged-off bucket.
+    shocks (np.ndarray): One non-negative multiplier per scenario, shape (S,).
+
+    Returns:
+    np.ndarray: Shocked transition matrices of shape (S, K, K).
+    """
+    matrix = np.asarray(transition_matrix, dtype=float)
+    shocks = np.asarray(shocks, dtype=float)
+    if np.any(~np.isfinite(shocks)) or np.any(shocks < 0):
+        raise ValueError(f"Default shocks must be finite and non-negative, got {shocks.tolist()}")
+
+    default_rate = matrix[:, charged_off_index]
+    shocked_rate = np.minimum(default_rate[None, :] * shocks[:, None], 1.0)
+
+    # Scale the non-default part of every row to the probability mass left over
+    remaining = 1.0 - default_rate
+    scale = np.divide(1.0 - shocked_rate, remaining, out=np.ones_like(shocked_rate), where=remaining > 0)
+
+    shocked = matrix[None, :, :] * scale[:, :, None]
+    shocked[:, :, charged_off_index] = shocked_rate
+    diagonal = np.arange(len(matrix))
+    shocked[:, diagonal, diagonal] += np.where(remaining > 0, 0.0, 1.0 - shocked_rate)
+    shocked[:, charged_off_index, :] = matrix[charged_off_index]
+    return shocked
+
+
+def evaluate_scenarios(calculator_output, scenarios, data_config):
+    """
+    Evaluates many sensitivities over one fitted transition matrix in a single batched propagation.
+
+    Parameters:
+    calculator_output (dict): Output of tmm1.calculator, supplies the fitted transition matrix,
+                              distribution and ending balance.
+    scenarios (list): Dicts with a name and optional forecasted_months, WAL and default_shock
+                      (multiplier on roll-to-default rates). Missing values fall back to the base config.
+    data_config (dict): Configuration dictionary.
+
+    Returns:
+    pd.DataFrame: One row per scenario with its inputs, ALLL, CECL_Factor and CECL_Amount.
+    """
+    configuration = data_config['configuration']
+    bucket_map = configuration['loan_buckets']['bucket_map']
+    states = tmm1.bucket_states(bucket_map)
+    charged_off_index = states.index(tmm1.get_charged_off_status(bucket_map))
+
+    names = [scenario.get('name', f"Scenario_{i}") for i, scenario in enumerate(scenarios)]
+    horizons = [scenario.get('forecasted_months', configuration['forecasted_months']) for scenario in scenarios]
+    invalid = [horizon for horizon in horizons
+               if isinstance(horizon, bool) or not isinstance(horizon, (int, float, np.integer, np.floating))
+               or not float(horizon).is_integer() or horizon < 1]
+    if invalid:
+        raise ValueError(f"Scenario forecasted_months must be positive whole months, got {invalid}")
+    horizons = np.array(horizons, dtype=np.int64)
+    wal = np.array([scenario.get('WAL', configuration['WAL']) for scenario in scenarios], dtype=float)
+    shocks = np.array([scenario.get('default_shock', 1.0) for scenario in scenarios], dtype=float)
+
+    matrix = calculator_output['Transition_Matrix'].reindex(index=states, columns=states, fill_value=0)
+    distribution = calculator_output['Distribution'].reindex(states, fill_value=0)
+
+    # One propagation of every shocked matrix to the longest horizon
+    shocked = shock_default_rates(matrix.to_numpy(), charged_off_index, shocks)
+    curves = tmm1.propagate(distribution.to_numpy(), shocked, int(horizons.max()))
+    logging.info(f"Evaluated {len(scenarios)} scenarios up to {horizons.max()} months")
+
+    charged_off = curves[np.arange(len(scenarios)), horizons, charged_off_index]
+    ALLL = charged_off - curves[:, 0, charged_off_index]
+    CECL = ALLL * wal
+
+    return pd.DataFrame({
+        'Forecasted_Months': horizons,
+        'WAL': wal,
+        'Default_Shock': shocks,
+        'ALLL': ALLL,
+        'CECL_Factor': CECL,
+        'CECL_Amount': CECL * calculator_output['Ending_Balance']
+    }, index=pd.Index(names, name='Scenario'))
@@ -0,0 +1,110 @@
+# Standard library imports
+import logging
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1
+
+
+def segment_keys(df, segmentation):
+    """
+    Segment key of every row, taken from the first row of its loan so a loan never changes segment.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data.
+    segmentation (dict): 'column' to segment by, with 'vintage': true to use the year of a date column.
+
+    Returns:
+    pd.Series: String segment keys, 'Unknown' where the value is missing.
+    """
+    values = df.groupby('LOAN_ID', sort=False)[segmentation['column']].transform('first')
+    if segmentation.get('vintage'):
+        values = pd.to_datetime(values, errors='coerce').dt.year.astype('Int64')
+    return values.astype('string').fillna('Unknown')
+
+
+def run_segments(df, data_config):
+    """
+    Transition matrix, distribution and CGL curve per segment, from one grouped pass over the data.
+
+    Transition counts, last-state balances and snapshot balances of all segments come out of single
+    bincounts keyed by segment, and all segment curves are propagated together.
+
+    Parameters:
+    df (pd.DataFrame): Feature engineered loan data, including the segment column.
+    data_config (dict): Configuration dictionary with configuration.segmentation.
+
+    Returns:
+    dict: Stacked per-segment results, Segment_Summary, Segment_Transition_Matrix,
+          Segment_Distribution and Segment_CGL_Curve, indexed by segment key.
+    """
+    configuration = data_config['configuration']
+    bucket_map = configuration['loan_buckets']['bucket_map']
+    states = tmm1.bucket_states(bucket_map)
+    K = len(states)
+    charged_off_index = states.index(tmm1.get_charged_off_status(bucket_map))
+    forecasted_months = configuration['forecasted_months']
+
+    segment_index, segments = pd.factorize(segment_keys(df, configuration['segmentation']), sort=True)
+    S = len(segments)
+
+    # Transition counts of every segment in one bincount over segment * K^2 + from * K + to
+    from_codes = pd.Categorical(df['DERIVED_LOAN_STATUS'], categories=states).codes.astype(np.int64)
+    to_codes = pd.Categorical(df['NEXT_DERIVED_LOAN_STATUS'], categories=states).codes.astype(np.int64)
+    valid = (from_codes >= 0) & (to_codes >= 0) & df['CURRENT_UPB'].notna().to_numpy()
+    counts = np.bincount(segment_index[valid] * K * K + from_codes[valid] * K + to_codes[valid],
+                         minlength=S * K * K).reshape(S, K, K)
+
+    # Per-loan balances, each loan's segment is the segment of its rows
+    summary = tmm1.loan_summary(df)
+    loan_index, _ = pd.factorize(df['LOAN_ID'], sort=False)
+    loan_segment = np.empty(len(summary), dtype=np.int64)
+    loan_segment[loan_index] = segment_index
+
+    last_codes = pd.Categorical(summary['DERIVED_LOAN_STATUS'], categories=states).codes
+    last_upb = summary['CURRENT_UPB'].to_numpy(dtype=float)
+    counted = (last_codes >= 0) & ~np.isnan(last_upb)
+    state_upb = np.bincount(loan_segment[counted] * K + last_codes[counted], weights=last_upb[counted],
+                            minlength=S * K).reshape(S, K)
+
+    def segment_sum(column):
+        return np.bincount(loan_segment, weights=summary[column].fillna(0).to_numpy(dtype=float), minlength=S)
+
+    ending_balance = segment_sum('ENDING_UPB') + segment_sum('CHARGE_OFF_AMT')
+
+    # All segment curves in one batched propagation
+    matrices = tmm1.transition_probabilities(counts)
+    totals = state_upb.sum(axis=1, keepdims=True)
+    distributions = np.divide(state_upb, totals, out=np.zeros_like(state_upb), where=totals > 0)
+    curves = tmm1.propagate(distributions, matrices, forecasted_months)
+
+    ALLL = curves[:, forecasted_months, charged_off_index] - curves[:, 0, charged_off_index]
+    CECL = ALLL * configuration['WAL']
+    logging.info(f"Computed TMM1 for {S} segments of '{configuration['segmentation']['column']}'")
+
+    segment_names = pd.Index(segments.astype(str), name='Segment')
+    periods = [f"Period_{i}" for i in range(forecasted_months + 1)]
+
+    segment_curves = pd.DataFrame(curves.reshape(S * (forecasted_months + 1), K), columns=states,
+                                  index=pd.MultiIndex.from_product([segment_names, periods], names=['Segment', 'Period']))
+    segment_curves['MONTHLY_DEFAULT_RATE'] = segment_curves.groupby(level='Segment')[states[charged_off_index]].diff()
+
+    return {
+        'Segment_Summary': pd.DataFrame({
+            'Loan_Count': np.bincount(loan_segment, minlength=S),
+            'ALLL': ALLL,
+            'CECL_Factor': CECL,
+            'CECL_Amount': CECL * ending_balance,
+            'Origination_Amount': segment_sum('ORIG_UPB'),
+            'Opening_Balance': segment_sum('OPENING_UPB'),
+            'Ending_Balance': ending_balance
+        }, index=segment_names),
+        'Segment_Transition_Matrix': pd.DataFrame(
+            matrices.reshape(S * K, K), columns=states,
+            index=pd.MultiIndex.from_product([segment_names, states], names=['Segment', 'DERIVED_LOAN_STATUS'])),
+        'Segment_Distribution': pd.DataFrame(distributions, index=segment_names, columns=states),
+        'Segment_CGL_Curve': segment_curves
+    }
@@ -0,0 +1,265 @@
+# Standard library imports
+import os
+import json
+import struct
+import hashlib
+import logging
+import time
+import uuid
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backend.models import tmm1_data
+
+# Binary tape layout: MAGIC, format version and header length (little-endian uint32), the JSON
+# header, then one fixed-width array per column. Arrays start on ALIGNMENT byte boundaries, so
+# they can be viewed straight out of a memory map.
+TAPE_MAGIC = b'TMM1TAPE'
+TAPE_VERSION = 1
+TAPE_SUFFIX = '.tape'
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+
+# Config entries that do not change the preprocessed data a tape holds
+TAPE_IGNORED_ATTRIBUTES = ('filepath', 'chunksize', 'read_mode', 'parquet_cache', 'tape_cache')
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def encode_column(series):
+    """
+    Returns (values, dictionary) of a column as fixed-width arrays. Numeric, boolean and datetime
+    columns are stored as they are; other columns as int32 codes into a fixed-width unicode
+    dictionary, with -1 for missing values.
+    """
+    dtype = series.dtype
+    if pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_numeric_dtype(dtype):
+        # Nullable integers keep their missing values as NaN
+        has_na = series.isna().any()
+        return series.to_numpy(dtype=np.float64 if has_na else dtype.numpy_dtype, na_value=np.nan if has_na else 0), None
+    if (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+            or (pd.api.types.is_datetime64_dtype(dtype) and getattr(dtype, 'tz', None) is None)):
+        return series.to_numpy(), None
+
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int32), np.asarray(uniques.astype(str), dtype=str)
+
+
+def write_tape(df, file_path, data_config=None):
+    """
+    Writes preprocessed loan data as a binary tape, sorted by LOAN_ID and ACT_PERIOD.
+
+    LOAN_ID is stored as int32 (int64 for very large tapes) codes in the order of the sorted loan
+    IDs, with the IDs in a dictionary array, so the codes keep the loans contiguous and ordered.
+
+    Parameters:
+    df (pd.DataFrame): Preprocessed loan data.
+    file_path (str): Where to write the tape. Written to a temporary file first and moved into place.
+    data_config (dict): Configuration dictionary, only tmm1_data.model_columns are written when given.
+
+    Returns:
+    str: file_path
+    """
+    start_time = time.time()
+    if data_config is not None:
+        df = df[[column for column in tmm1_data.model_columns(data_config) if column in df.columns]]
+    df = df[df['LOAN_ID'].notna()].sort_values(['LOAN_ID', 'ACT_PERIOD'], kind='stable')
+
+    loan_codes, loan_ids = pd.factorize(df['LOAN_ID'], sort=True)
+    loan_codes = loan_codes.astype(np.int32 if len(loan_ids) < 2 ** 31 else np.int64)
+    loan_ids = loan_ids.to_numpy()
+    if not np.issubdtype(loan_ids.dtype, np.number):
+        loan_ids = np.asarray(loan_ids.astype(str), dtype=str)
+
+    arrays = [('LOAN_ID', loan_codes, loan_ids)]
+    arrays += [(column, *encode_column(df[column])) for column in df.columns if column != 'LOAN_ID']
+
+    columns = []
+    blobs = []
+    offset = 0
+    for name, values, dictionary in arrays:
+        entry = {'name': name}
+        for key, array in (('values', values), ('dictionary', dictionary)):
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            offset = _aligned(offset)
+            entry[key] = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+            blobs.append((offset, array))
+            offset += array.nbytes
+        columns.append(entry)
+
+    header = json.dumps({'rows': len(df), 'loans': len(loan_ids), 'sorted': True, 'columns': columns}).encode()
+    data_start = _aligned(PREAMBLE.size + len(header))
+
+    temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(TAPE_MAGIC, TAPE_VERSION, len(header)))
+        f.write(header)
+        for array_offset, array in blobs:
+            f.seek(data_start + array_offset)
+            f.write(array.view(np.uint8))
+    os.replace(temp_path, file_path)
+
+    logging.info(f"Wrote tape {file_path}: {len(df)} rows, {len(loan_ids)} loans in {time.time() - start_time:.2f} seconds")
+    return file_path
+
+
+class Tape:
+    """
+    Memory mapped binary tape. Columns are zero-copy views into the file, so opening a tape does
+    not read it, and processes that open the same tape share its pages in the OS page cache.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        if os.path.getsize(file_path) < PREAMBLE.size:
+            raise ValueError(f"{file_path} is too short to be a TMM1 tape")
+        self._map = np.memmap(file_path, dtype=np.uint8, mode='r')
+
+        magic, version, header_length = PREAMBLE.unpack(self._map[:PREAMBLE.size].tobytes())
+        if magic != TAPE_MAGIC:
+            raise ValueError(f"{file_path} is not a TMM1 tape")
+        if version != TAPE_VERSION:
+            raise ValueError(f"Unsupported tape version {version} in {file_path}")
+        if PREAMBLE.size + header_length > len(self._map):
+            raise ValueError(f"Tape {file_path} is truncated inside its header")
+
+        self.header = json.loads(self._map[PREAMBLE.size:PREAMBLE.size + header_length].tobytes())
+        self._data_start = _aligned(PREAMBLE.size + header_length)
+        self.columns = {entry['name']: entry for entry in self.header['columns']}
+        self.rows = self.header['rows']
+
+        # A tape cut short, e.g. by a full disk, would otherwise fail on first access to a column
+        for entry in self.header['columns']:
+            for key in ('values', 'dictionary'):
+                spec = entry.get(key)
+                if spec is None:
+                    continue
+                end = self._data_start + spec['offset'] + spec['length'] * np.dtype(spec['dtype']).itemsize
+                if end > len(self._map):
+                    raise ValueError(f"Tape {file_path} is truncated: {len(self._map)} bytes, "
+                                     f"column {entry['name']} ends past the end of the file")
+
+    def _view(self, spec):
+        dtype = np.dtype(spec['dtype'])
+        start = self._data_start + spec['offset']
+        return self._map[start:start + spec['length'] * dtype.itemsize].view(dtype)
+
+    def values(self, name):
+        """Raw stored array of a column: values, or codes for dictionary encoded columns."""
+        return self._view(self.columns[name]['values'])
+
+    def dictionary(self, name):
+        """Dictionary of a dictionary encoded column, None for columns stored as values."""
+        spec = self.columns[name].get('dictionary')
+        return None if spec is None else self._view(spec)
+
+    def loan_ids(self):
+        """Sorted unique LOAN_IDs, LOAN_ID codes index into it."""
+        return self.dictionary('LOAN_ID')
+
+    def column(self, name):
+        """A column decoded for the model: stored values, or a Categorical over the codes."""
+        dictionary = self.dictionary(name)
+        if dictionary is None or name == 'LOAN_ID':
+            return self.values(name)
+        return pd.Categorical.from_codes(self.values(name), categories=dictionary)
+
+    def frame(self, columns=None, loan_codes=True):
+        """
+        Returns the tape as a DataFrame of memory mapped columns.
+
+        Parameters:
+        columns (list): Columns to include, None includes all.
+        loan_codes (bool): Keep LOAN_ID as its codes (no copy, same order and grouping as the IDs)
+                           instead of decoding the IDs.
+
+        Returns:
+        pd.DataFrame: Tape rows, sorted by LOAN_ID and ACT_PERIOD.
+        """
+        names = list(self.columns) if columns is None else [name for name in columns if name in self.columns]
+        data = {name: self.column(name) for name in names}
+        if 'LOAN_ID' in data and not loan_codes:
+            data['LOAN_ID'] = self.loan_ids()[data['LOAN_ID']]
+        return pd.DataFrame(data, copy=False)
+
+    def sample_mask(self, sampling):
+        """
+        Row mask of the loans tmm1_data.sample_loans keeps, decided once per loan on the LOAN_ID
+        dictionary. None when every row is kept.
+        """
+        loan_codes = self.values('LOAN_ID')
+        keep = tmm1_data.sample_mask(self.loan_ids(), sampling)
+        if sampling['orig_terms']:
+            term_rows = np.isin(np.asarray(self.column('ORIG_TERM')), sampling['orig_terms'])
+            has_term = np.zeros(len(keep), dtype=bool)
+            has_term[loan_codes[term_rows]] = True
+            keep &= has_term
+        return None if keep.all() else keep[loan_codes]
+
+
+def sampled_frame(file_path, data_config):
+    """
+    Opens a tape and returns the rows of the configured loan sample, see tmm1.data_sampler.
+
+    Parameters:
+    file_path (str): Path of the tape.
+    data_config (dict): Configuration dictionary.
+
+    Returns:
+    pd.DataFrame: Sampled rows with LOAN_ID codes, sorted by LOAN_ID and ACT_PERIOD. Memory mapped
+                  when every loan is kept.
+    """
+    start_time = time.time()
+    tape = Tape(file_path)
+    df = tape.frame(tmm1_data.model_columns(data_config))
+
+    mask = tape.sample_mask(tmm1_data.sampling_config(data_config))
+    if mask is not None:
+        df = df[mask]
+    logging.info(f"Opened tape {file_path}: {len(df)} of {tape.rows} rows sampled in {time.time() - start_time:.2f} seconds")
+    return df
+
+
+def tape_path(data_file_path, data_config):
+    """
+    Returns the path of the tape of a data file, next to it. The name carries a hash of the
+    configuration entries that shape the preprocessed data, so a changed preprocessing gets its
+    own tape, while bucket maps, horizons and sampling can change freely.
+    """
+    configuration = data_config['configuration']
+    attributes = {key: value for key, value in configuration.get('attributes', {}).items()
+                  if key not in TAPE_IGNORED_ATTRIBUTES}
+    shaping = {
+        'attributes': attributes,
+        'data_specific_functions': configuration.get('data_specific_functions', {}),
+        'model_columns': tmm1_data.model_columns(data_config),
+        'version': TAPE_VERSION
+    }
+    digest = hashlib.sha256(json.dumps(shaping, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{data_file_path}.{digest}{TAPE_SUFFIX}"
+
+
+def is_tape_fresh(file_path, data_file_path):
+    """Checks that a tape exists, is newer than its data file and holds every array of its header."""
+    if not os.path.exists(file_path) or os.path.getmtime(file_path) < os.path.getmtime(data_file_path):
+        return False
+    try:
+        Tape(file_path)
+    except ValueError as e:
+        logging.warning(f"Rejecting tape, it will be rewritten: {e}")
+        return False
+    return True
+
+
+def use_tape_cache(data_config):
+    """Checks configuration.attributes.tape_cache (default off) of a file source."""
+    configuration = data_config['configuration']
+    return (configuration.get('source', '').lower() in ('csv', 'parquet')
+            and bool(configuration.get('attributes', {}).get('tape_cache', False)))
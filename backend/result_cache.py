@@ -0,0 +1,252 @@
+# Standard library imports
+import os
+import copy
+import json
+import uuid
+import hashlib
+import logging
+import threading
+
+# Third-party imports
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Model results are cached on disk, keyed by a hash of the input data and the model configuration
+RESULT_CACHE_FOLDER = os.getenv('RESULT_CACHE_FOLDER', os.path.join(os.getenv('UPLOAD_FOLDER', './uploads'), 'result_cache'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Bump when the model output changes, so results of older code are not served
+RESULT_CACHE_VERSION = 1
+
+# Config entries that locate or authenticate the data source but do not change the result
+CREDENTIAL_KEYS = ('username', 'password')
+
+# Hashes of files read before, by (path, size, mtime, ctime), so unchanged files are hashed once
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def stored_blob_sha256(file_path):
+    """Returns the sha256 the blob store recorded for one of its data files, None for other files."""
+    from backend import blob_store
+
+    try:
+        with open(os.path.join(os.path.dirname(file_path), blob_store.BLOB_MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get('data') != os.path.basename(file_path):
+        return None
+    return manifest.get('sha256')
+
+
+def file_fingerprint(file_path, block_size=1024 * 1024):
+    """
+    Returns the sha256 of a file's contents. Blob store files use the hash recorded when they were
+    stored, other files are read in blocks once per size and modification time.
+    """
+    sha256 = stored_blob_sha256(file_path)
+    if sha256 is not None:
+        return sha256
+
+    stat = os.stat(file_path)
+    version = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+    with _file_hashes_lock:
+        sha256 = _file_hashes.get(version)
+    if sha256 is not None:
+        return sha256
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+    with _file_hashes_lock:
+        # Only the latest version of a path is kept
+        for cached in [cached for cached in _file_hashes if cached[0] == version[0]]:
+            del _file_hashes[cached]
+        _file_hashes[version] = sha256
+    return sha256
+
+
+def db_watermark(connection_params):
+    """
+    Runs the connection's watermark query, e.g. "SELECT MAX(updated_at) FROM loans".
+
+    Parameters:
+    connection_params (dict): Connection details, with an optional 'watermark_query'.
+
+    Returns:
+    str or None: The watermark, or None when no watermark query is configured.
+    """
+    watermark_query = connection_params.get('watermark_query')
+    if not watermark_query:
+        return None
+
+    from sqlalchemy import text
+    from backend.ingestion import db_source_handler
+
+    engine = db_source_handler.create_db_engine(connection_params)
+    with engine.connect() as conn:
+        watermark = conn.execute(text(watermark_query)).scalar()
+    return str(watermark)
+
+
+def db_fingerprint(connection_params, watermark):
+    """Returns a hash of the database, query and watermark the data is read from."""
+    source = {
+        key: connection_params.get(key)
+        for key in ('engine', 'host', 'port', 'database_name', 'table', 'query')
+    }
+    source['watermark'] = watermark
+    return hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_fingerprint(data_config, data_file_path=None):
+    """
+    Fingerprints the data a configuration reads.
+
+    Parameters:
+    data_config (dict): Configuration dictionary.
+    data_file_path (str): Resolved data file path, for file sources.
+
+    Returns:
+    str or None: Hash of the data, or None when the data can not be fingerprinted (no caching).
+    """
+    source_type = data_config['configuration']['source'].lower()
+
+    if source_type == 'db':
+        connection_params = data_config['configuration']['attributes']['connection_details']
+        watermark = db_watermark(connection_params)
+        if watermark is None:
+            logging.info("No watermark_query configured, database results are not cached.")
+            return None
+        return db_fingerprint(connection_params, watermark)
+
+    if data_file_path is None:
+        return None
+    return file_fingerprint(data_file_path)
+
+
+def canonical_config(data_config):
+    """
+    Serializes the model relevant part of a configuration with sorted keys.
+    The data file location and database credentials are dropped, the data fingerprint covers them.
+    The loan sample is resolved first, so defaults taken from the environment are part of the key.
+    """
+    from backend.models import tmm1_data
+
+    config = copy.deepcopy(data_config)
+    if 'configuration' in config:
+        config['configuration']['sampling'] = tmm1_data.sampling_config(config)
+    attributes = config.get('configuration', {}).get('attributes', {})
+    attributes.pop('filepath', None)
+    connection_details = attributes.get('connection_details', {})
+    for key in CREDENTIAL_KEYS + ('watermark_query',):
+        connection_details.pop(key, None)
+
+    return json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def cache_key(data_fingerprint, data_config):
+    """Returns the cache key of a data fingerprint and configuration."""
+    digest = hashlib.sha256()
+    digest.update(f"v{RESULT_CACHE_VERSION}\n{data_fingerprint}\n".encode())
+    digest.update(canonical_config(data_config).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content addressed store of model results, one JSON file per key.
+
+    Reads refresh the file's modification time, and writes evict the least recently used files
+    until the cache fits in max_bytes.
+    """
+
+    def __init__(self, folder=RESULT_CACHE_FOLDER, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        if not key.isalnum():
+            raise ValueError(f"Invalid cache key '{key}'")
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached result of a key, or None."""
+        file_path = self.path(key)
+        try:
+            with open(file_path, 'r') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError:
+            logging.warning(f"Discarding unreadable cached result {key}")
+            self.invalidate(key)
+            return None
+
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            pass
+        logging.info(f"Result cache hit: {key}")
+        return result
+
+    def put(self, key, result):
+        """Stores a JSON serializable result under a key, then evicts down to max_bytes."""
+        os.makedirs(self.folder, exist_ok=True)
+        file_path = self.path(key)
+
+        temp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(result, f, default=str)
+        os.replace(temp_path, file_path)
+        logging.info(f"Result cached: {key}")
+
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used results until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, file_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(file_path)
+                    logging.info(f"Evicted cached result {os.path.basename(file_path)}")
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def invalidate(self, key=None):
+        """
+        Removes one cached result, or all of them when no key is given.
+
+        Returns:
+        int: Number of results removed.
+        """
+        if key is not None:
+            try:
+                os.remove(self.path(key))
+                return 1
+            except FileNotFoundError:
+                return 0
+
+        removed = 0
+        if os.path.isdir(self.folder):
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith('.json'):
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
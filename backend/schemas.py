@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields, ValidationError
+from marshmallow import Schema, fields, ValidationError, validates_schema
 
 # File upload schema
 class FileUploadSchema(Schema):
@@ -21,8 +21,34 @@ class NewReportSchema(Schema):
         "validator_failed": "Report name must not be empty."
     })
     description = fields.String(required=False)
-    data_file = fields.Raw(required=True, error_messages={"required": "Data file is required."})
-    config_file = fields.Raw(required=True, error_messages={"required": "Config file is required."})
+    # Files come with the request, or as the id of a completed chunked upload
+    data_file = fields.Raw(required=False, allow_none=True)
+    config_file = fields.Raw(required=False, allow_none=True)
+    data_upload_id = fields.String(required=False)
+    config_upload_id = fields.String(required=False)
+    # Client side hash of data_file, to detect a duplicate of a stored upload early
+    data_sha256 = fields.String(required=False)
+
+    @validates_schema
+    def validate_files(self, data, **kwargs):
+        errors = {}
+        if not data.get('data_file') and not data.get('data_upload_id'):
+            errors['data_file'] = ["Data file is required."]
+        if not data.get('config_file') and not data.get('config_upload_id'):
+            errors['config_file'] = ["Config file is required."]
+        if errors:
+            raise ValidationError(errors)
+
+# Chunked upload schema
+class UploadInitSchema(Schema):
+    filename = fields.String(required=True, validate=lambda x: len(x) > 0, error_messages={
+        "required": "Filename is required.",
+        "validator_failed": "Filename must not be empty."
+    })
+    size = fields.Integer(required=False, allow_none=True, validate=lambda x: x >= 0)
+    sha256 = fields.String(required=False, allow_none=True)
+    content_type = fields.String(required=False, allow_none=True)
+    report_name = fields.String(required=False, allow_none=True)
 
 
 # Example validation error handler
@@ -0,0 +1,283 @@
+# Standard library imports
+import os
+import json
+import uuid
+import hashlib
+import time
+import fcntl
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Third-party imports
+from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
+
+# Load environment variables
+load_dotenv()
+
+# Upload sessions are stored as JSON files, the data goes straight to the upload's folder
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')
+UPLOAD_SESSION_FOLDER = os.getenv('UPLOAD_SESSION_FOLDER', os.path.join(UPLOAD_FOLDER, 'upload_sessions'))
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', str(20 * 1024 * 1024 * 1024)))
+# Sessions untouched for this many seconds are expired, incomplete ones with their partial file
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', str(7 * 24 * 60 * 60)))
+
+# Bytes read from the request stream at a time
+STREAM_BLOCK_SIZE = 1024 * 1024
+# Hash states kept in memory, the least recently used ones are rebuilt from the file when needed
+MAX_CACHED_HASHERS = 64
+
+
+class UploadOffsetError(ValueError):
+    """A chunk does not start at the upload's acknowledged offset."""
+
+    def __init__(self, upload_id, offset, expected):
+        super().__init__(f"Upload {upload_id} is at offset {expected}, chunk starts at {offset}")
+        self.offset = expected
+
+
+class UploadTooLargeError(ValueError):
+    """An upload grew past its declared size or MAX_UPLOAD_SIZE."""
+
+
+class UploadStore:
+    """
+    Resumable chunked uploads: init, append chunks at the acknowledged offset, complete.
+
+    Chunks are streamed from the request into the destination file, and the sha256 of the
+    acknowledged bytes is updated as they arrive. Bytes of a chunk that failed halfway are
+    discarded by the next append, which always starts at the acknowledged offset.
+
+    Appends and completion hold a file lock on the session, so several processes (or stores)
+    can serve the same upload.
+    """
+
+    def __init__(self, folder=UPLOAD_FOLDER, session_folder=UPLOAD_SESSION_FOLDER, max_size=MAX_UPLOAD_SIZE,
+                 blob_store=None, session_ttl=UPLOAD_SESSION_TTL):
+        self.folder = folder
+        self.session_folder = session_folder
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+        # Completed uploads move into the blob store when one is given, see complete
+        self.blob_store = blob_store
+        # (offset, hash state) of the acknowledged bytes. Another process may have appended since,
+        # so a state is only used while its offset matches the session's
+        self._hashers = OrderedDict()
+        self._hashers_guard = threading.Lock()
+
+    def _session_path(self, upload_id):
+        if not upload_id.isalnum():
+            raise ValueError(f"Invalid upload id '{upload_id}'")
+        return os.path.join(self.session_folder, f"{upload_id}.json")
+
+    @contextmanager
+    def _lock(self, upload_id):
+        """Exclusive lock on an upload, across threads and processes."""
+        os.makedirs(self.session_folder, exist_ok=True)
+        with open(f"{self._session_path(upload_id)}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, session):
+        os.makedirs(self.session_folder, exist_ok=True)
+        session_path = self._session_path(session['upload_id'])
+        temp_path = f"{session_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(session, f)
+        os.replace(temp_path, session_path)
+
+    def _cache_hasher(self, upload_id, offset, hasher):
+        with self._hashers_guard:
+            self._hashers[upload_id] = (offset, hasher)
+            self._hashers.move_to_end(upload_id)
+            while len(self._hashers) > MAX_CACHED_HASHERS:
+                self._hashers.popitem(last=False)
+
+    def _hasher(self, session):
+        with self._hashers_guard:
+            offset, hasher = self._hashers.get(session['upload_id'], (None, None))
+        if offset == session['offset']:
+            return hasher
+
+        hasher = hashlib.sha256()
+        remaining = session['offset']
+        with open(session['path'], 'rb') as f:
+            while remaining > 0:
+                block = f.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        self._cache_hasher(session['upload_id'], session['offset'], hasher)
+        return hasher
+
+    def _remove_session(self, upload_id):
+        session_path = self._session_path(upload_id)
+        for path in (session_path, f"{session_path}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._hashers_guard:
+            self._hashers.pop(upload_id, None)
+
+    def expire(self, now=None):
+        """
+        Removes sessions not touched for session_ttl seconds. Incomplete uploads lose their partial
+        file (and their folder when it is left empty), completed ones only their session, the
+        uploaded file stays with the report.
+
+        Returns:
+        list: Ids of the expired uploads.
+        """
+        if not os.path.isdir(self.session_folder):
+            return []
+        cutoff = (now or time.time()) - self.session_ttl
+        expired = []
+        for name in os.listdir(self.session_folder):
+            upload_id, extension = os.path.splitext(name)
+            if extension != '.json' or not upload_id.isalnum():
+                continue
+            try:
+                if os.path.getmtime(self._session_path(upload_id)) >= cutoff:
+                    continue
+                with self._lock(upload_id):
+                    session = self.get(upload_id)
+                    if not session['complete']:
+                        if os.path.exists(session['path']):
+                            os.remove(session['path'])
+                        if os.path.isdir(session['folder']) and not os.listdir(session['folder']):
+                            os.rmdir(session['folder'])
+                    self._remove_session(upload_id)
+            except (FileNotFoundError, LookupError):
+                continue
+            expired.append(upload_id)
+            logging.info(f"Upload session {upload_id} expired")
+        return expired
+
+    def get(self, upload_id):
+        """Returns an upload's session, raises LookupError for unknown uploads."""
+        try:
+            with open(self._session_path(upload_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise LookupError(upload_id)
+
+    def init(self, filename, size=None, sha256=None, content_type=None, report_name=None):
+        """
+        Starts an upload into a new folder, named after the report when one is given.
+
+        Parameters:
+        filename (str): Name of the uploaded file.
+        size (int): Expected size in bytes, checked on every chunk and on completion.
+        sha256 (str): Expected hex digest, checked on completion.
+        content_type (str): Content type stored with the report.
+        report_name (str): Report the file belongs to.
+
+        Returns:
+        dict: The upload session.
+        """
+        if size is not None and size > self.max_size:
+            raise UploadTooLargeError(f"Upload of {size} bytes exceeds the maximum of {self.max_size} bytes")
+        self.expire()
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        upload_id = uuid.uuid4().hex
+        folder_name = f"{report_name}_{timestamp}" if report_name else timestamp
+        upload_folder = os.path.join(self.folder, secure_filename(folder_name) or timestamp)
+        os.makedirs(upload_folder, exist_ok=True)
+
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'path': os.path.join(upload_folder, secure_filename(filename)),
+            'folder': upload_folder,
+            'content_type': content_type,
+            'size': size,
+            'expected_sha256': sha256.lower() if sha256 else None,
+            'offset': 0,
+            'sha256': None,
+            'complete': False
+        }
+        open(session['path'], 'wb').close()
+        self._save(session)
+        self._cache_hasher(upload_id, 0, hashlib.sha256())
+        logging.info(f"Upload {upload_id} of '{filename}' started in {upload_folder}")
+        return session
+
+    def append(self, upload_id, offset, stream):
+        """
+        Writes a chunk read from a file-like stream at the acknowledged offset.
+
+        Returns:
+        dict: The upload session with the new offset.
+        """
+        with self._lock(upload_id):
+            session = self.get(upload_id)
+            if session['complete']:
+                raise ValueError(f"Upload {upload_id} is already complete")
+            if offset != session['offset']:
+                raise UploadOffsetError(upload_id, offset, session['offset'])
+
+            limit = min(self.max_size, session['size']) if session['size'] is not None else self.max_size
+            hasher = self._hasher(session).copy()
+            position = offset
+
+            with open(session['path'], 'r+b') as f:
+                f.seek(offset)
+                f.truncate()
+                for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b''):
+                    position += len(block)
+                    if position > limit:
+                        f.truncate(offset)
+                        raise UploadTooLargeError(f"Upload {upload_id} exceeds {limit} bytes")
+                    f.write(block)
+                    hasher.update(block)
+
+            # The chunk is acknowledged only once all of it is on disk
+            session['offset'] = position
+            self._save(session)
+            self._cache_hasher(upload_id, position, hasher)
+            return session
+
+    def complete(self, upload_id):
+        """
+        Finishes an upload, checking its size and hash against the declared ones. With a blob
+        store, the file then moves into the store, or is dropped as a duplicate of a stored blob.
+
+        Returns:
+        dict: The completed upload session, with its sha256.
+        """
+        with self._lock(upload_id):
+            session = self.get(upload_id)
+            if session['complete']:
+                return session
+            if session['size'] is not None and session['offset'] != session['size']:
+                raise ValueError(f"Upload {upload_id} has {session['offset']} of {session['size']} bytes")
+
+            digest = self._hasher(session).hexdigest()
+            if session['expected_sha256'] and digest != session['expected_sha256']:
+                raise ValueError(f"Upload {upload_id} sha256 {digest} does not match the declared {session['expected_sha256']}")
+
+            session.update({'sha256': digest, 'size': session['offset'], 'complete': True})
+            if self.blob_store is not None:
+                # The upload folder keeps a reference, the bytes are stored once per hash
+                blob_path, created = self.blob_store.adopt(session['path'], digest, session['filename'])
+                self.blob_store.write_reference(session['folder'], session['filename'], digest, blob_path)
+                session.update({'path': blob_path, 'duplicate': not created})
+            self._save(session)
+            with self._hashers_guard:
+                self._hashers.pop(upload_id, None)
+            logging.info(f"Upload {upload_id} complete: {session['size']} bytes, sha256 {digest}")
+            return session
+
+    def completed(self, upload_id):
+        """Returns the session of a completed upload."""
+        session = self.get(upload_id)
+        if not session['complete']:
+            raise ValueError(f"Upload {upload_id} is not complete")
+        return session
@@ -12,7 +12,8 @@ from pymongo import MongoClient
 
 # Local imports
 from backend import config
-from backend.ingestion import csv_source_handler, db_source_handler, df_to_db
+from backend.ingestion import csv_source_handler, db_source_handler, df_to_db, parquet_source_handler
+from backend.models.tmm1_data import required_columns, sampling_config
 
 # Load environment variables
 load_dotenv()
@@ -72,11 +73,17 @@ def file_type_handler(configFilePath, dataFilePath=None):
             df, data_config = csv_source_handler.csv_handler(configFilePath, dataFilePath)
             logging.info("CSV data ingested successfully.")
             return df, data_config
+        elif source_type == 'parquet':
+            df, data_config = parquet_source_handler.parquet_handler(configFilePath, dataFilePath)
+            logging.info("Parquet data ingested successfully.")
+            return df, data_config
         elif source_type == 'db':
             logging.info("Parsing Database Configuration file..")
             connection_params = data_config['configuration']['attributes']['connection_details']
             logging.debug(f"Connection parameters: {connection_params}")
-            df = db_source_handler.db_handler(connection_params=connection_params)
+            df = db_source_handler.db_handler(connection_params=connection_params,
+                                              columns=required_columns(data_config),
+                                              sampling=sampling_config(data_config))
             if df is not None:
                 logging.info("Database data ingested successfully.")
             else:
@@ -99,6 +106,25 @@ def file_type_handler(configFilePath, dataFilePath=None):
         logging.error(f"Unexpected error processing configuration: {str(e)}")
         return None, None
 
+def chunked_source_handler(configFilePath, dataFilePath=None):
+    """
+    Streaming counterpart of file_type_handler, for configuration.attributes.read_mode 'chunked'.
+
+    Returns:
+    - Generator of DataFrame chunks sorted by loan, and the data configuration.
+    """
+    with open(configFilePath, 'r') as f:
+        data_config = json.load(f)
+
+    source_type = data_config['configuration']['source'].lower()
+    logging.info(f"Reading {source_type} source in chunks")
+
+    if source_type == 'csv':
+        return csv_source_handler.csv_chunk_handler(configFilePath, dataFilePath)
+    elif source_type == 'db':
+        return db_source_handler.db_chunk_handler(configFilePath)
+    raise ValueError(f"Chunked reads are not supported for source type '{source_type}'")
+
 def data_source_handler(config_file, data_file_path, read_rows=None):
     """
     Handles data source based on the configuration file provided.
@@ -128,12 +154,16 @@ def data_source_handler(config_file, data_file_path, read_rows=None):
 
         if source_type == 'csv':
             df, data_config = csv_source_handler.csv_handler(config_file, data_file_path, read_rows)
+        elif source_type == 'parquet':
+            df, data_config = parquet_source_handler.parquet_handler(config_file, data_file_path)
         elif source_type == 'excel':
             df = pd.read_excel(data_file_path, nrows=read_rows)
             logging.info(f"Dataset imported successfully from Excel. Imported {read_rows if read_rows else 'all'} rows")
         elif source_type == 'db':
             connection_params = data_config['configuration']['attributes']['connection_details']
-            df = db_source_handler.db_handler(connection_params=connection_params)
+            df = db_source_handler.db_handler(connection_params=connection_params,
+                                              columns=required_columns(data_config),
+                                              sampling=sampling_config(data_config))
             logging.info("Dataset imported successfully from Database.")
         else:
             logging.error(f"Unsupported source type: {source_type}")
@@ -156,6 +186,18 @@ def data_source_handler(config_file, data_file_path, read_rows=None):
 
     return df, data_config 
 
+def flatten_keys(value, separator='|'):
+    """
+    Joins the tuple keys produced by MultiIndex labels into strings, recursively.
+    JSON and MongoDB documents only accept string keys.
+    """
+    if isinstance(value, dict):
+        return {
+            (separator.join(map(str, key)) if isinstance(key, tuple) else key): flatten_keys(item, separator)
+            for key, item in value.items()
+        }
+    return value
+
 def export_output(data: dict, file_name_prefix='', file_name_suffix='', file_path='./', save_to_mongodb=True):
     """
     Exports a dictionary containing Pandas Series, DataFrames, and plots/images to JSON and image files.
@@ -199,7 +241,7 @@ def export_output(data: dict, file_name_prefix='', file_name_suffix='', file_pat
                         if pd.isna(temp_dict[idx]):
                             temp_dict[idx] = 0
                 
-                json_export_data[key] = temp_dict
+                json_export_data[key] = flatten_keys(temp_dict)
 
             elif isinstance(value, plt.Figure):
                 # Save the plot as an image
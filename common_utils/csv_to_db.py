@@ -1,8 +1,12 @@
 import pandas as pd
+import io
+import os
+import csv
 import logging
 import json
 import argparse
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, text
 import time
 
 # Hardcoded connection parameters
@@ -18,10 +22,20 @@ DEFAULT_DB_CONNECTION = f'postgresql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB
 DEFAULT_TABLE_NAME = 'test_data'
 DEFAULT_IF_EXISTS = 'replace'
 DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MODE = 'pandas'
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+DEFAULT_WORKERS = 1
 
-def csv_to_db(csv_file_path, db_connection_string, table_name, if_exists='replace', chunk_size=1000):
+# Load progress is stored in the target database, in the same transaction as each loaded chunk
+CHECKPOINT_TABLE = 'csv_load_checkpoints'
+# Bind parameters per multi-row INSERT on the SQLite path
+SQLITE_MAX_PARAMS = 900
+
+def csv_to_db(csv_file_path, db_connection_string, table_name, if_exists='replace', chunk_size=1000,
+              mode=DEFAULT_MODE, workers=DEFAULT_WORKERS, chunk_bytes=DEFAULT_CHUNK_BYTES, resume=True):
     """
     Reads a CSV file and saves it to a database table.
+    The 'bulk' mode streams the file instead of loading it whole, see bulk_load.
     
     Parameters:
         csv_file_path (str): Path to the CSV file
@@ -29,11 +43,19 @@ def csv_to_db(csv_file_path, db_connection_string, table_name, if_exists='replac
         table_name (str): Name of the table to create/update
         if_exists (str): How to behave if table exists ('fail', 'replace', 'append')
         chunk_size (int): Number of rows to write at a time
+        mode (str): 'pandas' or 'bulk'
+        workers (int): Parallel writers in bulk mode
+        chunk_bytes (int): Size of the blocks written per transaction in bulk mode
+        resume (bool): Continue an interrupted bulk load of the same file
         
     Returns:
         bool: True if successful, False otherwise
     """
     try:
+        if mode == 'bulk':
+            bulk_load(csv_file_path, db_connection_string, table_name, if_exists, workers, chunk_bytes, resume=resume)
+            return True
+
         logging.info(f"Reading CSV file: {csv_file_path}")
         start_time = time.time()
         df = pd.read_csv(csv_file_path)
@@ -68,6 +90,210 @@ def csv_to_db(csv_file_path, db_connection_string, table_name, if_exists='replac
         logging.error(f"Error writing to database: {str(e)}")
         return False
 
+def read_header(csv_file_path, delimiter=','):
+    """Returns the column names and the byte offset of the first data row."""
+    with open(csv_file_path, 'rb') as f:
+        header_line = f.readline()
+    columns = next(csv.reader([header_line.decode('utf-8-sig')], delimiter=delimiter))
+    return [column.strip() for column in columns], len(header_line)
+
+def split_ranges(csv_file_path, data_start, parts):
+    """
+    Splits the data rows of a file into byte ranges that start and end on line boundaries.
+    Records must not contain quoted line breaks.
+    """
+    file_size = os.path.getsize(csv_file_path)
+    boundaries = [data_start]
+    with open(csv_file_path, 'rb') as f:
+        for part in range(1, parts):
+            f.seek(max(data_start + (file_size - data_start) * part // parts - 1, boundaries[-1]))
+            f.readline()
+            boundaries.append(max(f.tell(), boundaries[-1]))
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def read_line_chunks(csv_file_path, start, end, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yields (offset after the chunk, bytes) for blocks of whole lines between two byte offsets."""
+    with open(csv_file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        remainder = b''
+        while position < end:
+            block = f.read(min(chunk_bytes, end - position))
+            if not block:
+                break
+            position += len(block)
+            block = remainder + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0 and position < end:
+                # A line longer than the block, keep reading
+                remainder = block
+                continue
+            if position >= end:
+                cut = len(block)
+            remainder = block[cut:]
+            yield position - len(remainder), block[:cut]
+
+def ensure_checkpoint_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+            "target VARCHAR(255) NOT NULL, part INTEGER NOT NULL, source VARCHAR(1024) NOT NULL, "
+            "byte_offset BIGINT NOT NULL, rows_loaded BIGINT NOT NULL, PRIMARY KEY (target, part))"
+        ))
+
+def load_checkpoints(engine, table_name, source):
+    """Returns {part: (byte_offset, rows_loaded)} of an interrupted load of the same source file."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f"SELECT part, byte_offset, rows_loaded FROM {CHECKPOINT_TABLE} WHERE target = :target AND source = :source"),
+            {'target': table_name, 'source': source}
+        ).fetchall()
+    return {part: (byte_offset, rows_loaded) for part, byte_offset, rows_loaded in rows}
+
+def save_checkpoint(conn, table_name, part, source, byte_offset, rows_loaded):
+    params = {'target': table_name, 'part': part, 'source': source, 'byte_offset': byte_offset, 'rows_loaded': rows_loaded}
+    conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE target = :target AND part = :part"), params)
+    conn.execute(text(
+        f"INSERT INTO {CHECKPOINT_TABLE} (target, part, source, byte_offset, rows_loaded) "
+        "VALUES (:target, :part, :source, :byte_offset, :rows_loaded)"
+    ), params)
+
+def column_dtypes(sample):
+    """
+    Returns read_csv dtypes that parse every chunk like the sample the table was created from.
+    Text columns stay text, so values such as '007' keep their leading zeros in every chunk.
+    """
+    dtypes = {}
+    for column, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[column] = 'boolean'
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[column] = 'Int64'
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[column] = 'float64'
+        else:
+            dtypes[column] = str
+    return dtypes
+
+def write_chunk(conn, table_name, columns, data, delimiter, dtypes=None):
+    """Writes one block of CSV lines: COPY on PostgreSQL, multi-row inserts elsewhere."""
+    quote = conn.dialect.identifier_preparer.quote
+    if conn.dialect.name == 'postgresql':
+        column_list = ', '.join(quote(column) for column in columns)
+        copy_sql = f"COPY {quote(table_name)} ({column_list}) FROM STDIN WITH (FORMAT csv, DELIMITER '{delimiter}')"
+        # The raw cursor shares the transaction of conn
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, io.BytesIO(data))
+    else:
+        chunk = pd.read_csv(io.BytesIO(data), names=columns, header=None, sep=delimiter, dtype=dtypes)
+        chunk.to_sql(table_name, conn, if_exists='append', index=False, method='multi',
+                     chunksize=max(1, SQLITE_MAX_PARAMS // len(columns)))
+
+def load_range(engine, table_name, columns, csv_file_path, source, part, start, end, rows_loaded=0,
+               chunk_bytes=DEFAULT_CHUNK_BYTES, delimiter=',', dtypes=None):
+    """Loads a line aligned byte range of the file, committing a checkpoint with every chunk."""
+    range_start = time.time()
+    rows_at_start = rows_loaded
+    for offset, data in read_line_chunks(csv_file_path, start, end, chunk_bytes):
+        chunk_start = time.time()
+        rows = data.count(b'\n') + (0 if data.endswith(b'\n') else 1)
+        with engine.begin() as conn:
+            write_chunk(conn, table_name, columns, data, delimiter, dtypes)
+            rows_loaded += rows
+            save_checkpoint(conn, table_name, part, source, offset, rows_loaded)
+        logging.info(f"[{table_name} part {part}] {rows} rows in {time.time() - chunk_start:.2f}s "
+                     f"({rows / max(time.time() - chunk_start, 1e-9):.0f} rows/s), byte offset {offset}")
+
+    duration = time.time() - range_start
+    logging.info(f"[{table_name} part {part}] loaded {rows_loaded - rows_at_start} rows "
+                 f"({(rows_loaded - rows_at_start) / max(duration, 1e-9):.0f} rows/s)")
+    return rows_loaded
+
+def bulk_load(csv_file_path, db_connection_string, table_name, if_exists='replace', workers=DEFAULT_WORKERS,
+              chunk_bytes=DEFAULT_CHUNK_BYTES, delimiter=',', resume=True):
+    """
+    Streams a CSV file into a database table in blocks of whole lines, without parsing it in pandas
+    on PostgreSQL (COPY) and chunk by chunk elsewhere (multi-row inserts, used for SQLite).
+
+    Every chunk commits together with its byte offset in the csv_load_checkpoints table, so a rerun
+    of an interrupted load of the same file continues after the last committed chunk. With several
+    workers on PostgreSQL, the file is split into line aligned byte ranges, each loaded over its own
+    connection into a staging table, which are moved into the target table at the end.
+
+    Parameters:
+        csv_file_path (str): Path to the CSV file, with a header row
+        db_connection_string (str): SQLAlchemy database connection string
+        table_name (str): Name of the table to create/update
+        if_exists (str): How to behave if table exists ('fail', 'replace', 'append'), ignored on resume
+        workers (int): Parallel writers, SQLite always uses one
+        chunk_bytes (int): Size of the blocks of lines written per transaction
+        delimiter (str): Field delimiter
+        resume (bool): Continue an interrupted load of the same file
+
+    Returns:
+        int: Number of rows loaded
+    """
+    load_start = time.time()
+    engine = create_engine(db_connection_string, pool_size=max(5, workers)) \
+        if not db_connection_string.startswith('sqlite') else create_engine(db_connection_string)
+    if engine.dialect.name != 'postgresql' and workers > 1:
+        logging.info(f"{engine.dialect.name} loads with a single writer")
+        workers = 1
+
+    columns, data_start = read_header(csv_file_path, delimiter)
+    stat = os.stat(csv_file_path)
+    # Identifies the file version the checkpoints belong to
+    source = f"{os.path.abspath(csv_file_path)}|{stat.st_size}|{int(stat.st_mtime)}"
+
+    ensure_checkpoint_table(engine)
+    checkpoints = load_checkpoints(engine, table_name, source) if resume else {}
+    ranges = split_ranges(csv_file_path, data_start, workers)
+    staged = workers > 1
+    # Column types are inferred once from the first rows, chunks are parsed with the same types
+    sample = pd.read_csv(csv_file_path, nrows=10000, sep=delimiter)
+    dtypes = column_dtypes(sample)
+    targets = [f"{table_name}_stage_{part}" if staged else table_name for part in range(workers)]
+
+    if checkpoints and len(checkpoints) == len(ranges):
+        logging.info(f"Resuming load of {csv_file_path} into {table_name} from checkpoints")
+    else:
+        checkpoints = {}
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE target = :target"), {'target': table_name})
+        sample.head(0).to_sql(table_name, engine, if_exists=if_exists, index=False)
+        quote = engine.dialect.identifier_preparer.quote
+        with engine.begin() as conn:
+            for part, target in enumerate(targets):
+                if staged:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {quote(target)}"))
+                    conn.execute(text(f"CREATE TABLE {quote(target)} AS SELECT * FROM {quote(table_name)} WHERE 1 = 0"))
+                save_checkpoint(conn, table_name, part, source, ranges[part][0], 0)
+        checkpoints = {part: (ranges[part][0], 0) for part in range(len(ranges))}
+
+    def load_part(part):
+        offset, rows_loaded = checkpoints[part]
+        return load_range(engine, targets[part], columns, csv_file_path, source, part, offset, ranges[part][1],
+                          rows_loaded, chunk_bytes, delimiter, dtypes) if offset < ranges[part][1] else rows_loaded
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='csv-load') as executor:
+        total_rows = sum(executor.map(load_part, range(len(ranges))))
+
+    with engine.begin() as conn:
+        if staged:
+            # Staging tables move into the target and the checkpoints go in one transaction
+            quote = engine.dialect.identifier_preparer.quote
+            for target in targets:
+                conn.execute(text(f"INSERT INTO {quote(table_name)} SELECT * FROM {quote(target)}"))
+                conn.execute(text(f"DROP TABLE {quote(target)}"))
+        conn.execute(text(f"DELETE FROM {CHECKPOINT_TABLE} WHERE target = :target"), {'target': table_name})
+
+    duration = time.time() - load_start
+    logging.info(f"Loaded {total_rows} rows into '{table_name}' in {duration:.2f} seconds "
+                 f"({total_rows / max(duration, 1e-9):.0f} rows/s)")
+    engine.dispose()
+    return total_rows
+
 def load_config(config_file_path):
     """Load configuration from a JSON file."""
     try:
@@ -128,6 +354,10 @@ def main():
     parser.add_argument('--table_name', type=str, help='Name of the table to create/update')
     parser.add_argument('--if_exists', type=str, default='replace', help='How to behave if table exists (default: replace)')
     parser.add_argument('--chunk_size', type=int, default=1000, help='Number of rows to write at a time (default: 1000)')
+    parser.add_argument('--mode', type=str, default=DEFAULT_MODE, choices=['pandas', 'bulk'], help='pandas or streaming bulk load (default: pandas)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parallel writers in bulk mode (default: 1)')
+    parser.add_argument('--chunk_bytes', type=int, default=DEFAULT_CHUNK_BYTES, help='Bytes written per transaction in bulk mode')
+    parser.add_argument('--no_resume', action='store_true', help='Restart an interrupted bulk load from the beginning')
 
     args = parser.parse_args()
 
@@ -139,6 +369,9 @@ def main():
             table_name = config.get('table_name')
             if_exists = config.get('if_exists', 'replace')
             chunk_size = config.get('chunk_size', 1000)
+            args.mode = config.get('mode', args.mode)
+            args.workers = config.get('workers', args.workers)
+            args.chunk_bytes = config.get('chunk_bytes', args.chunk_bytes)
         else:
             logging.error("Failed to load configuration from file.")
             return  # Exit if config loading failed
@@ -156,7 +389,8 @@ def main():
         logging.error("Missing required parameters. Please provide csv_file_path, db_connection_string, and table_name.")
         return
 
-    csv_to_db(csv_file_path, db_connection_string, table_name, if_exists, chunk_size)
+    csv_to_db(csv_file_path, db_connection_string, table_name, if_exists, chunk_size,
+              args.mode, args.workers, args.chunk_bytes, not args.no_resume)
 
 if __name__ == "__main__":
     main()
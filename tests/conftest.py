@@ -1,7 +1,64 @@
 import os
 import shutil
+
+import numpy as np
+import pandas as pd
 import pytest
 
+BUCKET_MAP = {
+    "0": "Current",
+    "1": "30 DPD",
+    "2": "60 DPD",
+    "3": "90 DPD",
+    "4": "120 DPD",
+    "5": "Charged Off"
+}
+
+@pytest.fixture
+def data_config():
+    return {
+        "configuration": {
+            "loan_buckets": {
+                "bucket_count": len(BUCKET_MAP),
+                "bucket_map": dict(BUCKET_MAP)
+            },
+            "required_cols": ["LOAN_ID", "ACT_PERIOD", "ORIG_UPB", "CURRENT_UPB", "DLQ_STATUS", "ORIG_TERM"],
+            # Tests run on every loan, see test_tmm1_data for the sample itself
+            "sampling": {"orig_terms": [360], "fraction": 1.0},
+            "forecasted_months": 24,
+            "WAL": 3.5,
+            "Snapshot_Date": "2023-12-31"
+        }
+    }
+
+@pytest.fixture
+def loan_data():
+    # Random walk through the delinquency buckets, charged-off loans stop reporting
+    rng = np.random.default_rng(7)
+    rows = []
+    for loan_id in range(1, 301):
+        orig_upb = float(rng.integers(50, 500) * 1000)
+        upb = orig_upb
+        status = 0
+        for period in range(int(rng.integers(1, 25))):
+            if rng.random() < 0.02:
+                # Statuses outside the bucket map are dropped by tmm1_data.prepare
+                rows.append((loan_id, period, orig_upb, upb, 9, 360))
+                continue
+            rows.append((loan_id, period, orig_upb, np.nan if rng.random() < 0.03 else upb, status, 360))
+            if status == 5:
+                break
+            upb = max(upb - 1000.0, 0.0)
+            status = int(min(max(status + rng.choice([-1, 0, 0, 0, 1]), 0), 5))
+
+    df = pd.DataFrame(rows, columns=["LOAN_ID", "ACT_PERIOD", "ORIG_UPB", "CURRENT_UPB", "DLQ_STATUS", "ORIG_TERM"])
+    # Loan tapes arrive in reporting order, not loan order
+    return df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+@pytest.fixture
+def bucket_map():
+    return dict(BUCKET_MAP)
+
 @pytest.fixture(scope='function', autouse=True)
 def setup_upload_folder():
     """Fixture to clean up and prepare the uploads folder before and after each test."""
@@ -0,0 +1,84 @@
+# Standard library imports
+import os
+import hashlib
+import multiprocessing
+from io import BytesIO
+
+# Third-party imports
+import pytest
+
+# Local imports
+from backend import blob_store, upload_sessions
+
+@pytest.fixture
+def store(tmp_path):
+    return blob_store.BlobStore(str(tmp_path / 'blobs'))
+
+def stored_files(store):
+    return sorted(os.path.relpath(os.path.join(root, name), store.folder)
+                  for root, _, names in os.walk(store.folder) for name in names if not name.endswith('.lock'))
+
+def test_duplicate_uploads_share_one_blob(store, tmp_path):
+    payload = b'LOAN_ID|ACT_PERIOD\n1|2020-01\n'
+    sha256 = hashlib.sha256(payload).hexdigest()
+
+    first = store.put_stream(BytesIO(payload), 'tape.csv.gz')
+    second = store.put_stream(BytesIO(payload), 'resubmitted.csv.gz')
+    verified = store.put_stream(BytesIO(payload), 'again.csv.gz', sha256.upper())
+    reference = store.write_reference(str(tmp_path / 'report'), 'again.csv.gz', sha256, verified[1])
+
+    # Assertions
+    assert first == (sha256, os.path.join(store.blob_folder(sha256), 'data.csv.gz'), True)
+    assert second == (sha256, first[1], False)
+    assert verified == (sha256, first[1], False)
+    assert stored_files(store) == [os.path.join(sha256[:2], sha256, name) for name in ('blob.json', 'data.csv.gz')]
+    assert blob_store.read_reference(reference)['blob_path'] == first[1]
+
+def test_declared_hash_is_verified(store):
+    payload = b'1|2020-01\n'
+    store.put_stream(BytesIO(payload), 'tape.csv')
+
+    with pytest.raises(ValueError):
+        store.put_stream(BytesIO(b'other bytes'), 'tape.csv', hashlib.sha256(payload).hexdigest())
+    with pytest.raises(ValueError):
+        store.put_stream(BytesIO(b'other bytes'), 'tape.csv', '0' * 64)
+
+    # Assertions
+    assert len(stored_files(store)) == 2
+
+def test_completed_chunked_upload_moves_into_blob_store(store, tmp_path):
+    payload = b'1|2020-01\n' * 50
+    store.put_stream(BytesIO(payload), 'tape.csv')
+    uploads = upload_sessions.UploadStore(str(tmp_path / 'uploads'), str(tmp_path / 'sessions'), blob_store=store)
+
+    session = uploads.init('tape.csv', report_name='q4')
+    uploads.append(session['upload_id'], 0, BytesIO(payload))
+    completed = uploads.complete(session['upload_id'])
+
+    # Assertions
+    assert completed['duplicate']
+    assert completed['path'] == store.find(hashlib.sha256(payload).hexdigest())
+    assert uploads.completed(session['upload_id'])['path'] == completed['path']
+    assert os.listdir(session['folder']) == ['tape.csv' + blob_store.REFERENCE_SUFFIX]
+
+def test_unreadable_manifest_is_not_stored(store):
+    sha256 = hashlib.sha256(b'1|2020-01\n').hexdigest()
+    os.makedirs(store.blob_folder(sha256))
+    with open(os.path.join(store.blob_folder(sha256), blob_store.BLOB_MANIFEST), 'w') as f:
+        f.write('{"data": "da')
+
+    # Assertions
+    assert store.find(sha256) is None
+    assert store.put_stream(BytesIO(b'1|2020-01\n'), 'tape.csv')[2]
+    assert store.find(sha256) == os.path.join(store.blob_folder(sha256), 'data.csv')
+
+def put_payload(folder):
+    return blob_store.BlobStore(folder).put_stream(BytesIO(b'1|2020-01\n' * 1000), 'tape.csv')[2]
+
+def test_processes_store_a_blob_once(store):
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        created = pool.map(put_payload, [store.folder] * 8)
+
+    # Assertions
+    assert created.count(True) == 1
+    assert len(stored_files(store)) == 2
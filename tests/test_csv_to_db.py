@@ -0,0 +1,109 @@
+# Standard library imports
+import importlib
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Local imports
+loader = importlib.import_module('common_utils.csv_to_db')
+
+@pytest.fixture
+def loan_csv(tmp_path):
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        'LOAN_ID': np.arange(1, 501),
+        'CURRENT_UPB': rng.random(500).round(2) * 1000,
+        'STATUS': rng.choice(['00', '01', 'XX'], 500)
+    })
+    file_path = tmp_path / 'loans.csv'
+    df.to_csv(file_path, index=False)
+    return str(file_path), df
+
+def read_table(connection_string, table_name):
+    engine = create_engine(connection_string)
+    with engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT * FROM {table_name} ORDER BY LOAN_ID"), conn)
+
+def test_split_ranges_line_aligned(loan_csv):
+    file_path, _ = loan_csv
+    columns, data_start = loader.read_header(file_path)
+
+    ranges = loader.split_ranges(file_path, data_start, 4)
+
+    # Assertions
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    assert columns == ['LOAN_ID', 'CURRENT_UPB', 'STATUS']
+    assert ranges[0][0] == data_start and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(data[start - 1:start] == b'\n' for start, _ in ranges)
+    chunks = [chunk for start, end in ranges for _, chunk in loader.read_line_chunks(file_path, start, end, 256)]
+    assert b''.join(chunks) == data[data_start:]
+    assert all(chunk.endswith(b'\n') for chunk in chunks)
+
+def test_bulk_load_sqlite(loan_csv, tmp_path):
+    file_path, df = loan_csv
+    connection_string = f"sqlite:///{tmp_path / 'loans.db'}"
+
+    rows = loader.bulk_load(file_path, connection_string, 'loans', chunk_bytes=1024)
+
+    # Assertions
+    assert rows == len(df)
+    pd.testing.assert_frame_equal(read_table(connection_string, 'loans'), df, check_dtype=False)
+    with create_engine(connection_string).connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {loader.CHECKPOINT_TABLE}")).scalar() == 0
+
+def test_bulk_load_resumes_after_interruption(loan_csv, tmp_path, monkeypatch):
+    file_path, df = loan_csv
+    connection_string = f"sqlite:///{tmp_path / 'loans.db'}"
+    write_chunk = loader.write_chunk
+    calls = []
+
+    def failing_write_chunk(*args):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        write_chunk(*args)
+
+    monkeypatch.setattr(loader, 'write_chunk', failing_write_chunk)
+    with pytest.raises(RuntimeError):
+        loader.bulk_load(file_path, connection_string, 'loans', chunk_bytes=1024)
+    partial = read_table(connection_string, 'loans')
+    monkeypatch.setattr(loader, 'write_chunk', write_chunk)
+
+    rows = loader.bulk_load(file_path, connection_string, 'loans', chunk_bytes=1024)
+
+    # Assertions
+    assert 0 < len(partial) < len(df)
+    assert rows == len(df)
+    pd.testing.assert_frame_equal(read_table(connection_string, 'loans'), df, check_dtype=False)
+
+def test_csv_to_db_bulk_mode(loan_csv, tmp_path):
+    file_path, df = loan_csv
+    connection_string = f"sqlite:///{tmp_path / 'loans.db'}"
+
+    # Assertions
+    assert loader.csv_to_db(file_path, connection_string, 'loans', mode='bulk', workers=4)
+    assert len(read_table(connection_string, 'loans')) == len(df)
+
+def test_bulk_load_keeps_leading_zeros(tmp_path):
+    # Only the first rows have a status that is not a number, later chunks would parse as integers
+    df = pd.DataFrame({
+        'LOAN_ID': np.arange(1, 301),
+        'STATUS': ['XX'] * 5 + [f"0{i % 7}" for i in range(295)],
+        'RATE': [None] * 5 + [0.5] * 295
+    })
+    file_path = tmp_path / 'loans.csv'
+    df.to_csv(file_path, index=False)
+    connection_string = f"sqlite:///{tmp_path / 'loans.db'}"
+
+    rows = loader.bulk_load(str(file_path), connection_string, 'loans', chunk_bytes=256)
+
+    # Assertions
+    assert rows == len(df)
+    loaded = read_table(connection_string, 'loans')
+    assert loaded['STATUS'].tolist() == df['STATUS'].tolist()
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
@@ -0,0 +1,151 @@
+# Standard library imports
+import json
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+# Local imports
+from backend.ingestion import db_source_handler
+from backend.models import tmm1, tmm1_chunked, tmm1_data
+
+@pytest.fixture
+def sqlite_params(tmp_path, loan_data):
+    database = tmp_path / 'loans.sqlite'
+    engine = create_engine(f"sqlite:///{database}")
+    loan_data.assign(EXTRA=1.5).to_sql('loans', engine, index=False)
+    engine.dispose()
+
+    yield {'engine': 'sqlite', 'database_name': str(database), 'table': 'loans'}
+
+    db_source_handler.dispose_engines()
+
+def test_engines_are_pooled_per_connection(sqlite_params, tmp_path):
+    engine = db_source_handler.create_db_engine(sqlite_params)
+    other = db_source_handler.create_db_engine(dict(sqlite_params, database_name=str(tmp_path / 'other.sqlite')))
+
+    # Assertions
+    assert db_source_handler.create_db_engine(dict(sqlite_params)) is engine
+    assert other is not engine
+
+def test_db_chunks_stream_the_full_result(sqlite_params, loan_data):
+    columns = list(loan_data.columns)
+
+    chunks = list(db_source_handler.db_chunks(sqlite_params, columns=columns, chunksize=700))
+    full = db_source_handler.db_handler(sqlite_params, columns=columns)
+
+    # Assertions
+    assert [len(chunk) for chunk in chunks[:-1]] == [700] * (len(chunks) - 1)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), full)
+    pd.testing.assert_frame_equal(full, loan_data, check_dtype=False)
+
+def test_db_chunks_with_configured_query(sqlite_params):
+    sqlite_params['query'] = 'SELECT LOAN_ID FROM loans WHERE DLQ_STATUS = 5'
+
+    chunks = list(db_source_handler.db_chunks(sqlite_params, chunksize=10))
+
+    # Assertions
+    assert list(chunks[0].columns) == ['LOAN_ID']
+    assert sum(len(chunk) for chunk in chunks) == len(db_source_handler.db_handler(sqlite_params))
+
+def test_db_chunk_handler_feeds_chunked_model(tmp_path, sqlite_params, loan_data, data_config):
+    data_config['configuration']['source'] = 'db'
+    data_config['configuration']['attributes'] = {'connection_details': dict(sqlite_params, chunksize=250)}
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+    expected = tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)
+
+    chunks, data_config = db_source_handler.db_chunk_handler(str(config_file))
+    result = tmm1_chunked.run_model_chunked(chunks, data_config)
+
+    # Assertions
+    np.testing.assert_array_equal(result['Transition_Counts'], expected['Transition_Counts'])
+    assert result['ALLL'] == pytest.approx(expected['ALLL'])
+
+@pytest.mark.parametrize('partitioning', [
+    {'column': 'LOAN_ID', 'count': 4},
+    {'column': 'ACT_PERIOD', 'count': 3, 'method': 'range', 'workers': 2},
+    {'column': 'LOAN_ID', 'count': 1, 'method': 'range'}
+])
+def test_partitioned_read_matches_single_query(sqlite_params, loan_data, partitioning):
+    columns = list(loan_data.columns)
+    full = db_source_handler.db_handler(sqlite_params, columns=columns)
+
+    sqlite_params['partitioning'] = partitioning
+    queries = db_source_handler.partition_queries(sqlite_params, columns)
+    partitioned = db_source_handler.db_handler(sqlite_params, columns=columns)
+
+    # Assertions
+    assert len(queries) == partitioning['count']
+    sort_keys = ['LOAN_ID', 'ACT_PERIOD', 'DLQ_STATUS']
+    pd.testing.assert_frame_equal(
+        partitioned.sort_values(sort_keys).reset_index(drop=True),
+        full.sort_values(sort_keys).reset_index(drop=True)
+    )
+
+def test_partition_chunks_keep_loans_together(tmp_path, sqlite_params, loan_data, data_config):
+    sqlite_params.update(chunksize=100, partitioning={'column': 'LOAN_ID', 'count': 3})
+    data_config['configuration']['source'] = 'db'
+    data_config['configuration']['attributes'] = {'connection_details': sqlite_params}
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    chunks, data_config = db_source_handler.db_chunk_handler(str(config_file))
+    chunks = list(chunks)
+    stream = pd.concat(chunks, ignore_index=True)
+
+    # Assertions
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert len(stream) == len(loan_data)
+    # Every loan arrives as one run of rows, in period order
+    loan_starts = stream['LOAN_ID'].ne(stream['LOAN_ID'].shift())
+    assert loan_starts.sum() == stream['LOAN_ID'].nunique()
+    assert (stream.groupby('LOAN_ID')['ACT_PERIOD'].diff().dropna() > 0).all()
+    result = tmm1_chunked.run_model_chunked(chunks, data_config)
+    expected = tmm1_chunked.run_model_chunked([stream], data_config)
+    np.testing.assert_array_equal(result['Transition_Counts'], expected['Transition_Counts'])
+
+def test_partitioned_read_rejects_configured_query(sqlite_params):
+    sqlite_params.update(query='SELECT * FROM loans', partitioning={'column': 'LOAN_ID', 'count': 2})
+
+    with pytest.raises(ValueError):
+        db_source_handler.partition_queries(sqlite_params)
+
+def test_sampling_in_sql_matches_in_memory_sample(tmp_path, loan_data):
+    loan_data = loan_data.assign(ORIG_TERM=np.where(loan_data['LOAN_ID'] % 4 == 0, 180, 360))
+    database = tmp_path / 'mixed.sqlite'
+    engine = create_engine(f"sqlite:///{database}")
+    loan_data.to_sql('loans', engine, index=False)
+    engine.dispose()
+    params = {'engine': 'sqlite', 'database_name': str(database), 'table': 'loans'}
+    sampling = {'orig_terms': [360], 'fraction': 0.3, 'seed': 11}
+
+    in_memory = tmm1_data.sample_loans(loan_data, sampling)
+    pushed_down = db_source_handler.db_handler(params, columns=list(loan_data.columns), sampling=sampling)
+    partitioned = db_source_handler.db_handler(dict(params, partitioning={'column': 'LOAN_ID', 'count': 3}),
+                                               columns=list(loan_data.columns), sampling=sampling)
+
+    # Assertions
+    sort_keys = ['LOAN_ID', 'ACT_PERIOD', 'DLQ_STATUS']
+    expected = in_memory.sort_values(sort_keys).reset_index(drop=True)
+    for result in (pushed_down, partitioned):
+        pd.testing.assert_frame_equal(result.sort_values(sort_keys).reset_index(drop=True), expected, check_dtype=False)
+
+def test_sampling_of_alphanumeric_loan_ids_runs_in_memory(tmp_path, loan_data):
+    loan_data = loan_data.assign(LOAN_ID='L' + loan_data['LOAN_ID'].astype(str).str.zfill(6))
+    database = tmp_path / 'alphanumeric.sqlite'
+    engine = create_engine(f"sqlite:///{database}")
+    loan_data.to_sql('loans', engine, index=False)
+    engine.dispose()
+    params = {'engine': 'sqlite', 'database_name': str(database), 'table': 'loans'}
+    sampling = {'orig_terms': [360], 'fraction': 0.3, 'seed': 11}
+
+    read = db_source_handler.db_handler(params, columns=list(loan_data.columns), sampling=sampling)
+
+    # Assertions
+    assert not db_source_handler.loan_id_is_integer(params)
+    assert read['LOAN_ID'].nunique() == loan_data['LOAN_ID'].nunique()
+    pd.testing.assert_frame_equal(tmm1_data.sample_loans(read, sampling), tmm1_data.sample_loans(loan_data, sampling),
+                                  check_dtype=False)
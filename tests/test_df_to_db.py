@@ -0,0 +1,101 @@
+# Standard library imports
+import importlib
+import struct
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Local imports
+# backend.ingestion re-exports the df_to_db function under the module's name
+loader = importlib.import_module('backend.ingestion.df_to_db')
+
+def decode_binary_copy(data, formats):
+    """Parses PostgreSQL binary COPY data back into rows, formats holds a struct format per column."""
+    assert data.startswith(loader.PGCOPY_HEADER)
+    position = len(loader.PGCOPY_HEADER)
+    rows = []
+    while True:
+        (count,) = struct.unpack_from('>h', data, position)
+        position += 2
+        if count == -1:
+            break
+        row = []
+        for column_format in formats:
+            (length,) = struct.unpack_from('>i', data, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+                continue
+            field = data[position:position + length]
+            position += length
+            row.append(field.decode() if column_format is None else struct.unpack(column_format, field)[0])
+        rows.append(row)
+    assert position == len(data)
+    return rows
+
+def test_generator_reader_serves_reads_of_any_size():
+    reader = loader.GeneratorReader([b'abc', b'', b'defgh', b'i'])
+
+    # Assertions
+    assert reader.read(2) == b'ab'
+    assert reader.read(4) == b'c'
+    assert reader.read() == b'defghi'
+    assert reader.read(1) == b''
+
+def test_generator_reader_small_reads_of_a_large_chunk():
+    chunk = bytes(range(256)) * 4096
+    reader = loader.GeneratorReader([chunk, b'tail'])
+
+    # Assertions
+    data = b''.join(iter(lambda: reader.read(1000), b''))
+    assert data == chunk + b'tail'
+
+def test_binary_copy_round_trip():
+    df = pd.DataFrame({
+        'LOAN_ID': np.arange(6, dtype=np.int64) * 10 ** 10,
+        'TERM': np.array([360, 180, 360, 360, 240, 360], dtype=np.int32),
+        'RATE': np.array([4.5, 3.25, 5.0, 6.0, 2.0, 1.5], dtype=np.float32),
+        'UPB': [100.5, 2.25, 3.0, 4.0, 5.0, 6.0],
+        'FLAG': [True, False, True, True, False, True],
+        'PERIOD': pd.to_datetime(['2000-01-01 00:00', '2020-02-29 12:00', '1999-12-31 00:00', '2021-01-01 00:00', '2022-01-01 00:00', '2023-01-01 00:00']),
+        'STATE': ['CA', 'NY', 'TX', 'WA', 'OR', 'NV']
+    })
+    # Second chunk has missing values, so it is packed row by row
+    df.loc[4, 'UPB'] = np.nan
+    df.loc[5, 'STATE'] = None
+    formats = ['>q', '>i', '>f', '>d', '>?', '>q', None]
+
+    data = b''.join(loader.binary_copy_chunks(df.drop(columns='STATE'), chunksize=3))
+    rows = decode_binary_copy(data, formats[:-1])
+    text_rows = decode_binary_copy(b''.join(loader.binary_copy_chunks(df[['STATE']], chunksize=4)), [None])
+
+    # Assertions
+    assert [row[0] for row in rows] == list(df['LOAN_ID'])
+    assert [row[1] for row in rows] == list(df['TERM'])
+    assert [row[2] for row in rows] == list(df['RATE'])
+    assert [row[3] for row in rows] == [100.5, 2.25, 3.0, 4.0, None, 6.0]
+    assert [row[4] for row in rows] == list(df['FLAG'])
+    assert rows[0][5] == 0 and rows[1][5] == ((pd.Timestamp('2020-02-29 12:00') - pd.Timestamp('2000-01-01')) // pd.Timedelta(microseconds=1))
+    assert [row[0] for row in text_rows] == ['CA', 'NY', 'TX', 'WA', 'OR', None]
+
+def test_csv_copy_chunks_write_nulls_as_empty_fields():
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': ['x', None, 'z,w']})
+
+    chunks = list(loader.csv_copy_chunks(df, chunksize=2))
+
+    # Assertions
+    assert chunks == [b'1,x\n2,\n', b'3,"z,w"\n']
+
+def test_df_to_db_falls_back_to_multi_row_inserts(tmp_path, loan_data):
+    engine = create_engine(f"sqlite:///{tmp_path / 'loads.sqlite'}")
+
+    method = loader.df_to_db(loan_data, engine, 'loans', chunksize=500)
+    loader.df_to_db(loan_data.head(10), engine, 'loans', if_exists='append', chunksize=500)
+
+    # Assertions
+    assert method == 'insert'
+    stored = pd.read_sql('SELECT * FROM loans', engine)
+    expected = pd.concat([loan_data, loan_data.head(10)], ignore_index=True)
+    pd.testing.assert_frame_equal(stored, expected)
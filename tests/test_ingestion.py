@@ -0,0 +1,283 @@
+# Standard library imports
+import os
+import gzip
+import json
+import time
+import zipfile
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.dialects import postgresql
+
+# Local imports
+from backend.ingestion import compression, csv_source_handler, db_source_handler, parquet_source_handler
+from backend.data_handler import column_dtypes, preprocessor
+from backend.models import tmm1, tmm1_chunked, tmm1_data
+
+def wide_config(data_config):
+    configuration = data_config['configuration']
+    configuration['source'] = 'csv'
+    configuration['attributes'] = {
+        'delimiter': '|',
+        'names': 'None',
+        'dtype': {'LOAN_ID': 'int64', 'DLQ_STATUS': 'int64', 'EXTRA_0': 'float64'}
+    }
+    configuration['data_specific_functions'] = {
+        'date_columns': {'ACT_PERIOD': {'date_format': 'XMYYYY'}},
+        'replace_values': [{'column_name': 'DLQ_STATUS', 'values_to_replace': ['XX'], 'values_to_replace_with': ['9']}]
+    }
+    return data_config
+
+def test_required_columns(data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['segmentation'] = {'column': 'STATE'}
+
+    # Assertions
+    assert tmm1_data.required_columns(data_config) == [
+        'LOAN_ID', 'ACT_PERIOD', 'ORIG_UPB', 'CURRENT_UPB', 'DLQ_STATUS', 'ORIG_TERM', 'STATE'
+    ]
+
+def test_csv_handler_reads_required_columns(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    wide = loan_data.assign(**{f'EXTRA_{i}': 1.5 for i in range(20)})
+    data_file = tmp_path / 'loans.csv'
+    wide.to_csv(data_file, sep='|', index=False)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    df, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+    df_all, _ = csv_source_handler.csv_handler(str(config_file), str(data_file), all_columns=True)
+
+    # Assertions
+    assert sorted(df.columns) == sorted(tmm1_data.required_columns(data_config))
+    pd.testing.assert_frame_equal(df, df_all[df.columns])
+
+def test_duplicates_judged_on_record_keys(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['data_specific_functions']['date_columns'] = {}
+    wide = loan_data.assign(EXTRA_0=1.5)
+    # A repeated loan-month that differs only in a column the model does not read, and an exact copy
+    repeated = wide.iloc[[3, 10]].assign(EXTRA_0=[2.5, 1.5])
+    data_file = tmp_path / 'loans.csv'
+    pd.concat([wide, repeated]).to_csv(data_file, sep='|', index=False)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    df, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+    df_all, _ = csv_source_handler.csv_handler(str(config_file), str(data_file), all_columns=True)
+    projected = preprocessor.preprocess(df, data_config)
+    full = preprocessor.preprocess(df_all, data_config)
+
+    # Assertions
+    assert len(projected) == len(full) == len(loan_data)
+    pd.testing.assert_frame_equal(projected, full[projected.columns])
+
+def test_build_query_quotes_selected_columns():
+    query = db_source_handler.build_query({'table': 'public.loans'}, ['LOAN_ID', 'act_period'])
+
+    # Assertions
+    assert ' '.join(str(query.compile(dialect=postgresql.dialect())).split()) == \
+        'SELECT "LOAN_ID", act_period FROM public.loans'
+    assert ' '.join(str(db_source_handler.build_query({'table': 'loans'})).split()) == 'SELECT * FROM loans'
+
+def test_convert_columns_dtype_skips_columns_not_read(data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['data_specific_functions']['date_columns']['ORIG_DATE'] = {'date_format': 'XMYYYY'}
+    df = pd.DataFrame({'LOAN_ID': ['1', '2'], 'ACT_PERIOD': ['12020', '22020'], 'DLQ_STATUS': ['0', '1']})
+
+    converted = column_dtypes.convert_columns_dtype(df, data_config)
+
+    # Assertions
+    assert converted['LOAN_ID'].dtype == 'int64' and converted['DLQ_STATUS'].dtype == 'int64'
+    assert list(converted['ACT_PERIOD']) == ['2020-01-28', '2020-02-28']
+    assert 'EXTRA_0' not in converted.columns
+
+def test_read_csv_chunks_applies_dtypes_at_parse_time(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['attributes']['dtype'].update({'ORIG_UPB': 'float32', 'ORIG_TERM': 'int16'})
+    data_file = tmp_path / 'loans.csv'
+    loan_data.to_csv(data_file, sep='|', index=False)
+
+    chunks = list(csv_source_handler.read_csv_chunks(data_config, str(data_file), chunksize=1000))
+
+    # Assertions
+    assert [len(chunk) for chunk in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    combined = pd.concat(chunks, ignore_index=True)
+    assert combined['ORIG_UPB'].dtype == 'float32' and combined['ORIG_TERM'].dtype == 'int16'
+    assert combined['LOAN_ID'].dtype == 'int64'
+    # replace_values runs before the DLQ_STATUS cast, so the parser infers it
+    np.testing.assert_array_equal(combined['DLQ_STATUS'], loan_data['DLQ_STATUS'])
+
+def test_chunked_csv_through_preprocessor_matches_calculator(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['data_specific_functions']['date_columns'] = {}
+    expected = tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)
+
+    data_file = tmp_path / 'loans.csv'
+    loan_data.sort_values(['LOAN_ID', 'ACT_PERIOD']).to_csv(data_file, sep='|', index=False)
+    data_config['configuration']['attributes'].update(filepath=str(data_file), chunksize=500)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    chunks, data_config = csv_source_handler.csv_chunk_handler(str(config_file))
+    result = tmm1_chunked.run_model_chunked(
+        (preprocessor.preprocess(chunk, data_config) for chunk in chunks), data_config
+    )
+
+    # Assertions
+    np.testing.assert_array_equal(result['Transition_Counts'], expected['Transition_Counts'])
+    assert result['ALLL'] == pytest.approx(expected['ALLL'])
+
+def test_convert_columns_dtype_skips_matching_columns(data_config):
+    data_config = wide_config(data_config)
+    df = pd.DataFrame({'LOAN_ID': np.array([1, 2]), 'DLQ_STATUS': ['0', '1']})
+
+    converted = column_dtypes.convert_columns_dtype(df, data_config)
+
+    # Assertions
+    assert column_dtypes.dtype_matches(df['LOAN_ID'], 'int64')
+    assert not column_dtypes.dtype_matches(df['DLQ_STATUS'], 'int64')
+    assert converted['DLQ_STATUS'].dtype == 'int64'
+
+def test_csv_handler_reuses_parquet_copy(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_file = tmp_path / 'loans.csv'
+    loan_data.to_csv(data_file, sep='|', index=False)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+    parquet_file = parquet_source_handler.cache_path(str(data_file))
+
+    df, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+    written_at = os.path.getmtime(parquet_file)
+    df_cached, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+    data_config['configuration']['attributes']['parquet_cache'] = False
+    config_file.write_text(json.dumps(data_config))
+    df_csv, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+
+    # Assertions
+    assert os.path.getmtime(parquet_file) == written_at
+    assert df['LOAN_ID'].dtype == 'int64'
+    pd.testing.assert_frame_equal(df_cached, df)
+    pd.testing.assert_frame_equal(df[df_csv.columns], df_csv, check_dtype=False)
+
+def test_parquet_copy_rebuilt_when_stale(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_file = tmp_path / 'loans.csv'
+    loan_data.to_csv(data_file, sep='|', index=False)
+    parquet_file = parquet_source_handler.cache_path(str(data_file))
+    parquet_source_handler.cached_csv_read(data_config, str(data_file))
+
+    # Assertions
+    assert parquet_source_handler.is_cache_fresh(parquet_file, str(data_file), ['LOAN_ID'])
+    assert not parquet_source_handler.is_cache_fresh(parquet_file, str(data_file), ['LOAN_ID', 'STATE'])
+    os.utime(data_file, (time.time() + 10, time.time() + 10))
+    assert not parquet_source_handler.is_cache_fresh(parquet_file, str(data_file))
+
+def test_parquet_copy_keeps_requested_columns_and_types(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_file = tmp_path / 'loans.csv'
+    loan_data.assign(EXTRA_0=1.5, STATE='CA').to_csv(data_file, sep='|', index=False)
+    parquet_file = parquet_source_handler.cache_path(str(data_file))
+
+    df = parquet_source_handler.cached_csv_read(data_config, str(data_file), ['LOAN_ID', 'CURRENT_UPB', 'MISSING'])
+
+    # Assertions
+    assert list(df.columns) == ['LOAN_ID', 'CURRENT_UPB']
+    assert parquet_source_handler.parquet_columns(parquet_file) == ['LOAN_ID', 'CURRENT_UPB']
+    assert parquet_source_handler.is_cache_fresh(parquet_file, str(data_file), ['LOAN_ID'], data_config)
+    assert not parquet_source_handler.is_cache_fresh(parquet_file, str(data_file), None, data_config)
+    # A changed dtype config does not reuse the copy converted with the old types
+    data_config['configuration']['attributes']['dtype']['LOAN_ID'] = 'str'
+    assert not parquet_source_handler.is_cache_fresh(parquet_file, str(data_file), ['LOAN_ID'], data_config)
+    df = parquet_source_handler.cached_csv_read(data_config, str(data_file), ['LOAN_ID'])
+    assert df['LOAN_ID'].map(type).eq(str).all()
+
+def test_parquet_source(tmp_path, loan_data, data_config):
+    data_config['configuration']['source'] = 'parquet'
+    data_file = tmp_path / 'loans.parquet'
+    loan_data.assign(EXTRA=1).to_parquet(data_file)
+    data_config['configuration']['attributes'] = {'filepath': str(data_file)}
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    df, _ = parquet_source_handler.parquet_handler(str(config_file))
+
+    # Assertions
+    pd.testing.assert_frame_equal(df, loan_data)
+
+def test_compressed_parquet_decompressed_once(tmp_path, loan_data, monkeypatch):
+    data_file = tmp_path / 'loans.parquet.gz'
+    data_file.write_bytes(gzip.compress(loan_data.assign(EXTRA=1).to_parquet()))
+    parquet_source = parquet_source_handler.parquet_source
+    calls = []
+
+    def counting_parquet_source(file_path):
+        calls.append(file_path)
+        return parquet_source(file_path)
+
+    monkeypatch.setattr(parquet_source_handler, 'parquet_source', counting_parquet_source)
+    df = parquet_source_handler.read_parquet(str(data_file), columns=list(loan_data.columns) + ['MISSING'])
+
+    # Assertions
+    assert calls == [str(data_file)]
+    pd.testing.assert_frame_equal(df, loan_data)
+
+def test_streamed_csv_sample_matches_data_sampler(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['sampling'] = {'orig_terms': [360], 'fraction': 0.4, 'seed': 3}
+    data_file = tmp_path / 'loans.csv'
+    loan_data.to_csv(data_file, sep='|', index=False)
+
+    streamed = pd.concat(csv_source_handler.read_csv_chunks(data_config, str(data_file), chunksize=300))
+
+    # Assertions
+    expected = tmm1.data_sampler(loan_data, data_config)
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), expected.reset_index(drop=True))
+
+def test_streamed_csv_sample_with_alphanumeric_ids(tmp_path, loan_data, data_config):
+    data_config = wide_config(data_config)
+    data_config['configuration']['sampling'] = {'orig_terms': [360], 'fraction': 0.4, 'seed': 3}
+    data_config['configuration']['attributes']['dtype']['LOAN_ID'] = 'str'
+    loan_data = loan_data.assign(LOAN_ID='L' + loan_data['LOAN_ID'].astype(str))
+    data_file = tmp_path / 'loans.csv'
+    loan_data.to_csv(data_file, sep='|', index=False)
+
+    streamed = pd.concat(csv_source_handler.read_csv_chunks(data_config, str(data_file), chunksize=300))
+
+    # Assertions
+    expected = tmm1.data_sampler(loan_data, data_config)
+    assert 0 < streamed['LOAN_ID'].nunique() < loan_data['LOAN_ID'].nunique()
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), expected.reset_index(drop=True))
+
+@pytest.mark.parametrize('suffix', ['.gz', '.zip', '.zst'])
+def test_compressed_csv_read_while_streaming(tmp_path, loan_data, data_config, suffix):
+    data_config = wide_config(data_config)
+    csv_bytes = loan_data.to_csv(sep='|', index=False).encode()
+    data_file = tmp_path / f'loans.csv{suffix}'
+    if suffix == '.gz':
+        data_file.write_bytes(gzip.compress(csv_bytes))
+    elif suffix == '.zip':
+        with zipfile.ZipFile(data_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('loans.csv', csv_bytes)
+    else:
+        pa = pytest.importorskip('pyarrow')
+        with pa.output_stream(str(data_file), compression='zstd') as stream:
+            stream.write(csv_bytes)
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps(data_config))
+
+    df, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+    chunked = pd.concat(csv_source_handler.read_csv_chunks(data_config, str(data_file), chunksize=500))
+    data_config['configuration']['attributes']['parquet_cache'] = False
+    config_file.write_text(json.dumps(data_config))
+    df_csv, _ = csv_source_handler.csv_handler(str(config_file), str(data_file))
+
+    # Assertions
+    assert compression.compression_of(str(data_file)) == compression.COMPRESSION_SUFFIXES[suffix]
+    assert os.path.exists(parquet_source_handler.cache_path(str(data_file)))
+    assert not os.path.exists(tmp_path / 'loans.csv')
+    pd.testing.assert_frame_equal(df[df_csv.columns], df_csv, check_dtype=False)
+    pd.testing.assert_frame_equal(chunked.reset_index(drop=True), df_csv, check_dtype=False)
+    assert len(df_csv) == len(loan_data)
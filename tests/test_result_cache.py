@@ -0,0 +1,117 @@
+# Standard library imports
+import os
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+from backend import result_cache
+
+@pytest.fixture
+def csv_config(data_config):
+    data_config['configuration']['source'] = 'csv'
+    data_config['configuration']['attributes'] = {'filepath': 'data/loans.csv', 'delimiter': '|'}
+    return data_config
+
+def test_cache_key_follows_data_and_model_config(tmp_path, csv_config):
+    data_file = tmp_path / 'loans.csv'
+    data_file.write_text('LOAN_ID|ACT_PERIOD\n1|012020\n')
+    copied_file = tmp_path / 'copy.csv'
+    copied_file.write_text('LOAN_ID|ACT_PERIOD\n1|012020\n')
+
+    key = result_cache.cache_key(result_cache.source_fingerprint(csv_config, str(data_file)), csv_config)
+
+    # The data location is not part of the key
+    csv_config['configuration']['attributes']['filepath'] = 'data/copy.csv'
+    copied = result_cache.cache_key(result_cache.source_fingerprint(csv_config, str(copied_file)), csv_config)
+
+    csv_config['configuration']['forecasted_months'] = 36
+    changed_config = result_cache.cache_key(result_cache.source_fingerprint(csv_config, str(copied_file)), csv_config)
+
+    csv_config['configuration']['forecasted_months'] = 24
+    copied_file.write_text('LOAN_ID|ACT_PERIOD\n2|012020\n')
+    changed_data = result_cache.cache_key(result_cache.source_fingerprint(csv_config, str(copied_file)), csv_config)
+
+    # Assertions
+    assert key == copied
+    assert len({key, changed_config, changed_data}) == 3
+
+def test_canonical_config_ignores_key_order_and_credentials():
+    first = {"configuration": {"source": "db", "forecasted_months": 24, "attributes": {
+        "connection_details": {"engine": "sqlite", "table": "loans", "username": "a", "password": "x"}}}}
+    second = {"configuration": {"attributes": {
+        "connection_details": {"password": "y", "table": "loans", "engine": "sqlite"}}, "forecasted_months": 24, "source": "db"}}
+
+    # Assertions
+    assert result_cache.canonical_config(first) == result_cache.canonical_config(second)
+    assert first['configuration']['attributes']['connection_details']['password'] == 'x'
+
+def test_db_source_without_watermark_is_not_cached():
+    data_config = {"configuration": {"source": "db", "attributes": {"connection_details": {"engine": "sqlite", "table": "loans"}}}}
+
+    # Assertions
+    assert result_cache.source_fingerprint(data_config) is None
+
+def test_get_put_and_invalidate(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path))
+    result = {"ALLL": 0.25, "CGL_Curve": {"Charged Off": {"Period_0": 0.0}}}
+
+    cache.put('abc123', result)
+
+    # Assertions
+    assert cache.get('abc123') == result
+    assert cache.get('def456') is None
+    assert cache.invalidate('abc123') == 1
+    assert cache.get('abc123') is None
+    with pytest.raises(ValueError):
+        cache.get('../secret')
+
+def test_lru_eviction_keeps_recently_read_results(tmp_path):
+    cache = result_cache.ResultCache(folder=str(tmp_path), max_bytes=10 ** 9)
+    payload = {"values": list(range(100))}
+    for index, key in enumerate(['first', 'second', 'third']):
+        cache.put(key, payload)
+        os.utime(cache.path(key), (time.time() - 100 + index, time.time() - 100 + index))
+    size = os.path.getsize(cache.path('first'))
+
+    # Reading 'first' makes 'second' the least recently used
+    cache.get('first')
+    cache.max_bytes = 3 * size
+    cache.put('fourth', payload)
+
+    # Assertions
+    assert cache.get('second') is None
+    assert all(cache.get(key) == payload for key in ['first', 'third', 'fourth'])
+
+def test_cache_key_resolves_sampling_defaults(monkeypatch, csv_config):
+    del csv_config['configuration']['sampling']
+    monkeypatch.setenv('MODEL_SAMPLE_FRACTION', '0.5')
+    default = result_cache.cache_key('data', csv_config)
+    explicit = result_cache.cache_key('data', {**csv_config, 'configuration': {
+        **csv_config['configuration'], 'sampling': {'orig_terms': [360], 'fraction': 0.5, 'seed': 42}}})
+
+    monkeypatch.setenv('MODEL_SAMPLE_FRACTION', '0.25')
+
+    # Assertions
+    assert default == explicit
+    assert result_cache.cache_key('data', csv_config) != default
+
+def test_file_fingerprint_reuses_hashes(tmp_path, monkeypatch):
+    from backend import blob_store
+
+    data_file = tmp_path / 'loans.csv'
+    data_file.write_bytes(b'LOAN_ID\n1\n')
+    store = blob_store.BlobStore(str(tmp_path / 'blobs'))
+    sha256, blob_path, _ = store.put_stream(open(data_file, 'rb'), 'loans.csv')
+    first = result_cache.file_fingerprint(str(data_file))
+
+    def fail(*args):
+        raise AssertionError("file hashed again")
+
+    monkeypatch.setattr(result_cache.hashlib, 'sha256', fail)
+
+    # Assertions
+    assert first == sha256
+    assert result_cache.file_fingerprint(str(data_file)) == sha256
+    assert result_cache.file_fingerprint(blob_path) == sha256
@@ -0,0 +1,179 @@
+# Standard library imports
+import glob
+import json
+import os
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1
+from backend.utils import export_output
+
+def test_feature_engg_vectorized_matches_legacy(loan_data, data_config):
+    legacy = tmm1.feature_engg_legacy(loan_data, data_config)
+    vectorized = tmm1.feature_engg_vectorized(loan_data, data_config)
+
+    # Assertions
+    assert list(vectorized.columns) == list(legacy.columns)
+    pd.testing.assert_frame_equal(vectorized, legacy)
+
+def test_feature_engg_mode_from_config(loan_data, data_config):
+    data_config['configuration']['feature_engg_mode'] = 'unknown'
+
+    with pytest.raises(ValueError):
+        tmm1.feature_engg(loan_data, data_config)
+
+def test_cgl_curve_matches_matrix_power(bucket_map):
+    states = list(bucket_map.values())
+    rng = np.random.default_rng(11)
+    matrix = rng.random((len(states), len(states)))
+    matrix[-1] = np.eye(len(states))[-1]
+    transition_matrix = pd.DataFrame(matrix / matrix.sum(axis=1, keepdims=True), index=states, columns=states)
+    distribution = pd.Series(rng.dirichlet(np.ones(len(states))), index=states)
+
+    curve = tmm1.Cgl_Curve(distribution, transition_matrix, 360)
+
+    # Assertions
+    expected = np.array([np.dot(distribution, np.linalg.matrix_power(transition_matrix, i)) for i in range(361)])
+    assert curve.index[0] == 'Period_0' and curve.index[-1] == 'Period_360'
+    np.testing.assert_allclose(curve[states].to_numpy(), expected, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(curve['MONTHLY_DEFAULT_RATE'].iloc[1:], np.diff(expected[:, -1]), atol=1e-12)
+
+def test_propagate_batches_portfolios():
+    rng = np.random.default_rng(5)
+    matrices = rng.random((8, 6, 6))
+    matrices /= matrices.sum(axis=2, keepdims=True)
+    distributions = rng.dirichlet(np.ones(6), size=8)
+
+    batched = tmm1.propagate(distributions, matrices, 120)
+    horizons = tmm1.propagate_horizons(distributions, matrices, [0, 12, 120])
+
+    # Assertions
+    assert batched.shape == (8, 121, 6)
+    for b in range(8):
+        np.testing.assert_allclose(batched[b], tmm1.propagate(distributions[b], matrices[b], 120))
+    np.testing.assert_allclose(horizons, batched[:, [0, 12, 120], :])
+
+def test_absorbing_chain_matches_long_iterative_curve(bucket_map):
+    states = list(bucket_map.values()) + ["Prepaid"]
+    rng = np.random.default_rng(13)
+    matrix = rng.random((len(states), len(states)))
+    matrix[-2:] = np.eye(len(states))[-2:]
+    transition_matrix = pd.DataFrame(matrix / matrix.sum(axis=1, keepdims=True), index=states, columns=states)
+    distribution = pd.Series(rng.dirichlet(np.ones(len(states))), index=states)
+
+    absorption = tmm1.absorbing_chain(distribution, transition_matrix, ["Charged Off", "Prepaid"])
+    curve = tmm1.Cgl_Curve(distribution, transition_matrix, 2000)
+
+    # Assertions
+    np.testing.assert_allclose(absorption['Absorption_Probabilities'].sum(axis=1), 1.0)
+    np.testing.assert_allclose(absorption['Lifetime_Absorption'], curve[["Charged Off", "Prepaid"]].iloc[-1])
+    lifetime_alll = absorption['Lifetime_Absorption']["Charged Off"] - distribution["Charged Off"]
+    np.testing.assert_allclose(lifetime_alll, curve['Charged Off'].iloc[-1] - curve['Charged Off'].iloc[0])
+
+def test_absorbing_chain_requires_reachable_absorbing_state(bucket_map):
+    states = list(bucket_map.values())
+    transition_matrix = pd.DataFrame(np.eye(len(states)), index=states, columns=states)
+    distribution = pd.Series(1 / len(states), index=states)
+
+    with pytest.raises(ValueError):
+        tmm1.absorbing_chain(distribution, transition_matrix, ["Charged Off"])
+
+def test_absorbing_chain_skips_unobserved_states(bucket_map):
+    states = list(bucket_map.values())
+    counts = np.random.default_rng(17).integers(1, 20, (len(states), len(states)))
+    # Nothing observed starting from 120 DPD, and loans reach it from 90 DPD
+    counts[states.index("120 DPD")] = 0
+    counts[states.index("Charged Off")] = np.eye(len(states), dtype=int)[-1]
+    transition_matrix = pd.DataFrame(tmm1.transition_probabilities(counts), index=states, columns=states)
+    distribution = pd.Series(1 / len(states), index=states)
+
+    absorption = tmm1.absorbing_chain(distribution, transition_matrix, ["Charged Off"])
+    curve = tmm1.Cgl_Curve(distribution, transition_matrix, 5000)
+
+    # Assertions
+    assert absorption['Absorption_Probabilities'].loc["120 DPD", "Charged Off"] == 0
+    assert set(absorption['Expected_Time_To_Absorption'].values()) == {None}
+    np.testing.assert_allclose(absorption['Lifetime_Absorption']["Charged Off"], curve['Charged Off'].iloc[-1])
+
+def test_calculator_analytic_with_empty_bucket(loan_data, data_config):
+    df_feature = tmm1.feature_engg(loan_data[loan_data['DLQ_STATUS'] != 4], data_config)
+    data_config['configuration']['forecasted_months'] = 1200
+    iterative = tmm1.calculator(df_feature, data_config)
+    data_config['configuration']['loss_mode'] = 'analytic'
+    analytic = tmm1.calculator(df_feature, data_config)
+
+    # Assertions
+    assert analytic['Transition_Counts'].loc["120 DPD"].sum() == 0
+    assert analytic['ALLL'] == pytest.approx(iterative['ALLL'], abs=1e-6)
+
+def test_analytic_export_is_valid_json(loan_data, data_config, tmp_path):
+    df_feature = tmm1.feature_engg(loan_data[loan_data['DLQ_STATUS'] != 4], data_config)
+    data_config['configuration']['loss_mode'] = 'analytic'
+    output = tmm1.calculator(df_feature, data_config)
+
+    export_output(output, file_path=str(tmp_path), save_to_mongodb=False)
+    [export_path] = glob.glob(os.path.join(str(tmp_path), 'export_*', 'export.json'))
+    with open(export_path) as f:
+        text = f.read()
+
+    def reject_constant(name):
+        raise ValueError(f"{name} is not valid JSON")
+
+    exported = json.loads(text, parse_constant=reject_constant)
+
+    # Assertions
+    assert exported['Expected_Time_To_Absorption']["120 DPD"] is None
+    assert exported['Expected_Time_To_Absorption']["Current"] > 0
+
+def test_calculator_balances_from_loan_summary(loan_data, data_config, bucket_map):
+    df_feature = tmm1.feature_engg(loan_data, data_config)
+    output = tmm1.calculator(df_feature, data_config)
+
+    # Assertions
+    first = df_feature.groupby('LOAN_ID').first()
+    last = df_feature.groupby('LOAN_ID').last()
+    # The distribution takes the last row of every loan, the balances the last reported values
+    last_rows = df_feature.groupby('LOAN_ID').apply(lambda x: x.iloc[-1])
+    assert last_rows['CURRENT_UPB'].isna().any()
+    assert output['Origination_Amount'] == pytest.approx(first['ORIG_UPB'].sum())
+    assert output['Opening_Balance'] == pytest.approx(first['CURRENT_UPB'].sum())
+    assert output['Ending_Balance'] == pytest.approx(last['CURRENT_UPB'].sum() + last['CHARGE_OFF_AMT'].sum())
+    expected = last_rows.groupby('DERIVED_LOAN_STATUS')['CURRENT_UPB'].sum()
+    expected = (expected / expected.sum()).reindex(bucket_map.values(), fill_value=0.0)
+    pd.testing.assert_series_equal(output['Distribution'], expected, check_names=False)
+
+def test_transition_matrix_matches_pivot_table(loan_data, data_config, bucket_map):
+    df_feature = tmm1.feature_engg(loan_data, data_config)
+    states = list(bucket_map.values())
+
+    counts, matrix = tmm1.build_transition_matrix(df_feature, bucket_map)
+
+    # Assertions
+    pivot = pd.pivot_table(df_feature, values='CURRENT_UPB', index='DERIVED_LOAN_STATUS',
+                           columns='NEXT_DERIVED_LOAN_STATUS', aggfunc='count', fill_value=0)
+    pivot = pivot.reindex(index=states, columns=states, fill_value=0)
+    np.testing.assert_array_equal(counts.to_numpy(), pivot.to_numpy())
+    np.testing.assert_allclose(matrix.to_numpy(), pivot.div(pivot.sum(axis=1), axis=0).to_numpy())
+    assert list(matrix.index) == states and list(matrix.columns) == states
+
+def test_transition_probabilities_empty_rows():
+    counts = np.array([[3, 1, 0], [0, 0, 0], [0, 0, 0]])
+
+    probabilities = tmm1.transition_probabilities(counts)
+
+    # Assertions
+    np.testing.assert_allclose(probabilities, [[0.75, 0.25, 0], [0, 1, 0], [0, 0, 1]])
+
+def test_calculator_analytic_matches_long_horizon(loan_data, data_config):
+    df_feature = tmm1.feature_engg(loan_data, data_config)
+    data_config['configuration']['forecasted_months'] = 1200
+    iterative = tmm1.calculator(df_feature, data_config)
+    data_config['configuration']['loss_mode'] = 'analytic'
+    analytic = tmm1.calculator(df_feature, data_config)
+
+    # Assertions
+    assert analytic['ALLL'] == pytest.approx(iterative['ALLL'], abs=1e-6)
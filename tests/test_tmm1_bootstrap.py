@@ -0,0 +1,67 @@
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_bootstrap
+
+@pytest.fixture
+def df_feature(loan_data, data_config):
+    return tmm1.feature_engg(loan_data, data_config)
+
+def test_loan_vectors_sum_to_calculator_totals(df_feature, data_config):
+    vectors = tmm1_bootstrap.loan_vectors(df_feature, data_config)
+    aggregates = tmm1.aggregate(df_feature, data_config)
+
+    # Assertions
+    totals = vectors.sum(axis=0)
+    np.testing.assert_allclose(totals[:36].reshape(6, 6), aggregates['Transition_Counts'])
+    np.testing.assert_allclose(totals[36:42], aggregates['State_UPB'])
+    assert totals[-1] == pytest.approx(aggregates['Last_UPB'] + aggregates['Charged_Off_Amount'])
+
+def test_bootstrap_bands(df_feature, data_config):
+    output = tmm1.calculator(df_feature, data_config)
+
+    bands = tmm1_bootstrap.bootstrap_bands(df_feature, data_config, replicates=200, seed=1)
+    repeated = tmm1_bootstrap.bootstrap_bands(df_feature, data_config, replicates=200, seed=1)
+
+    # Assertions
+    curve_bands = bands['CGL_Curve_Bands']
+    assert curve_bands.shape == (data_config['configuration']['forecasted_months'] + 1, 3)
+    assert (curve_bands['Lower'] <= curve_bands['Upper']).all()
+    cecl = bands['CECL_Amount_Bands']
+    assert cecl['Lower'] <= output['CECL_Amount'] <= cecl['Upper']
+    assert cecl.equals(repeated['CECL_Amount_Bands'])
+
+@pytest.mark.parametrize('bootstrap', [True, {}, {'replicates': 50, 'seed': 3}])
+def test_run_model_bootstrap_settings(loan_data, data_config, bootstrap):
+    data_config['configuration']['bootstrap'] = bootstrap
+
+    output = tmm1.run_model(loan_data, data_config)
+
+    # Assertions
+    cecl = output['CECL_Amount_Bands']
+    assert cecl['Lower'] <= cecl['Median'] <= cecl['Upper']
+    assert len(output['CGL_Curve_Bands']) == data_config['configuration']['forecasted_months'] + 1
+
+def test_bootstrap_batches_bounded_by_loan_count(df_feature, data_config, monkeypatch):
+    expected = tmm1_bootstrap.bootstrap_bands(df_feature, data_config, replicates=20, seed=5)
+    loan_count = df_feature['LOAN_ID'].nunique()
+    monkeypatch.setattr(tmm1_bootstrap, 'WEIGHT_CELLS', 3 * loan_count)
+    sizes = []
+    default_rng = np.random.default_rng
+
+    class RecordingGenerator:
+        def __init__(self, seed):
+            self.rng = default_rng(seed)
+
+        def multinomial(self, n, pvals, size=None):
+            sizes.append(size)
+            return self.rng.multinomial(n, pvals, size=size)
+
+    monkeypatch.setattr(np.random, 'default_rng', RecordingGenerator)
+    bands = tmm1_bootstrap.bootstrap_bands(df_feature, data_config, replicates=20, seed=5)
+
+    # Assertions
+    assert sizes == [3] * 6 + [2]
+    assert bands['CECL_Amount_Bands'].equals(expected['CECL_Amount_Bands'])
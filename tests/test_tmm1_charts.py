@@ -0,0 +1,58 @@
+# Standard library imports
+import os
+
+# Third-party imports
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_charts
+
+REPORT_ID = '65a1f0c2e4b0a1b2c3d4e5f6'
+
+@pytest.fixture
+def cgl_curve(loan_data, data_config):
+    return tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)['CGL_Curve']
+
+def test_chart_rendered_once_and_cached(tmp_path, cgl_curve):
+    calls = []
+
+    def load_cgl_curve():
+        calls.append(1)
+        # Stored reports hold the curve as a dictionary
+        return cgl_curve.fillna(0).to_dict()
+
+    first = tmm1_charts.get_chart(REPORT_ID, 'cgl', load_cgl_curve, cache_folder=str(tmp_path))
+    second = tmm1_charts.get_chart(REPORT_ID, 'cgl', load_cgl_curve, cache_folder=str(tmp_path))
+
+    # Assertions
+    assert first == second == os.path.join(str(tmp_path), REPORT_ID, 'cgl.png')
+    assert len(calls) == 1
+    assert first not in tmm1_charts._render_locks
+    with open(first, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+def test_prerender_charts_in_background(tmp_path, cgl_curve):
+    futures = tmm1_charts.prerender_charts('65a1f0c2e4b0a1b2c3d4e5f7', cgl_curve, cache_folder=str(tmp_path))
+
+    # Assertions
+    paths = [future.result() for future in futures]
+    assert sorted(os.path.basename(path) for path in paths) == ['cgl.png', 'monthly_default_rate.png']
+
+def test_unknown_chart_type(tmp_path):
+    with pytest.raises(ValueError):
+        tmm1_charts.get_chart(REPORT_ID, 'pie', dict, cache_folder=str(tmp_path))
+
+@pytest.mark.parametrize('report_id', ['../../etc', 'report1', '65a1f0c2e4b0a1b2c3d4e5f6/..', ''])
+def test_invalid_report_id(tmp_path, report_id):
+    with pytest.raises(ValueError):
+        tmm1_charts.get_chart(report_id, 'cgl', dict, cache_folder=str(tmp_path))
+
+def test_cached_chart_of_removed_report(tmp_path, cgl_curve):
+    chart_file = tmm1_charts.get_chart(REPORT_ID, 'cgl', lambda: cgl_curve, cache_folder=str(tmp_path))
+
+    with pytest.raises(LookupError):
+        tmm1_charts.get_chart(REPORT_ID, 'cgl', lambda: cgl_curve, cache_folder=str(tmp_path), report_exists=lambda: False)
+
+    # Assertions
+    assert not os.path.exists(chart_file)
+    assert not os.path.exists(os.path.dirname(chart_file))
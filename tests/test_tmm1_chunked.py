@@ -0,0 +1,66 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_chunked
+
+def test_chunked_matches_in_memory_calculator(loan_data, data_config):
+    expected = tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)
+
+    # Loan-sorted tape cut at arbitrary rows, so loans are split across chunks
+    tape = loan_data.sort_values(['LOAN_ID', 'ACT_PERIOD']).reset_index(drop=True)
+    cuts = [0, 1, 2, 57, 58, 400, 1333, len(tape)]
+    chunks = [tape.iloc[start:end] for start, end in zip(cuts[:-1], cuts[1:])]
+
+    result = tmm1_chunked.run_model_chunked(chunks, data_config)
+
+    # Assertions
+    np.testing.assert_array_equal(result['Transition_Counts'], expected['Transition_Counts'])
+    np.testing.assert_allclose(result['Distribution'], expected['Distribution'])
+    np.testing.assert_allclose(result['CGL_Curve'].fillna(0), expected['CGL_Curve'].fillna(0))
+    for key in ['ALLL', 'CECL_Amount', 'Opening_Balance', 'Ending_Balance', 'Origination_Amount']:
+        assert result[key] == pytest.approx(expected[key])
+
+def test_chunked_requires_data(data_config):
+    with pytest.raises(ValueError):
+        tmm1_chunked.run_model_chunked([], data_config)
+
+def test_chunked_rejects_loans_split_across_the_stream(loan_data, data_config):
+    tape = loan_data.sort_values(['LOAN_ID', 'ACT_PERIOD']).reset_index(drop=True)
+    first_loan = tape[tape['LOAN_ID'] == 1]
+    later = tape[tape['LOAN_ID'].between(2, 50)]
+
+    # Loans grouped but not sorted are fine, a loan continuing after other loans is not
+    tmm1_chunked.run_model_chunked([later, first_loan], data_config)
+    with pytest.raises(ValueError, match="LOAN_ID 1 appears again"):
+        tmm1_chunked.run_model_chunked([pd.concat([first_loan.iloc[:1], later, first_loan.iloc[1:]])], data_config)
+    with pytest.raises(ValueError, match="LOAN_ID 1 appears again"):
+        tmm1_chunked.run_model_chunked([first_loan.iloc[:1], later.iloc[:7], later.iloc[7:], first_loan.iloc[1:]],
+                                       data_config)
+
+def test_chunked_evaluates_scenarios(loan_data, data_config):
+    data_config['configuration']['scenarios'] = [{'name': 'Base'}, {'name': 'Severe', 'default_shock': 2.0}]
+    tape = loan_data.sort_values(['LOAN_ID', 'ACT_PERIOD']).reset_index(drop=True)
+
+    result = tmm1_chunked.run_model_chunked([tape.iloc[:500], tape.iloc[500:]], data_config)
+    expected = tmm1.run_model(loan_data, data_config)
+
+    # Assertions
+    pd.testing.assert_frame_equal(result['Scenarios'], expected['Scenarios'])
+
+@pytest.mark.parametrize('option', [{'bootstrap': True}, {'bootstrap': {}}, {'segmentation': {'column': 'ORIG_TERM'}}])
+def test_chunked_rejects_row_level_options(loan_data, data_config, option):
+    data_config['configuration'].update(option)
+    read = []
+
+    def chunks():
+        read.append(1)
+        yield loan_data
+
+    with pytest.raises(ValueError, match="read_mode 'chunked' does not support"):
+        tmm1_chunked.run_model_chunked(chunks(), data_config)
+
+    # Assertions
+    assert read == []
@@ -0,0 +1,93 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1_data
+
+def prepare_legacy(df, data_config):
+    """The per-loan groupby.apply filter prepare replaced, the reference for its output."""
+    valid_statuses = [int(k) for k in data_config['configuration']['loan_buckets']['bucket_map'].keys()]
+
+    def filter_buckets(df_group):
+        group_sorted = df_group.sort_values(by='ACT_PERIOD')
+        return group_sorted[group_sorted['DLQ_STATUS'].isin(valid_statuses)]
+
+    df = tmm1_data.filter_columns(df, data_config)
+    return df.groupby('LOAN_ID').apply(filter_buckets).reset_index(drop=True)
+
+def test_prepare_matches_legacy(loan_data, data_config):
+    legacy = prepare_legacy(loan_data, data_config)
+    prepared = tmm1_data.prepare(loan_data, data_config)
+
+    # Assertions
+    pd.testing.assert_frame_equal(prepared, legacy)
+    assert not prepared['DLQ_STATUS'].isin([9]).any()
+
+def test_prepare_presorted_skips_sort(loan_data, data_config):
+    sorted_data = loan_data.sort_values(['LOAN_ID', 'ACT_PERIOD'])
+    data_config['configuration']['presorted'] = True
+
+    presorted = tmm1_data.prepare(sorted_data, data_config)
+    unsorted = tmm1_data.prepare(loan_data, data_config, presorted=False)
+
+    # Assertions
+    pd.testing.assert_frame_equal(presorted, unsorted)
+
+def test_prepare_raises_on_unmapped_buckets(loan_data, data_config):
+    data_config['configuration']['loan_buckets']['bucket_count'] = 7
+
+    with pytest.raises(ValueError):
+        tmm1_data.prepare(loan_data, data_config)
+
+def test_sample_loans_is_a_deterministic_loan_sample(loan_data):
+    loan_data = loan_data.assign(ORIG_TERM=np.where(loan_data['LOAN_ID'] % 3 == 0, 180, 360))
+    sampling = {'orig_terms': [360], 'fraction': 0.5, 'seed': 42}
+
+    sampled = tmm1_data.sample_loans(loan_data, sampling)
+    reshuffled = tmm1_data.sample_loans(loan_data.sample(frac=1, random_state=1), sampling)
+    other_seed = tmm1_data.sample_loans(loan_data, dict(sampling, seed=7))
+
+    # Assertions
+    loans = set(sampled['LOAN_ID'])
+    assert loans == set(reshuffled['LOAN_ID'])
+    assert loans != set(other_seed['LOAN_ID'])
+    assert all(loan_id % 3 != 0 for loan_id in loans)
+    # Whole loans are kept, roughly half of the 200 30-year loans
+    assert len(sampled) == loan_data['LOAN_ID'].isin(loans).sum()
+    assert 70 < len(loans) < 130
+
+def test_loan_hash_handles_large_and_missing_ids():
+    hashes = tmm1_data.loan_hash(pd.Series([1, 2 ** 40 + 5, None], dtype='Int64'), seed=42)
+
+    # Assertions
+    assert hashes[0] == 43 * 950706376 % 2147483647
+    assert hashes[1] == ((2 ** 40 + 5 + 42) % 2147483647) * 950706376 % 2147483647
+    assert hashes[2] == tmm1_data.HASH_MODULUS
+
+def test_loan_hash_handles_alphanumeric_ids():
+    loan_ids = pd.Series(['F12Q3000001', 'F12Q3000002', '000123', None, 'F12Q3000001'])
+
+    hashes = tmm1_data.loan_hash(loan_ids, seed=42)
+
+    # Assertions
+    assert hashes[0] == hashes[4] != hashes[1]
+    assert hashes[2] == tmm1_data.loan_hash(pd.Series([123]), seed=42)[0]
+    assert hashes[3] == tmm1_data.HASH_MODULUS
+    assert (hashes[:3] < tmm1_data.HASH_MODULUS).all()
+    np.testing.assert_array_equal(tmm1_data.loan_hash(loan_ids[::-1], seed=42), hashes[::-1])
+    names = pd.Series([f"F{i:06d}X" for i in range(4000)])
+    assert 0.45 < tmm1_data.sample_mask(names, {'fraction': 0.5, 'seed': 1}).mean() < 0.55
+
+def test_sampling_config_defaults_from_environment(monkeypatch, data_config):
+    del data_config['configuration']['sampling']
+    monkeypatch.setenv('MODEL_SAMPLE_FRACTION', '0.25')
+
+    sampling = tmm1_data.sampling_config(data_config)
+
+    # Assertions
+    assert sampling == {'orig_terms': [360], 'fraction': 0.25, 'seed': 42}
+    data_config['configuration']['sampling'] = {'fraction': 0}
+    with pytest.raises(ValueError):
+        tmm1_data.sampling_config(data_config)
@@ -0,0 +1,59 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_parallel
+
+def test_partitions_keep_loans_together(loan_data):
+    partitions = tmm1_parallel.partition_loans(loan_data, 8)
+
+    # Assertions
+    assert sum(len(partition) for partition in partitions) == len(loan_data)
+    loan_partitions = {}
+    for i, partition in enumerate(partitions):
+        for loan_id in partition['LOAN_ID'].unique():
+            assert loan_partitions.setdefault(loan_id, i) == i
+
+def test_parallel_is_deterministic_across_worker_counts(loan_data, data_config):
+    single = tmm1_parallel.run_model_parallel(loan_data, data_config, workers=1, partitions=16)
+    pooled = tmm1_parallel.run_model_parallel(loan_data, data_config, workers=3, partitions=16)
+
+    # Assertions
+    np.testing.assert_array_equal(pooled['Transition_Counts'], single['Transition_Counts'])
+    np.testing.assert_array_equal(pooled['CGL_Curve'], single['CGL_Curve'])
+    for key in ['ALLL', 'CECL_Amount', 'Opening_Balance', 'Ending_Balance', 'Origination_Amount']:
+        assert pooled[key] == single[key]
+
+def test_parallel_matches_serial_calculator(loan_data, data_config):
+    expected = tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)
+
+    result = tmm1_parallel.run_model_parallel(loan_data, data_config, workers=2, partitions=4)
+
+    # Assertions
+    pd.testing.assert_frame_equal(result['Transition_Counts'], expected['Transition_Counts'])
+    assert result['ALLL'] == pytest.approx(expected['ALLL'], rel=1e-12)
+    assert result['Ending_Balance'] == pytest.approx(expected['Ending_Balance'])
+    assert result['Origination_Amount'] == pytest.approx(expected['Origination_Amount'])
+    np.testing.assert_allclose(result['Distribution'], expected['Distribution'])
+
+@pytest.mark.parametrize('parallel', [True, {}, {'workers': 1, 'partitions': 4}])
+def test_run_model_parallel_settings(loan_data, data_config, parallel):
+    expected = tmm1.run_model(loan_data, data_config)
+    data_config['configuration']['parallel'] = parallel
+
+    result = tmm1.run_model(loan_data, data_config)
+
+    # Assertions
+    pd.testing.assert_frame_equal(result['Transition_Counts'], expected['Transition_Counts'])
+    assert result['ALLL'] == pytest.approx(expected['ALLL'], rel=1e-12)
+
+def test_next_state_fill_stops_at_loan_boundaries():
+    loan_ids = np.array([1, 1, 2, 3, 3, 3])
+    codes = np.array([0, 1, 2, 0, 0, 1], dtype=np.int16)
+
+    next_codes = tmm1.next_state_codes(loan_ids, codes)
+
+    # Assertions
+    np.testing.assert_array_equal(next_codes, [1, 1, -1, 0, 1, 1])
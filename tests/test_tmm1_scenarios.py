@@ -0,0 +1,58 @@
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_scenarios
+
+@pytest.fixture
+def calculator_output(loan_data, data_config):
+    return tmm1.calculator(tmm1.feature_engg(loan_data, data_config), data_config)
+
+def test_base_scenario_matches_calculator(calculator_output, data_config):
+    scenarios = [{'name': 'Base'}, {'name': 'Short', 'forecasted_months': 12, 'WAL': 2.0}]
+
+    result = tmm1_scenarios.evaluate_scenarios(calculator_output, scenarios, data_config)
+
+    # Assertions
+    assert list(result.index) == ['Base', 'Short']
+    assert result.loc['Base', 'ALLL'] == pytest.approx(calculator_output['ALLL'])
+    assert result.loc['Base', 'CECL_Amount'] == pytest.approx(calculator_output['CECL_Amount'])
+    curve = calculator_output['CGL_Curve']['Charged Off']
+    assert result.loc['Short', 'ALLL'] == pytest.approx(curve.iloc[12] - curve.iloc[0])
+    assert result.loc['Short', 'CECL_Factor'] == pytest.approx(result.loc['Short', 'ALLL'] * 2.0)
+
+def test_default_shock_keeps_rows_stochastic(calculator_output, data_config):
+    matrix = calculator_output['Transition_Matrix'].to_numpy()
+
+    shocked = tmm1_scenarios.shock_default_rates(matrix, 5, [0.5, 1.0, 3.0])
+
+    # Assertions
+    np.testing.assert_allclose(shocked.sum(axis=2), 1.0)
+    np.testing.assert_allclose(shocked[1], matrix)
+    np.testing.assert_allclose(shocked[2][:5, 5], np.minimum(matrix[:5, 5] * 3.0, 1.0))
+
+def test_stressed_scenarios_increase_losses(calculator_output, data_config):
+    scenarios = [{'name': 'Mild', 'default_shock': 0.5}, {'name': 'Base'}, {'name': 'Severe', 'default_shock': 2.0}]
+
+    result = tmm1_scenarios.evaluate_scenarios(calculator_output, scenarios, data_config)
+
+    # Assertions
+    assert result.loc['Mild', 'ALLL'] < result.loc['Base', 'ALLL'] < result.loc['Severe', 'ALLL']
+
+def test_default_shock_on_rows_that_only_default():
+    matrix = np.array([[0.5, 0.3, 0.2], [0.0, 0.0, 1.0], [0.0, 0.0, 1.0]])
+
+    shocked = tmm1_scenarios.shock_default_rates(matrix, 2, [0.5, 2.0])
+
+    # Assertions
+    np.testing.assert_allclose(shocked.sum(axis=2), 1.0)
+    np.testing.assert_allclose(shocked[0, 1], [0.0, 0.5, 0.5])
+    np.testing.assert_allclose(shocked[1, 1], [0.0, 0.0, 1.0])
+    with pytest.raises(ValueError):
+        tmm1_scenarios.shock_default_rates(matrix, 2, [-1.0])
+
+@pytest.mark.parametrize('horizon', [0, -12, 6.5, '12', True])
+def test_invalid_scenario_horizons(calculator_output, data_config, horizon):
+    with pytest.raises(ValueError):
+        tmm1_scenarios.evaluate_scenarios(calculator_output, [{'name': 'Bad', 'forecasted_months': horizon}], data_config)
@@ -0,0 +1,41 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_segments
+
+@pytest.fixture
+def segmented_data(loan_data):
+    loan_data['STATE'] = np.where(loan_data['LOAN_ID'] % 3 == 0, 'CA', 'TX')
+    loan_data['ORIG_DATE'] = np.where(loan_data['LOAN_ID'] % 2 == 0, '2019-03-28', '2021-11-28')
+    return loan_data
+
+def test_segments_match_portfolio_totals(segmented_data, data_config):
+    data_config['configuration']['segmentation'] = {'column': 'STATE'}
+    df_feature = tmm1.feature_engg(segmented_data, data_config)
+    aggregates = tmm1.aggregate(df_feature, data_config)
+
+    result = tmm1_segments.run_segments(df_feature, data_config)
+
+    # Assertions
+    summary = result['Segment_Summary']
+    assert list(summary.index) == ['CA', 'TX']
+    assert summary['Loan_Count'].sum() == aggregates['Loan_Count']
+    assert summary['Ending_Balance'].sum() == pytest.approx(aggregates['Last_UPB'] + aggregates['Charged_Off_Amount'])
+    assert result['Segment_Transition_Matrix'].shape == (2 * 6, 6)
+    np.testing.assert_allclose(result['Segment_Distribution'].sum(axis=1), 1.0)
+
+def test_segment_matches_calculator_on_subset(segmented_data, data_config):
+    data_config['configuration']['segmentation'] = {'column': 'ORIG_DATE', 'vintage': True}
+    df_feature = tmm1.feature_engg(segmented_data, data_config)
+
+    result = tmm1_segments.run_segments(df_feature, data_config)
+    expected = tmm1.calculator(df_feature[df_feature['ORIG_DATE'] == '2019-03-28'], data_config)
+
+    # Assertions
+    assert list(result['Segment_Summary'].index) == ['2019', '2021']
+    np.testing.assert_allclose(result['Segment_Distribution'].loc['2019'], expected['Distribution'])
+    np.testing.assert_allclose(result['Segment_CGL_Curve'].loc['2019'].fillna(0), expected['CGL_Curve'].fillna(0))
+    assert result['Segment_Summary'].loc['2019', 'CECL_Amount'] == pytest.approx(expected['CECL_Amount'])
@@ -0,0 +1,86 @@
+# Third-party imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# Local imports
+from backend.models import tmm1, tmm1_tape
+
+def test_tape_round_trip_is_memory_mapped(tmp_path, loan_data):
+    df = loan_data.assign(
+        ACT_PERIOD=pd.Timestamp('2020-01-01') + pd.to_timedelta(loan_data['ACT_PERIOD'] * 31, unit='D'),
+        STATE=np.where(loan_data['LOAN_ID'] % 3 == 0, None, np.where(loan_data['LOAN_ID'] % 2 == 0, 'CA', 'TX'))
+    )
+    tape_file = tmp_path / 'loans.tape'
+
+    tmm1_tape.write_tape(df, str(tape_file))
+    tape = tmm1_tape.Tape(str(tape_file))
+    frame = tape.frame(loan_codes=False)
+
+    # Assertions
+    expected = df.sort_values(['LOAN_ID', 'ACT_PERIOD'], kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(frame.drop(columns='STATE'), expected.drop(columns='STATE'))
+    assert list(frame['STATE'].astype(object).where(frame['STATE'].notna(), None)) == list(expected['STATE'])
+    codes_frame = tape.frame()
+    assert np.shares_memory(codes_frame['CURRENT_UPB'].to_numpy(), tape._map)
+    assert np.shares_memory(codes_frame['LOAN_ID'].to_numpy(), tape._map)
+    np.testing.assert_array_equal(tape.loan_ids()[codes_frame['LOAN_ID']], expected['LOAN_ID'])
+
+@pytest.mark.parametrize('fraction', [1.0, 0.5])
+def test_run_model_on_tape_matches_frame(tmp_path, loan_data, data_config, fraction):
+    data_config['configuration']['sampling']['fraction'] = fraction
+    tape_file = tmp_path / 'loans.tape'
+    tmm1_tape.write_tape(loan_data, str(tape_file), data_config)
+
+    from_tape = tmm1.run_model(str(tape_file), data_config)
+    from_frame = tmm1.run_model(loan_data, data_config)
+
+    # Assertions
+    pd.testing.assert_frame_equal(from_tape['Transition_Counts'], from_frame['Transition_Counts'])
+    pd.testing.assert_frame_equal(from_tape['CGL_Curve'], from_frame['CGL_Curve'])
+    assert from_tape['Opening_Balance'] == pytest.approx(from_frame['Opening_Balance'])
+    assert from_tape['Ending_Balance'] == pytest.approx(from_frame['Ending_Balance'])
+
+def test_tape_sample_with_alphanumeric_ids(tmp_path, loan_data, data_config):
+    data_config['configuration']['sampling']['fraction'] = 0.5
+    loan_data = loan_data.assign(LOAN_ID='F12Q' + loan_data['LOAN_ID'].astype(str).str.zfill(6))
+    tape_file = tmp_path / 'loans.tape'
+    tmm1_tape.write_tape(loan_data, str(tape_file), data_config)
+
+    from_tape = tmm1.run_model(str(tape_file), data_config)
+    from_frame = tmm1.run_model(loan_data, data_config)
+
+    # Assertions
+    pd.testing.assert_frame_equal(from_tape['Transition_Counts'], from_frame['Transition_Counts'])
+    assert from_tape['Opening_Balance'] == pytest.approx(from_frame['Opening_Balance'])
+
+def test_tape_path_ignores_model_settings(data_config):
+    data_config['configuration']['attributes'] = {'filepath': 'a.csv', 'delimiter': '|'}
+    path = tmm1_tape.tape_path('/data/loans.csv', data_config)
+
+    data_config['configuration']['forecasted_months'] = 120
+    data_config['configuration']['loan_buckets']['bucket_map']['4'] = 'Charged Off'
+    same = tmm1_tape.tape_path('/data/loans.csv', data_config)
+    data_config['configuration']['data_specific_functions'] = {'date_columns': {'ACT_PERIOD': {'date_format': 'XMYYYY'}}}
+    changed = tmm1_tape.tape_path('/data/loans.csv', data_config)
+
+    # Assertions
+    assert path.startswith('/data/loans.csv.') and path.endswith(tmm1_tape.TAPE_SUFFIX)
+    assert same == path and changed != path
+
+def test_truncated_tape_is_rejected(tmp_path, loan_data, data_config):
+    data_file = tmp_path / 'loans.csv'
+    data_file.write_text('placeholder')
+    tape_file = tmp_path / 'loans.tape'
+    tmm1_tape.write_tape(loan_data, str(tape_file), data_config)
+    size = tape_file.stat().st_size
+
+    # Assertions
+    assert tmm1_tape.is_tape_fresh(str(tape_file), str(data_file))
+    with open(tape_file, 'r+b') as f:
+        f.truncate(size - 100)
+    with pytest.raises(ValueError, match='truncated'):
+        tmm1_tape.Tape(str(tape_file))
+    assert not tmm1_tape.is_tape_fresh(str(tape_file), str(data_file))
+    tape_file.write_bytes(b'')
+    assert not tmm1_tape.is_tape_fresh(str(tape_file), str(data_file))
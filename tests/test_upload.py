@@ -37,3 +37,46 @@ def test_upload_invalid_file_type(client):
     # Assertions
     assert response.status_code == 400
     assert b'File type not allowed' in response.data
+
+def test_chunked_upload_endpoints(client, tmp_path, monkeypatch):
+    from backend import app as app_module, upload_sessions
+    monkeypatch.setattr(app_module, 'upload_store',
+                        upload_sessions.UploadStore(str(tmp_path), str(tmp_path / 'sessions')))
+    payload = b'{"key": "value"}'
+
+    init = client.post('/uploads', json={'filename': 'config.json', 'size': len(payload)})
+    upload_id = init.get_json()['upload_id']
+    first = client.put(f'/uploads/{upload_id}?offset=0', data=payload[:5])
+    stale = client.put(f'/uploads/{upload_id}?offset=0', data=payload)
+    status = client.get(f'/uploads/{upload_id}')
+    client.put(f'/uploads/{upload_id}?offset=5', data=payload[5:])
+    complete = client.post(f'/uploads/{upload_id}/complete')
+
+    # Assertions
+    assert init.status_code == 201
+    assert first.get_json()['offset'] == 5
+    assert stale.status_code == 409 and stale.get_json()['offset'] == 5
+    assert status.get_json()['offset'] == 5 and not status.get_json()['complete']
+    assert complete.status_code == 200 and complete.get_json()['size'] == len(payload)
+
+def test_upload_compressed_file(client):
+    data = {
+        'files': (BytesIO(b'\x1f\x8b'), 'test_file.json.gz')
+    }
+
+    response = client.post('/upload', data=data)
+
+    # Assertions
+    assert response.status_code == 201
+
+def test_upload_duplicate_is_stored_once(client, tmp_path, monkeypatch):
+    from backend import app as app_module, blob_store
+    monkeypatch.setattr(app_module, 'blobs', blob_store.BlobStore(str(tmp_path)))
+
+    first = client.post('/upload', data={'files': (BytesIO(b'{"key": "value"}'), 'test_file.json')})
+    second = client.post('/upload', data={'files': (BytesIO(b'{"key": "value"}'), 'copy.json')})
+
+    # Assertions
+    assert first.get_json()['blobs'][0]['duplicate'] is False
+    assert second.get_json()['blobs'][0]['duplicate'] is True
+    assert first.get_json()['blobs'][0]['sha256'] == second.get_json()['blobs'][0]['sha256']
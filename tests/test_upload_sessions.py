@@ -0,0 +1,88 @@
+# Standard library imports
+import os
+import time
+import hashlib
+from io import BytesIO
+
+# Third-party imports
+import pytest
+
+# Local imports
+from backend import upload_sessions
+
+@pytest.fixture
+def store(tmp_path):
+    return upload_sessions.UploadStore(str(tmp_path / 'uploads'), str(tmp_path / 'sessions'), max_size=1024)
+
+def test_chunked_upload_hash_and_resume(store):
+    payload = bytes(range(256)) * 3
+    session = store.init('tape.csv', size=len(payload), sha256=hashlib.sha256(payload).hexdigest(), report_name='q4')
+
+    store.append(session['upload_id'], 0, BytesIO(payload[:300]))
+    with pytest.raises(upload_sessions.UploadOffsetError) as mismatch:
+        store.append(session['upload_id'], 200, BytesIO(payload[200:]))
+    # A new store has no hash state and rebuilds it from the acknowledged bytes
+    restarted = upload_sessions.UploadStore(store.folder, store.session_folder, store.max_size)
+    restarted.append(session['upload_id'], mismatch.value.offset, BytesIO(payload[300:]))
+    completed = restarted.complete(session['upload_id'])
+
+    # Assertions
+    assert mismatch.value.offset == 300
+    assert completed['complete'] and completed['size'] == len(payload)
+    assert completed['sha256'] == hashlib.sha256(payload).hexdigest()
+    with open(completed['path'], 'rb') as f:
+        assert f.read() == payload
+
+def test_failed_chunk_is_discarded(store):
+    session = store.init('tape.csv')
+    store.append(session['upload_id'], 0, BytesIO(b'a' * 600))
+
+    with pytest.raises(upload_sessions.UploadTooLargeError):
+        store.append(session['upload_id'], 600, BytesIO(b'b' * 600))
+    store.append(session['upload_id'], 600, BytesIO(b'c' * 100))
+    completed = store.complete(session['upload_id'])
+
+    # Assertions
+    assert completed['size'] == 700
+    assert completed['sha256'] == hashlib.sha256(b'a' * 600 + b'c' * 100).hexdigest()
+
+def test_complete_checks_declared_hash(store):
+    session = store.init('tape.csv', sha256='0' * 64)
+    store.append(session['upload_id'], 0, BytesIO(b'data'))
+
+    with pytest.raises(ValueError):
+        store.complete(session['upload_id'])
+    with pytest.raises(ValueError):
+        store.completed(session['upload_id'])
+
+def test_stores_take_turns_appending(store):
+    payload = b'0123456789' * 60
+    other = upload_sessions.UploadStore(store.folder, store.session_folder, store.max_size)
+    session = store.init('tape.csv', size=len(payload))
+
+    # Each store caches the hash state of the chunks it appended, which the other one moves past
+    store.append(session['upload_id'], 0, BytesIO(payload[:200]))
+    other.append(session['upload_id'], 200, BytesIO(payload[200:400]))
+    store.append(session['upload_id'], 400, BytesIO(payload[400:]))
+    completed = other.complete(session['upload_id'])
+
+    # Assertions
+    assert completed['sha256'] == hashlib.sha256(payload).hexdigest()
+
+def test_expire_removes_stale_sessions(store):
+    stale = store.init('stale.csv', report_name='old')
+    store.append(stale['upload_id'], 0, BytesIO(b'partial'))
+    done = store.init('done.csv')
+    store.append(done['upload_id'], 0, BytesIO(b'data'))
+    store.complete(done['upload_id'])
+    fresh = store.init('fresh.csv')
+
+    expired = store.expire(now=time.time() + store.session_ttl + 1)
+
+    # Assertions
+    assert set(expired) == {stale['upload_id'], done['upload_id'], fresh['upload_id']}
+    assert not os.path.exists(stale['folder'])
+    assert os.path.exists(done['path'])
+    with pytest.raises(LookupError):
+        store.get(done['upload_id'])
+    assert store.expire() == []